@@ -0,0 +1,81 @@
+"""
+Compare the time spent parsing and serializing a profile corpus with the
+pure-python and the libyaml implementations of PyYAML.
+
+Usage::
+
+    python benchmarks/bench-yaml.py [profile_root ...] [--repeat 20]
+
+The profile roots default to the ones of the current kloch configuration.
+"""
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+import yaml
+
+THISDIR = Path(__file__).parent
+sys.path.insert(0, str(THISDIR.parent))
+
+import kloch
+import kloch._utils
+
+
+def _get_implementations():
+    implementations = {"pure-python": (yaml.SafeLoader, yaml.SafeDumper)}
+    if yaml.__with_libyaml__:
+        implementations["libyaml"] = (yaml.CSafeLoader, yaml.CSafeDumper)
+    return implementations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("profile_roots", nargs="*", type=Path)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    profile_roots = args.profile_roots or kloch.get_config().profile_roots
+    paths = kloch.get_all_profile_file_paths(profile_roots)
+    if not paths:
+        print(f"no profile found in {profile_roots}", file=sys.stderr)
+        return 1
+
+    contents = [path.read_text(encoding="utf-8") for path in paths]
+    loaded = [kloch._utils.yaml_load(content) for content in contents]
+    print(f"{len(paths)} profiles, {sum(map(len, contents))} characters")
+
+    results = {}
+    for name, (loader, dumper) in _get_implementations().items():
+
+        def _load():
+            for content in contents:
+                yaml.load(content, Loader=loader)
+
+        def _dump():
+            for data in loaded:
+                yaml.dump(data, Dumper=dumper, sort_keys=False)
+
+        load_time = min(timeit.repeat(_load, number=1, repeat=args.repeat))
+        dump_time = min(timeit.repeat(_dump, number=1, repeat=args.repeat))
+        results[name] = (load_time, dump_time)
+        print(
+            f"{name: <12} | parse {load_time * 1000:8.2f}ms | serialize {dump_time * 1000:8.2f}ms"
+        )
+
+    if len(results) > 1:
+        (pure_load, pure_dump), (c_load, c_dump) = results.values()
+        print(
+            f"libyaml speedup: parse x{pure_load / c_load:.1f} | serialize x{pure_dump / c_dump:.1f}"
+        )
+    else:
+        print(
+            "PyYAML is not built with libyaml, kloch uses the pure-python implementation"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -19,25 +19,54 @@ __all__ = [
     "serialize_profile",
     "write_profile_to_file",
 ]
+import importlib
+
 from .constants import Environ
 from ._dictmerge import MergeableDict
 from ._dictmerge import MergeRule
 from ._dictmerge import refacto_dict
 from ._dictmerge import deepmerge_dicts
-from .config import KlochConfig
-from .config import get_config
-from . import config
-from . import launchers
-from . import filesyntax
-from .filesyntax import EnvironmentProfile
-from .filesyntax import serialize_profile
-from .filesyntax import read_profile_from_file
-from .filesyntax import read_profile_from_id
-from .filesyntax import write_profile_to_file
-from .filesyntax import get_profile_file_path
-from .filesyntax import get_all_profile_file_paths
-from .cli import get_cli
-from .cli import run_cli
+
+# imported on first access so using only a part of the library, or the cli
+# "python" command, doesn't pay for importing everything else
+_LAZY_ATTRIBUTES = {
+    "KlochConfig": ".config",
+    "get_config": ".config",
+    "config": None,
+    "launchers": None,
+    "filesyntax": None,
+    "daemon": None,
+    "EnvironmentProfile": ".filesyntax",
+    "serialize_profile": ".filesyntax",
+    "read_profile_from_file": ".filesyntax",
+    "read_profile_from_id": ".filesyntax",
+    "write_profile_to_file": ".filesyntax",
+    "get_profile_file_path": ".filesyntax",
+    "get_all_profile_file_paths": ".filesyntax",
+    "get_cli": ".cli",
+    "run_cli": ".cli",
+}
+"""
+Mapping of {"attribute name": "relative name of the module defining it"},
+or None if the attribute is a submodule.
+"""
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    module_name = _LAZY_ATTRIBUTES[name]
+    if module_name is None:
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
 
 # keep in sync with pyproject.toml
 __version__ = "0.13.1"
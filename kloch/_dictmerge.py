@@ -1,11 +1,14 @@
 import copy
 import enum
+import functools
 import logging
 from typing import Any
 from typing import Callable
 from typing import Dict
+from typing import Iterable
 from typing import Optional
 from typing import Tuple
+from typing import Type
 from typing import TypeVar
 
 LOGGER = logging.getLogger(__name__)
@@ -22,6 +25,46 @@ class MergeRule(enum.IntEnum):
     ifnotexists = enum.auto()
 
 
+# immutable types that never need to be copied
+_ATOMIC_TYPES = (str, int, float, bool, type(None), bytes)
+
+
+def _new_like(src: Any, content: Iterable) -> Any:
+    """
+    Create a new instance of the same type as the given dict or list,
+    with the given content, without calling its ``__init__``.
+    """
+    new = src.__class__.__new__(src.__class__)
+    if hasattr(src, "__dict__"):
+        new.__dict__.update(src.__dict__)
+    if isinstance(src, dict):
+        dict.update(new, content)
+    else:
+        list.extend(new, content)
+    return new
+
+
+def copy_tree(obj: Any) -> Any:
+    """
+    Deepcopy the given nested structure of dict and list.
+
+    Faster alternative to ``copy.deepcopy`` for the data kloch manipulates, which
+    preserve the type of dict and list subclasses. Other objects are still deepcopied.
+    """
+    obj_type = obj.__class__
+    if obj_type in _ATOMIC_TYPES:
+        return obj
+    if obj_type is dict:
+        return {key: copy_tree(value) for key, value in obj.items()}
+    if obj_type is list:
+        return [copy_tree(value) for value in obj]
+    if isinstance(obj, dict):
+        return _new_like(obj, ((key, copy_tree(value)) for key, value in obj.items()))
+    if isinstance(obj, list):
+        return _new_like(obj, (copy_tree(value) for value in obj))
+    return copy.deepcopy(obj)
+
+
 def refacto_dict(
     src_dict: Dict,
     callback: Callable[[Any, Any], Tuple[Any, Any]],
@@ -68,18 +111,44 @@ def deepmerge_dicts(
     - `dict`: deepmerged recursively
 
     For any other type, the `over`'s value override the `base`'s value.
+
+    Returns:
+        new instance of the same type as ``base_content`` with deepcopied structure.
     """
-    new_content = copy.deepcopy(base_content)
-    merge_rule_callback = merge_rule_callback or (lambda k: MergeRule.override)
-    key_resolve_callback = key_resolve_callback or (lambda k: k)
+    return _deepmerge_dicts(
+        over_content,
+        base_content,
+        merge_rule_callback=merge_rule_callback or (lambda k: MergeRule.override),
+        key_resolve_callback=key_resolve_callback or (lambda k: k),
+        copy_values=True,
+    )
+
+
+def _deepmerge_dicts(
+    over_content: Dict[str, Any],
+    base_content: Dict,
+    merge_rule_callback: Callable[[str], MergeRule],
+    key_resolve_callback: Callable[[str], str],
+    copy_values: bool,
+) -> Dict[str, Any]:
+    """
+    See :func:`deepmerge_dicts`.
+
+    Args:
+        copy_values:
+            if False the returned structure share the values that didn't need
+            to be merged with ``over_content`` and ``base_content``.
+    """
+    # values are only copied once at the end, except merged values which are already new
+    new_content = dict(base_content)
+    merged_keys = set()
+
+    # put base and over at same level by resolving both
+    base_keys_resolved = {key_resolve_callback(bk): bk for bk in base_content}
 
     for over_key, over_value in over_content.items():
         merge_rule = merge_rule_callback(over_key)
 
-        # put base and over at same level by resolving both
-        base_keys_resolved = {
-            key_resolve_callback(bk): bk for bk, _ in base_content.items()
-        }
         over_key_resolved = key_resolve_callback(over_key)
 
         base_key: Optional[str] = base_keys_resolved.get(over_key_resolved, None)
@@ -106,18 +175,20 @@ def deepmerge_dicts(
         # reaching here implies `merge_rule.append`
 
         if isinstance(over_value, dict) and isinstance(base_value, dict):
-            new_value = deepmerge_dicts(
+            new_value = _deepmerge_dicts(
                 over_value,
                 base_content=base_value,
                 merge_rule_callback=merge_rule_callback,
                 key_resolve_callback=key_resolve_callback,
+                copy_values=copy_values,
             )
+            merged_keys.add(over_key)
 
         elif isinstance(over_value, list) and isinstance(base_value, list):
             new_value = [] + base_value + over_value
 
         else:
-            new_value = copy.deepcopy(over_value)
+            new_value = over_value
 
         if base_key:
             # we have merged `base` value with `over` so we can remove it safely
@@ -125,7 +196,16 @@ def deepmerge_dicts(
         new_content[over_key] = new_value
         continue
 
-    return new_content
+    if not copy_values:
+        return _new_like(base_content, new_content.items())
+
+    return _new_like(
+        base_content,
+        (
+            (key, value if key in merged_keys else copy_tree(value))
+            for key, value in new_content.items()
+        ),
+    )
 
 
 def _remove_prefix(text: str, prefix: str) -> str:
@@ -134,6 +214,36 @@ def _remove_prefix(text: str, prefix: str) -> str:
     return text
 
 
+@functools.lru_cache(maxsize=16384)
+def _parse_key(key: str, tokens: Type["MergeableDict.tokens"]) -> Tuple[MergeRule, str]:
+    """
+    Extract the merge rule and the key without tokens, from the given key.
+
+    Memoized as the same keys are parsed again at each merge and resolve.
+    """
+    merge_rule = MergeRule.append
+    for rule, token in (
+        (MergeRule.append, tokens.append),
+        (MergeRule.remove, tokens.remove),
+        (MergeRule.override, tokens.override),
+        (MergeRule.ifnotexists, tokens.ifnotexists),
+    ):
+        if key.startswith(token):
+            merge_rule = rule
+            break
+
+    resolved = key
+    for token in [
+        tokens.append,
+        tokens.remove,
+        tokens.override,
+        tokens.ifnotexists,
+    ]:
+        resolved = _remove_prefix(resolved, token)
+
+    return merge_rule, resolved
+
+
 T = TypeVar("T", bound="MergeableDict")
 
 
@@ -189,35 +299,63 @@ class MergeableDict(dict):
         )
         return self.__class__(new_content)
 
+    @classmethod
+    def merge_many(cls: Type[T], contents: Iterable[Dict]) -> T:
+        """
+        Merge all the given dict structures together from left to right.
+
+        Equivalent to ``content1 + content2 + content3 + ...`` but intermediate
+        merges share their unchanged values instead of copying them, so the
+        structure is only copied once at the end.
+
+        Args:
+            contents: dict structures to merge, each one merged over the previous ones.
+
+        Returns:
+            new instance of this class with deepcopied structure.
+        """
+        merged: Optional[Dict] = None
+        for content in contents:
+            if merged is None:
+                merged = content
+                continue
+            merged = _deepmerge_dicts(
+                over_content=content,
+                base_content=merged,
+                merge_rule_callback=cls.get_merge_rule,
+                key_resolve_callback=cls.resolve_key_tokens,
+                copy_values=False,
+            )
+
+        if merged is None:
+            return cls()
+        return cls((key, copy_tree(value)) for key, value in merged.items())
+
+    @classmethod
+    def parse_key(cls, key: str) -> Tuple[MergeRule, str]:
+        """
+        Extract the :obj:`MergeRule` and the key without tokens from the given key.
+
+        Results are cached so parsing the same key multiple times is cheap.
+
+        Returns:
+            tuple of ``(merge rule, resolved key)``
+        """
+        return _parse_key(key, cls.tokens)
+
     @classmethod
     def resolve_key_tokens(cls, key: str) -> str:
         """
         Ensure the given key has all potential tokens removed.
         """
-        resolved = key
-        for token in [
-            cls.tokens.append,
-            cls.tokens.remove,
-            cls.tokens.override,
-            cls.tokens.ifnotexists,
-        ]:
-            resolved = _remove_prefix(resolved, token)
-        return resolved
+        return _parse_key(key, cls.tokens)[1]
 
     @classmethod
     def get_merge_rule(cls, key: str) -> MergeRule:
         """
         Extract the :obj:`MergeRule` for the given key based on its potential token.
         """
-        if key.startswith(cls.tokens.append):
-            return MergeRule.append
-        if key.startswith(cls.tokens.remove):
-            return MergeRule.remove
-        if key.startswith(cls.tokens.override):
-            return MergeRule.override
-        if key.startswith(cls.tokens.ifnotexists):
-            return MergeRule.ifnotexists
-        return MergeRule.append
+        return _parse_key(key, cls.tokens)[0]
 
     def get(self, key, default=None, ignore_tokens: bool = False):
         """
@@ -232,14 +370,11 @@ class MergeableDict(dict):
 
         new_key = key
         if ignore_tokens:
-            new_key = self.resolve_key_tokens(key)
-            resolved_mapping = {
-                self.resolve_key_tokens(child_key): child_key for child_key in self
-            }
-            if new_key in resolved_mapping:
-                new_key = resolved_mapping[new_key]
-            else:
-                new_key = key
+            resolved_key = self.resolve_key_tokens(key)
+            # the last key matching take priority, like in a resolved dict
+            for child_key in self:
+                if self.resolve_key_tokens(child_key) == resolved_key:
+                    new_key = child_key
 
         return super().get(new_key, default)
 
@@ -255,10 +390,13 @@ class MergeableDict(dict):
 
         def process_pair(key: str, value: str):
             new_key = self.resolve_key_tokens(key)
+            # dict values are already new instances built by refacto_dict
+            if not isinstance(value, dict):
+                value = copy_tree(value)
             return new_key, value
 
         new_content = refacto_dict(
-            src_dict=copy.deepcopy(self),
+            src_dict=self,
             callback=process_pair,
             recursive=True,
         )
@@ -1,5 +1,46 @@
+import concurrent.futures
 import contextlib
+import functools
 import os
+import re
+from typing import Any
+from typing import Callable
+from typing import IO
+from typing import Iterable
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Tuple
+from typing import TypeVar
+from typing import Union
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as _YamlLoader
+    from yaml import CSafeDumper as _YamlBaseDumper
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as _YamlLoader
+    from yaml import SafeDumper as _YamlBaseDumper
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class _YamlDumper(_YamlBaseDumper):
+    pass
+
+
+# serialize dict/list subclasses (like MergeableDict) as their builtin type
+_YamlDumper.add_multi_representer(dict, _YamlDumper.represent_dict)
+_YamlDumper.add_multi_representer(list, _YamlDumper.represent_list)
+
+_YAML_DUMP_WIDTH = 2**31 - 1
+"""
+Maximum line width of dumped yaml. The pure-python and libyaml emitters
+fold long lines differently so we never fold them to have the same output.
+"""
 
 
 @contextlib.contextmanager
@@ -37,3 +78,119 @@ def expand_envvars(src_str: str) -> str:
     # restore escaped character
     new_str = new_str.replace("##tmp##", "$")
     return new_str
+
+
+# same variable syntax as os.path.expandvars, with $$ as escape
+_VARIABLE_PATTERN = r"\$(?P<dollar>\$|\w+|\{[^}]*\})"
+if os.name == "nt":
+    _VARIABLE_PATTERN += r"|%(?P<percent>%|[^%]+)%"
+_VARIABLE_REGEX = re.compile(_VARIABLE_PATTERN, re.ASCII)
+
+
+def _get_variable(variables: Mapping[str, str], name: str) -> Optional[str]:
+    value = variables.get(name)
+    # windows variable names are case-insensitive
+    if value is None and os.name == "nt":
+        value = variables.get(name.upper())
+    return value
+
+
+def expand_variables(src_str: str, variables: Mapping[str, str]) -> str:
+    """
+    Resolve environment variable pattern in the given string using the given variables.
+
+    Same syntax as :func:`expand_envvars`: ``$NAME`` and ``${NAME}`` (and ``%NAME%`` on
+    windows) are replaced by the value of the variable, or left untouched if it
+    doesn't exist. ``$$`` is replaced by ``$``.
+
+    Unlike :func:`expand_envvars` the variables can be any mapping, so the expansion
+    doesn't need to modify ``os.environ``.
+
+    Args:
+        src_str: string that may contain variables to expand.
+        variables: mapping of variable name to value.
+    """
+    if "$" not in src_str and "%" not in src_str:
+        return src_str
+
+    def _replace(match) -> str:
+        name = match.group("dollar")
+        if name is None:
+            name = match.group("percent")
+            if name == "%":
+                return "%"
+        elif name == "$":
+            return "$"
+        elif name.startswith("{"):
+            name = name[1:-1]
+        value = _get_variable(variables, name)
+        return match.group(0) if value is None else value
+
+    return _VARIABLE_REGEX.sub(_replace, src_str)
+
+
+@functools.lru_cache(maxsize=4096)
+def get_variable_names(src_str: str) -> Tuple[str, ...]:
+    """
+    Get the name of the variables that :func:`expand_variables` would expand in the given string.
+
+    Results are cached as the same strings are usually resolved many times.
+    """
+    names = []
+    for match in _VARIABLE_REGEX.finditer(src_str):
+        name = match.group("dollar")
+        if name is None:
+            name = match.group("percent")
+            if name == "%":
+                continue
+        elif name == "$":
+            continue
+        elif name.startswith("{"):
+            name = name[1:-1]
+        names.append(name)
+    return tuple(names)
+
+
+def yaml_load(stream: Union[str, IO]) -> Any:
+    """
+    Same as ``yaml.safe_load`` but using the faster libyaml bindings when available.
+    """
+    return yaml.load(stream, Loader=_YamlLoader)
+
+
+def yaml_dump(data: Any, **kwargs) -> str:
+    """
+    Same as ``yaml.safe_dump`` but using the faster libyaml bindings when available.
+
+    Dict and list subclasses are serialized as their builtin type and long lines are
+    never folded.
+
+    Args:
+        data: python object to serialize
+        kwargs: passed to ``yaml.dump``
+    """
+    kwargs.setdefault("width", _YAML_DUMP_WIDTH)
+    return yaml.dump(data, Dumper=_YamlDumper, **kwargs)
+
+
+def map_threaded(func: Callable[[T], R], items: Iterable[T], workers: int) -> List[R]:
+    """
+    Call the given function on each item using a bounded pool of threads.
+
+    Intended for functions spending most of their time waiting on io.
+
+    Args:
+        func: function to call with a single item.
+        items: arguments to call the function with.
+        workers: maximum number of threads to use, 1 or less disables threading.
+
+    Returns:
+        the function results, in the same order as the items.
+    """
+    items = list(items)
+    workers = min(workers, len(items))
+    if workers <= 1:
+        return [func(item) for item in items]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, items))
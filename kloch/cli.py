@@ -1,30 +1,46 @@
+# annotations are not evaluated so referenced modules are only imported when used
+from __future__ import annotations
+
 import abc
 import argparse
 import copy
 import inspect
+import json
 import logging
 import logging.handlers
 import re
 import runpy
+import signal
 import sys
 import tempfile
 import textwrap
 from pathlib import Path
 from typing import List
 from typing import Optional
+from typing import Tuple
 from typing import Type
 
 import kloch
 from kloch.launchers import LauncherContext
-from kloch.launchers import get_available_launchers_serialized_classes
 from kloch.launchers import BaseLauncher
 from kloch.launchers import BaseLauncherSerialized
+from kloch.launchers import EnvironCycleError
+from kloch.launchers import PathCache
 from kloch.session import SessionDirectory
 
 LOGGER = logging.getLogger(__name__)
 
 _ARGS_USER_COMMAND_DEST = "command"
 
+_PROFILE_INDEX_FILENAME = "profile-index.json"
+_PROFILE_CACHE_DIRNAME = "profiles"
+_PROFILE_GENERATION_FILENAME = "profile-generation.json"
+
+_SESSION_CLEANUP_TIME_BUDGET = 30.0
+"""
+Maximum amount of seconds spent deleting outdated sessions by a single run command.
+"""
+
 
 class BaseParser:
     """
@@ -45,6 +61,8 @@ class BaseParser:
         self._args: argparse.Namespace = args
         self._config = config
         self._argv = original_argv
+        self._profile_index: Optional[kloch.filesyntax.ProfileIndex] = None
+        self._profile_resolver: Optional[kloch.filesyntax.ProfileResolver] = None
 
     @property
     def debug(self) -> bool:
@@ -53,6 +71,13 @@ class BaseParser:
         """
         return self._args.debug
 
+    @property
+    def logs_to_stderr(self) -> bool:
+        """
+        True if the command print machine-readable content that logging must not be mixed with.
+        """
+        return False
+
     @property
     def _profile_roots(self) -> List[Path]:
         """
@@ -73,6 +98,49 @@ class BaseParser:
     def session_root(self) -> Optional[Path]:
         return self._config.cli_session_dir
 
+    @property
+    def profile_index(self) -> Optional[kloch.filesyntax.ProfileIndex]:
+        """
+        Index of the profiles persisted in the cache directory, None if no cache directory is configured.
+        """
+        if self._profile_index is None and self._config.cache_dir:
+            index_path = self._config.cache_dir / _PROFILE_INDEX_FILENAME
+            stamp_path = self._config.cache_dir / _PROFILE_GENERATION_FILENAME
+            self._profile_index = kloch.filesyntax.ProfileIndex.load(
+                index_path,
+                stamp=kloch.filesyntax.GenerationStamp(stamp_path),
+            )
+        return self._profile_index
+
+    @property
+    def profile_resolver(self) -> kloch.filesyntax.ProfileResolver:
+        """
+        Resolver shared by all the profile io operations of the command.
+        """
+        if self._profile_resolver is None:
+            cache = None
+            if self._config.cache_dir:
+                cache_root = self._config.cache_dir / _PROFILE_CACHE_DIRNAME
+                cache = kloch.filesyntax.MergedProfileCache(cache_root)
+            self._profile_resolver = kloch.filesyntax.ProfileResolver(
+                self.profile_roots,
+                index=self.profile_index,
+                cache=cache,
+                io_workers=self._config.io_workers,
+            )
+        return self._profile_resolver
+
+    def _save_profile_index(self):
+        """
+        Persist the profile index if it has been used.
+        """
+        if self._profile_index is None:
+            return
+        try:
+            self._profile_index.save()
+        except OSError as error:
+            LOGGER.warning(f"cannot save profile index: {error}")
+
     @abc.abstractmethod
     def execute(self):
         """
@@ -105,66 +173,48 @@ class BaseParser:
     ):
         """
         Merge each profile with its base then merge all of them from left to right.
-        """
-        profile_locations = self.profile_roots
 
-        profiles = []
-        for profile_id in profile_identifiers:
-
-            aspath = Path(profile_id)
-            if aspath.exists():
-                profile_paths = [aspath]
-            else:
-                profile_paths = kloch.get_profile_file_path(
-                    profile_id,
-                    profile_locations=profile_locations,
-                )
-            if len(profile_paths) >= 2:
-                print(
-                    f"ERROR | Found multiple profile with identifier '{profile_id}' "
-                    f": {profile_paths}.",
-                    file=sys.stderr,
-                )
-                sys.exit(1)
+        The profiles are resolved by the daemon if one is configured and running.
+        """
+        try:
+            profile = self._resolve_profiles(profile_identifiers, context)
+        except kloch.filesyntax.ProfileIdentifierError as error:
+            print(f"ERROR | {error}", file=sys.stderr)
+            sys.exit(1)
+        except (
+            kloch.filesyntax.ProfileAPIVersionError,
+            kloch.filesyntax.ProfileInheritanceError,
+        ) as error:
+            print(
+                f"ERROR | '{error}'.",
+                file=sys.stderr,
+            )
+            sys.exit(1)
 
-            if not profile_paths:
-                print(
-                    f"ERROR | No profile found with identifier '{profile_id}'.",
-                    file=sys.stderr,
-                )
-                sys.exit(1)
+        self._save_profile_index()
+        return profile
 
-            profile_path = profile_paths[0]
-            LOGGER.debug(f"reading profile '{profile_path}'")
+    def _resolve_profiles(
+        self,
+        profile_identifiers: List[str],
+        context: Optional[LauncherContext],
+    ) -> kloch.EnvironmentProfile:
+        socket_path = self._config.daemon_socket
+        if socket_path and kloch.daemon.is_daemon_supported():
             try:
-                profile = kloch.read_profile_from_file(
-                    profile_path,
-                    profile_locations=profile_locations,
-                )
-            except (
-                kloch.filesyntax.ProfileAPIVersionError,
-                kloch.filesyntax.ProfileInheritanceError,
-            ) as error:
-                print(
-                    f"ERROR | '{error}'.",
-                    file=sys.stderr,
+                return kloch.daemon.resolve_profiles(
+                    socket_path,
+                    profile_identifiers,
+                    context=context,
+                    profile_locations=self.profile_roots,
                 )
-                sys.exit(1)
+            except kloch.daemon.DaemonError as error:
+                LOGGER.debug(f"resolving profiles locally: {error}")
 
-            profile = profile.get_merged_profile()
-            profiles.append(profile)
-
-        profile = profiles.pop(-1)
-        for base_profile in profiles:
-            profile.inherit = base_profile
-            profile = profile.get_merged_profile()
-
-        if context:
-            LOGGER.debug(f"filtering profile using context {context}")
-            profile.launchers = profile.launchers.get_filtered_context(context)
-            profile.launchers = profile.launchers.with_context_resolved()
-
-        return profile
+        return self.profile_resolver.resolve_profiles(
+            profile_identifiers,
+            context=context,
+        )
 
 
 class RunParser(BaseParser):
@@ -207,7 +257,9 @@ class RunParser(BaseParser):
             module_names=plugins_names,
             subclass_type=BaseLauncherSerialized,
         )
-        launchers_classes = get_available_launchers_serialized_classes(launcher_plugins)
+        launchers_classes = kloch.launchers.get_available_launchers_serialized_classes(
+            launcher_plugins
+        )
 
         context = LauncherContext.create_from_system()
         print(f"loading {len(self.profile_ids)} profiles ...")
@@ -218,12 +270,12 @@ class RunParser(BaseParser):
         kloch.write_profile_to_file(
             profile,
             file_path=session_dir.profile_path,
-            profile_locations=self.profile_roots,
             check_valid_id=False,
             extra_comments=[
                 f"auto-generated profile from argv '{' '.join(self._argv)}'",
                 f"context was '{context}'",
             ],
+            resolver=self.profile_resolver,
         )
 
         launchers_dict = profile.launchers
@@ -251,32 +303,40 @@ class RunParser(BaseParser):
                 )
                 sys.exit(112)
 
-        launchers: List[BaseLauncher] = []
-        for seriallauncher in launchers_list:
+        def _exit_invalid(seriallauncher_: BaseLauncherSerialized, error: Exception):
+            print(
+                f"ERROR | Cannot validate launcher '{seriallauncher_.identifier}' from profile '{profile.identifier}': "
+                f"{error}",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+
+        def _validate(seriallauncher_: BaseLauncherSerialized):
             try:
-                seriallauncher.validate()
+                seriallauncher_.validate()
             except AssertionError as error:
-                print(
-                    f"ERROR | Cannot validate launcher '{seriallauncher.identifier}' from profile '{profile.identifier}': "
-                    f"{error}",
-                    file=sys.stderr,
-                )
-                sys.exit(1)
-            unserialized = seriallauncher.unserialize()
-            launchers.append(unserialized)
+                _exit_invalid(seriallauncher_, error)
+
+        if self._config.cli_validate_all_launchers:
+            for seriallauncher in launchers_list:
+                _validate(seriallauncher)
 
-        # try to filter launcher by priorities a first time
-        if len(launchers) > 1:
+        # select the launcher by priority before resolving it, as resolving is expensive
+        if len(launchers_list) > 1:
             launcher_by_priority = {}
-            for launcher in launchers:
-                launcher_by_priority.setdefault(launcher.priority, []).append(launcher)
+            for seriallauncher in launchers_list:
+                try:
+                    priority = seriallauncher.get_priority()
+                except AssertionError as error:
+                    _exit_invalid(seriallauncher, error)
+                launcher_by_priority.setdefault(priority, []).append(seriallauncher)
             priorities = sorted(list(launcher_by_priority))
             highest_priority = priorities[-1]
-            launchers = launcher_by_priority[highest_priority]
+            launchers_list = launcher_by_priority[highest_priority]
 
         # conclude that user request / priorities were not enough to only have one launcher left
-        if len(launchers) > 1:
-            issues = ",".join([launcher.name for launcher in launchers])
+        if len(launchers_list) > 1:
+            issues = ",".join([launcher_.identifier for launcher_ in launchers_list])
             print(
                 f"ERROR | Multiple launcher with same priority found: '{issues}'."
                 f" You need to specify a launcher name with --launcher"
@@ -285,9 +345,31 @@ class RunParser(BaseParser):
             )
             sys.exit(111)
 
-        launcher: BaseLauncher = launchers[0]
+        seriallauncher: BaseLauncherSerialized = launchers_list[0]
+        _validate(seriallauncher)
+        try:
+            with PathCache(workers=self._config.io_workers):
+                launcher: BaseLauncher = seriallauncher.unserialize()
+        except (EnvironCycleError, ValueError) as error:
+            print(
+                f"ERROR | Cannot resolve launcher '{seriallauncher.identifier}' from profile '{profile.identifier}': "
+                f"{error}",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+
         command = self.command or None
 
+        # clean old sessions while the launcher is running
+        if self.session_root:
+            kloch.session.start_session_cleanup(
+                root=self.session_root,
+                lifetime=self._config.cli_session_dir_lifetime,
+                interval=self._config.cli_session_cleanup_interval,
+                time_budget=_SESSION_CLEANUP_TIME_BUDGET,
+                index=self._config.cli_session_index,
+            )
+
         LOGGER.debug(f"executing launcher={launcher} with command={command}")
         print(f"starting launcher {launcher.name}")
         sys.exit(launcher.execute(tmpdir=session_dir.path, command=command))
@@ -299,7 +381,10 @@ class RunParser(BaseParser):
                 session_dir = SessionDirectory.initialize(Path(tmp_dir))
                 return self._execute(session_dir=session_dir)
         else:
-            session_dir = SessionDirectory.initialize(session_root)
+            session_dir = SessionDirectory.initialize(
+                session_root,
+                index=self._config.cli_session_index,
+            )
             return self._execute(session_dir=session_dir)
 
     @classmethod
@@ -344,41 +429,84 @@ class ListParser(BaseParser):
         """
         return self._args.id_filter
 
+    @property
+    def output_format(self) -> str:
+        """
+        Format of the listed profiles:
+
+        - text: human-readable list of identifiers
+        - json: a single json list of profiles
+        - ndjson: one json profile per line
+
+        Profiles are output as dict with an "identifier", "version" and "path" key.
+        """
+        return self._args.format
+
+    @property
+    def logs_to_stderr(self) -> bool:
+        return self.output_format != "text"
+
     def execute(self):
+        is_text = self.output_format == "text"
         profile_locations = self.profile_roots
         profile_locations_txt = [str(path) for path in profile_locations]
-        print(
-            f"Searching {len(profile_locations)} locations: {profile_locations_txt} ..."
-        )
+        if is_text:
+            print(
+                f"Searching {len(profile_locations)} locations: {profile_locations_txt} ..."
+            )
 
-        profile_paths = kloch.get_all_profile_file_paths(profile_locations)
-        profiles: List[kloch.EnvironmentProfile] = []
+        resolver = self.profile_resolver
+        profile_paths = resolver.get_all_profile_paths()
+        profiles: List[Tuple[Path, kloch.EnvironmentProfile]] = []
 
         LOGGER.debug(f"searching profile locations {profile_locations}")
+        # only the metadata is needed, which is read concurrently for all files
+        resolver.prefetch(profile_paths, headers_only=True)
         for path in profile_paths:
             try:
                 profile = kloch.read_profile_from_file(
                     path,
-                    profile_locations=profile_locations,
+                    resolver=resolver,
+                    lazy=True,
                 )
             except Exception as error:
                 print(f"WARNING | {path}: {error}", file=sys.stderr)
                 continue
-            profiles.append(profile)
+            profiles.append((path, profile))
 
-        profile_ids = [profile.identifier for profile in profiles]
+        self._save_profile_index()
 
         if self.id_filter:
             pattern = re.compile(self.id_filter)
-            original_profile_count = len(profile_ids)
-            profile_ids = [
-                profile_id for profile_id in profile_ids if pattern.match(profile_id)
+            original_profile_count = len(profiles)
+            profiles = [
+                (path, profile)
+                for path, profile in profiles
+                if pattern.match(profile.identifier)
             ]
-            print(
-                f"Filter <{self.id_filter}> specified, reduced listed profiles from "
-                f"{original_profile_count} to {len(profile_ids)} profiles."
-            )
+            if is_text:
+                print(
+                    f"Filter <{self.id_filter}> specified, reduced listed profiles from "
+                    f"{original_profile_count} to {len(profiles)} profiles."
+                )
 
+        if not is_text:
+            serialized = [
+                {
+                    "identifier": profile.identifier,
+                    "version": profile.version,
+                    "path": str(path),
+                }
+                for path, profile in profiles
+            ]
+            if self.output_format == "ndjson":
+                for profile_dict in serialized:
+                    print(json.dumps(profile_dict, default=str))
+            else:
+                print(json.dumps(serialized, default=str))
+            return
+
+        profile_ids = [profile.identifier for _, profile in profiles]
         profile_ids_txt = ":\n- " + "\n- ".join(profile_ids) if profile_ids else "."
         message = f"Found {len(profile_ids)} valid profiles{profile_ids_txt}"
         print(message)
@@ -393,6 +521,61 @@ class ListParser(BaseParser):
             default=None,
             help=cls.id_filter.__doc__,
         )
+        parser.add_argument(
+            "--format",
+            choices=["text", "json", "ndjson"],
+            default="text",
+            help=cls.output_format.__doc__,
+        )
+
+
+def _read_resolve_batch(
+    batch: str,
+    default_context: Optional[LauncherContext],
+) -> List[Tuple[List[str], Optional[LauncherContext]]]:
+    """
+    Read the profile combinations to resolve from the given yaml or json batch file.
+
+    Raises:
+        ValueError: if the file is not valid yaml or its structure is invalid.
+    """
+    # XXX: imported here as yaml is slow to import and only needed by this command
+    import yaml
+    from kloch._utils import yaml_load
+
+    try:
+        if batch == "-":
+            content = yaml_load(sys.stdin)
+        else:
+            with open(batch, "r", encoding="utf-8") as file:
+                content = yaml_load(file)
+    except yaml.YAMLError as error:
+        raise ValueError(f"invalid yaml: {error}") from error
+
+    if not isinstance(content, list):
+        raise ValueError(f"batch must be a list of combinations, got {type(content)}")
+
+    requests = []
+    for index, entry in enumerate(content):
+        if not isinstance(entry, dict) or not isinstance(entry.get("profiles"), list):
+            raise ValueError(
+                f"combination {index} must be a dict with a 'profiles' list"
+            )
+
+        profile_ids = [str(profile_id) for profile_id in entry["profiles"]]
+        if not profile_ids:
+            raise ValueError(f"combination {index} must have at least one profile")
+
+        context = default_context
+        if "context" in entry:
+            serialized_context = entry["context"]
+            context = None
+            if serialized_context is not None:
+                context = LauncherContext.from_dict(serialized_context)
+
+        requests.append((profile_ids, context))
+
+    return requests
 
 
 class ResolveParser(BaseParser):
@@ -418,27 +601,109 @@ class ResolveParser(BaseParser):
         """
         return self._args.skip_context_filtering
 
+    @property
+    def batch(self) -> Optional[str]:
+        """
+        Filesystem path to a yaml or json file listing multiple profile combinations
+        to resolve in a single execution, or "-" to read it from the standard input.
+
+        The file is a list of dict with a "profiles" key (list of profile identifiers)
+        and an optional "context" key (dict like {"os": "linux", "user": "demo"},
+        or null to skip the context filtering).
+
+        Each resolved combination is output as a yaml document, in the same order,
+        or as a json line with ``--format json``.
+        """
+        return self._args.batch
+
+    @property
+    def output_format(self) -> str:
+        """
+        Format of the resolved profile printed, json is faster to parse for other tools.
+        """
+        return self._args.format
+
+    @property
+    def logs_to_stderr(self) -> bool:
+        return True
+
     def execute(self):
         context = LauncherContext.create_from_system()
         if self.skip_context_filtering:
             context = None
+
+        if self.batch:
+            self._execute_batch(context)
+            return
+
+        if not self.profile_ids:
+            print("ERROR | No profile identifier specified.", file=sys.stderr)
+            sys.exit(1)
+
         profile = self._get_merged_profile(self.profile_ids, context)
 
         try:
-            serialized = kloch.filesyntax.serialize_profile(profile)
+            serialized = kloch.filesyntax.serialize_profile(
+                profile,
+                resolver=self.profile_resolver,
+                output_format=self.output_format,
+            )
         except kloch.filesyntax.ProfileInheritanceError as error:
             print(f"ERROR | {error}", file=sys.stderr)
             sys.exit(1)
 
         print(serialized)
 
+    def _execute_batch(self, default_context: Optional[LauncherContext]):
+        try:
+            requests = _read_resolve_batch(self.batch, default_context)
+        except (OSError, ValueError, KeyError) as error:
+            print(f"ERROR | invalid batch '{self.batch}': {error}", file=sys.stderr)
+            sys.exit(1)
+
+        if self.profile_ids:
+            # profiles given as arguments are resolved as the first combination
+            requests.insert(0, (self.profile_ids, default_context))
+
+        failed = 0
+        for profile_ids, context in requests:
+            try:
+                profile = self.profile_resolver.resolve_profiles(
+                    profile_ids,
+                    context=context,
+                )
+                serialized = kloch.filesyntax.serialize_profile(
+                    profile,
+                    output_format=self.output_format,
+                )
+            except (
+                kloch.filesyntax.ProfileIdentifierError,
+                kloch.filesyntax.ProfileAPIVersionError,
+                kloch.filesyntax.ProfileInheritanceError,
+            ) as error:
+                print(f"ERROR | {profile_ids}: {error}", file=sys.stderr)
+                # keep one document per combination
+                serialized = "null"
+                failed += 1
+
+            if self.output_format == "json":
+                # one json document per line
+                sys.stdout.write(serialized + "\n")
+            else:
+                sys.stdout.write("---\n" + serialized.rstrip("\n") + "\n")
+            sys.stdout.flush()
+
+        self._save_profile_index()
+        if failed:
+            sys.exit(1)
+
     @classmethod
     def add_to_parser(cls, parser: argparse.ArgumentParser):
         super().add_to_parser(parser)
         parser.add_argument(
             "profile_ids",
             type=str,
-            nargs="+",
+            nargs="*",
             help=cls.profile_ids.__doc__,
         )
         parser.add_argument(
@@ -446,6 +711,51 @@ class ResolveParser(BaseParser):
             action="store_true",
             help=cls.skip_context_filtering.__doc__,
         )
+        parser.add_argument(
+            "--batch",
+            type=str,
+            default=None,
+            help=cls.batch.__doc__,
+        )
+        parser.add_argument(
+            "--format",
+            choices=kloch.filesyntax.SERIALIZATION_FORMATS,
+            default="yaml",
+            help=cls.output_format.__doc__,
+        )
+
+
+def _run_python_file(file_path: str, user_args: List[str]):
+    LOGGER.debug(f"about to run '{file_path}' with args={user_args}")
+    # we can set it without restoring because we sys.exit anyway
+    sys.argv = [str(file_path)] + user_args
+
+    runpy.run_path(str(file_path), run_name="__main__")
+    sys.exit()
+
+
+def _get_python_call(argv: List[str]) -> Optional[Tuple[str, List[str]]]:
+    """
+    Return the file and its arguments if the given arguments are a plain "python" command.
+
+    Used to run the file without going through the whole CLI initialization,
+    as the command is called by the PythonLauncher at every launch.
+
+    Returns:
+        None if the arguments use any option and must be parsed by argparse.
+    """
+    if "--" in argv or any(arg.startswith("-") for arg in argv):
+        return None
+
+    if argv and argv[0] == "python":
+        argv = argv[1:]
+    # XXX: internal feature for the PythonLauncher, see get_cli
+    elif not (argv and argv[0] and Path(argv[0]).exists()):
+        return None
+
+    if not argv:
+        return None
+    return argv[0], argv[1:]
 
 
 class PythonParser(BaseParser):
@@ -469,12 +779,7 @@ class PythonParser(BaseParser):
         return self._args.user_args
 
     def execute(self):
-        LOGGER.debug(f"about to run '{self.file_path}' with args={self.user_args}")
-        # we can set it without restoring because we sys.exit anyway
-        sys.argv = [str(self.file_path)] + self.user_args
-
-        runpy.run_path(str(self.file_path), run_name="__main__")
-        sys.exit()
+        _run_python_file(self.file_path, self.user_args)
 
     @classmethod
     def add_to_parser(cls, parser: argparse.ArgumentParser):
@@ -557,6 +862,83 @@ class RawFormatter(argparse.HelpFormatter):
         return text
 
 
+class DaemonParser(BaseParser):
+    """
+    A "daemon" sub-command.
+    """
+
+    @property
+    def socket_path(self) -> Optional[Path]:
+        """
+        Filesystem path to the unix socket to listen on.
+
+        Default to the ``daemon_socket`` configuration key.
+        """
+        return Path(self._args.socket) if self._args.socket else None
+
+    def execute(self):
+        socket_path = self.socket_path or self._config.daemon_socket
+        if not socket_path:
+            print(
+                "ERROR | No socket path specified with --socket or "
+                "with the daemon_socket configuration key.",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+
+        cache = None
+        if self._config.cache_dir:
+            cache_root = self._config.cache_dir / _PROFILE_CACHE_DIRNAME
+            cache = kloch.filesyntax.MergedProfileCache(cache_root)
+        profile_daemon = kloch.daemon.ProfileDaemon(
+            index=self.profile_index,
+            cache=cache,
+            io_workers=self._config.io_workers,
+            watcher=kloch.filesyntax.create_profile_watcher([]),
+        )
+        try:
+            server = kloch.daemon.create_server(socket_path, profile_daemon)
+        except kloch.daemon.DaemonError as error:
+            profile_daemon.watcher.close()
+            print(f"ERROR | {error}", file=sys.stderr)
+            sys.exit(1)
+
+        # warm the resolver of the configured profile roots before the first request
+        profile_locations = [path.absolute() for path in self.profile_roots]
+        profile_daemon.get_resolver(profile_locations).get_all_profile_paths()
+        self._save_profile_index()
+
+        def _stop(signum, frame):
+            # exit through the finally block below so the socket and stamp are removed
+            raise SystemExit()
+
+        signal.signal(signal.SIGTERM, _stop)
+
+        print(f"listening on '{socket_path}' (ctrl+c to stop) ...")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            if socket_path.exists():
+                socket_path.unlink()
+            profile_daemon.watcher.close()
+            if profile_daemon.index.stamp:
+                profile_daemon.index.stamp.clear()
+        sys.exit()
+
+    @classmethod
+    def add_to_parser(cls, parser: argparse.ArgumentParser):
+        super().add_to_parser(parser)
+        parser.add_argument(
+            "--socket",
+            type=str,
+            default=None,
+            help=cls.socket_path.__doc__,
+        )
+
+
 def _get_parser() -> argparse.ArgumentParser:
     """
     The argparse ArgumentParser that build the CLI
@@ -610,6 +992,15 @@ def _get_parser() -> argparse.ArgumentParser:
         description="List information about the currently registred plugins.",
     )
     PluginsParser.add_to_parser(subparser)
+
+    subparser = subparsers.add_parser(
+        "daemon",
+        description=(
+            "Keep the profiles in memory in a long-running process, so the "
+            "run and resolve commands can retrieve them faster."
+        ),
+    )
+    DaemonParser.add_to_parser(subparser)
     return parser
 
 
@@ -645,15 +1036,6 @@ def get_cli(
     setattr(args, _ARGS_USER_COMMAND_DEST, user_command)
     parser_class: Type[BaseParser] = args.func
     instance: BaseParser = parser_class(args, config, argv)
-
-    # clean old sessions everytime the cli is launched
-    if instance.session_root and instance.session_root.exists():
-        cleaned = kloch.session.clean_outdated_session_dirs(
-            root=instance.session_root,
-            lifetime=config.cli_session_dir_lifetime,
-        )
-        LOGGER.debug(f"removed {len(cleaned)} outdated session dirs")
-
     return instance
 
 
@@ -664,6 +1046,11 @@ def run_cli(argv: Optional[List[str]] = None):
     Args:
         argv: command line arguments; from sys.argv if not provided
     """
+    # fast path skipping the config, logging and session initialization
+    python_call = _get_python_call(argv or sys.argv[1:])
+    if python_call:
+        _run_python_file(*python_call)
+
     config = kloch.get_config()
     cli = kloch.get_cli(argv, config=config)
     log_level = logging.DEBUG if cli.debug else config.cli_logging_default_level
@@ -672,7 +1059,9 @@ def run_cli(argv: Optional[List[str]] = None):
 
     logging.root.setLevel(logging.DEBUG)
 
-    handler = logging.StreamHandler(stream=sys.stdout)
+    # keep the output of commands like `resolve` parsable
+    stream = sys.stderr if cli.logs_to_stderr else sys.stdout
+    handler = logging.StreamHandler(stream=stream)
     handler.setLevel(log_level)
     handler.setFormatter(formatter)
     logging.root.addHandler(handler)
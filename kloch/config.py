@@ -12,10 +12,9 @@ from typing import Optional
 from typing import TypeVar
 from typing import Union
 
-import yaml
-
 from kloch.constants import Environ
 from kloch._utils import expand_envvars
+from kloch._utils import yaml_load
 
 LOGGER = logging.getLogger(__name__)
 
@@ -30,6 +29,10 @@ def _cast_list_split(src_str: str) -> List[str]:
     return src_str.split(",")
 
 
+def _cast_bool(src_str: str) -> bool:
+    return src_str.strip().lower() in ("1", "true", "yes", "on")
+
+
 def _cast_path(src_str: str) -> Path:
     return Path(src_str)
 
@@ -151,8 +154,9 @@ class KlochConfig:
         metadata={
             "documentation": (
                 "Amount in hours before a session directory must be deleted.\n"
-                "Note the deleting is performed only the next time kloch is started so it "
-                "is possible a session directory exist longer if kloch is not launched for a while."
+                "Note the deleting is performed in the background by the next ``run`` "
+                "command so it is possible a session directory exist longer if kloch "
+                "is not launched for a while."
             ),
             "config_cast": _make_config_caster(float),
             "environ": Environ.CONFIG_CLI_SESSION_LIFETIME,
@@ -160,6 +164,52 @@ class KlochConfig:
         },
     )
 
+    cli_session_cleanup_interval: float = dataclasses.field(
+        default=1.0,
+        metadata={
+            "documentation": (
+                "Minimal amount in hours between 2 deletions of the outdated session "
+                "directories, shared by all kloch processes using the same session directory.\n"
+                "A value of 0 delete the outdated session directories at every ``run`` command."
+            ),
+            "config_cast": _make_config_caster(float),
+            "environ": Environ.CONFIG_CLI_SESSION_CLEANUP_INTERVAL,
+            "environ_cast": float,
+        },
+    )
+
+    cli_session_index: bool = dataclasses.field(
+        default=False,
+        metadata={
+            "documentation": (
+                "If true, keep an index of the session directories in the session "
+                "directory so outdated ones are found without listing it, which is "
+                "faster when it contains a large amount of sessions on a network filesystem.\n"
+                "Must be enabled for all kloch processes using the same session directory, "
+                "as sessions created without the index are not deleted until the index file is removed.\n"
+                "If specified from the environment, ``1``, ``true``, ``yes`` or ``on`` enable it."
+            ),
+            "config_cast": _make_config_caster(bool),
+            "environ": Environ.CONFIG_CLI_SESSION_INDEX,
+            "environ_cast": _cast_bool,
+        },
+    )
+
+    cli_validate_all_launchers: bool = dataclasses.field(
+        default=False,
+        metadata={
+            "documentation": (
+                "If true, the ``run`` command validate all the launchers of the profile "
+                "instead of only the one selected to be launched, so invalid launchers are "
+                "reported even if not used.\n"
+                "If specified from the environment, ``1``, ``true``, ``yes`` or ``on`` enable it."
+            ),
+            "config_cast": _make_config_caster(bool),
+            "environ": Environ.CONFIG_CLI_VALIDATE_ALL_LAUNCHERS,
+            "environ_cast": _cast_bool,
+        },
+    )
+
     profile_roots: List[Path] = dataclasses.field(
         default_factory=list,
         metadata={
@@ -175,13 +225,62 @@ class KlochConfig:
         },
     )
 
+    cache_dir: Optional[Path] = dataclasses.field(
+        default=None,
+        metadata={
+            "documentation": (
+                "Filesystem path to a directory that might exists.\n"
+                "The directory is used to persist data between kloch executions "
+                "so they can run faster, like the index of all profiles found in "
+                "the profile roots or the profiles with their inheritance resolved.\n"
+                "If not specified, no cache is persisted."
+            ),
+            "config_cast": _cast_config_path,
+            "environ": Environ.CONFIG_CACHE_DIR,
+            "environ_cast": _cast_path,
+        },
+    )
+
+    io_workers: int = dataclasses.field(
+        default=8,
+        metadata={
+            "documentation": (
+                "Maximum number of threads used to read profile files concurrently.\n"
+                "Increasing it speed up the discovery of a large amount of profiles "
+                "stored on a network filesystem.\n"
+                "A value of 1 read the files one after the other."
+            ),
+            "config_cast": _make_config_caster(int),
+            "environ": Environ.CONFIG_IO_WORKERS,
+            "environ_cast": int,
+        },
+    )
+
+    daemon_socket: Optional[Path] = dataclasses.field(
+        default=None,
+        metadata={
+            "documentation": (
+                "Filesystem path to a unix socket file that might exist.\n"
+                "The socket is created by the ``kloch daemon`` command, which keep "
+                "the profiles in memory so the ``run`` and ``resolve`` commands "
+                "can retrieve them faster.\n"
+                "When the daemon is not running, the commands resolve the profiles "
+                "themselves.\n"
+                "If not specified, the daemon is never used."
+            ),
+            "config_cast": _cast_config_path,
+            "environ": Environ.CONFIG_DAEMON_SOCKET,
+            "environ_cast": _cast_path,
+        },
+    )
+
     @classmethod
     def from_file(cls, file_path: Path) -> "KlochConfig":
         """
         Generate an instance from a serialized file.
         """
         with file_path.open("r", encoding="utf-8") as file:
-            asdict: Dict = yaml.safe_load(file)
+            asdict: Dict = yaml_load(file)
 
         casters = {
             field.name: field.metadata["config_cast"]
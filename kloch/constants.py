@@ -31,8 +31,24 @@ class Environ:
 
     CONFIG_CLI_SESSION_LIFETIME = f"{_KLOCH_CONFIG_PREFIX}_cli_lifetime".upper()
 
+    CONFIG_CLI_SESSION_CLEANUP_INTERVAL = (
+        f"{_KLOCH_CONFIG_PREFIX}_cli_session_cleanup_interval".upper()
+    )
+
+    CONFIG_CLI_SESSION_INDEX = f"{_KLOCH_CONFIG_PREFIX}_cli_session_index".upper()
+
+    CONFIG_CLI_VALIDATE_ALL_LAUNCHERS = (
+        f"{_KLOCH_CONFIG_PREFIX}_cli_validate_all_launchers".upper()
+    )
+
     CONFIG_PROFILE_ROOTS = f"{_KLOCH_CONFIG_PREFIX}_profile_roots".upper()
 
+    CONFIG_CACHE_DIR = f"{_KLOCH_CONFIG_PREFIX}_cache_dir".upper()
+
+    CONFIG_IO_WORKERS = f"{_KLOCH_CONFIG_PREFIX}_io_workers".upper()
+
+    CONFIG_DAEMON_SOCKET = f"{_KLOCH_CONFIG_PREFIX}_daemon_socket".upper()
+
     @classmethod
     def list_all(cls) -> List[str]:
         """
@@ -0,0 +1,350 @@
+"""
+A long-running process keeping the profiles in memory, which is queried by
+short-lived kloch commands over a unix socket.
+
+The protocol is a single json request and a single json response per connection,
+each on one line.
+"""
+
+import json
+import logging
+import os
+import socket
+import socketserver
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from kloch.filesyntax import EnvironmentProfile
+from kloch.filesyntax import MergedProfileCache
+from kloch.filesyntax import ProfileAPIVersionError
+from kloch.filesyntax import ProfileIdentifierError
+from kloch.filesyntax import ProfileIndex
+from kloch.filesyntax import ProfileInheritanceError
+from kloch.filesyntax import ProfileResolver
+from kloch.filesyntax import ProfileWatcher
+from kloch.filesyntax._cache import _is_json_compatible
+from kloch.launchers import LauncherContext
+from kloch.launchers import LauncherSerializedDict
+
+LOGGER = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = 1
+"""
+Version of the requests and responses exchanged, bumped on any incompatible change.
+"""
+
+# errors transmitted to the client, which raise them again
+_PROFILE_ERRORS = {
+    error.__name__: error
+    for error in (
+        ProfileAPIVersionError,
+        ProfileIdentifierError,
+        ProfileInheritanceError,
+    )
+}
+
+
+class DaemonError(Exception):
+    """
+    The daemon cannot be started, reached or cannot answer a request.
+    """
+
+    pass
+
+
+def is_daemon_supported() -> bool:
+    """
+    True if the current platform support unix sockets.
+    """
+    return hasattr(socket, "AF_UNIX")
+
+
+class ProfileDaemon:
+    """
+    Answer requests for resolved profiles, keeping everything read in memory between requests.
+
+    A resolver is kept for each combination of profile locations requested. Modified
+    profiles are detected by the resolver, while added or removed profiles are
+    detected by checking the profile locations on each request.
+
+    With a watcher, changes are also applied as soon as :meth:`check_changes`
+    is called, and the generation stamp of the index is bumped so short-lived
+    processes sharing the index know if they can trust it.
+
+    Args:
+        index: optional index of profiles shared by all resolvers.
+        cache: optional persistent cache of merged profiles shared by all resolvers.
+        io_workers: maximum number of threads used by resolvers to read files.
+        watcher: optional watcher of the profile locations.
+    """
+
+    def __init__(
+        self,
+        index: Optional[ProfileIndex] = None,
+        cache: Optional[MergedProfileCache] = None,
+        io_workers: int = 1,
+        watcher: Optional[ProfileWatcher] = None,
+    ):
+        self.index: ProfileIndex = index if index is not None else ProfileIndex()
+        self.cache: Optional[MergedProfileCache] = cache
+        self.io_workers: int = io_workers
+        self.watcher: Optional[ProfileWatcher] = watcher
+        self._resolvers: Dict[Tuple[Path, ...], ProfileResolver] = {}
+
+    def get_resolver(self, profile_locations: List[Path]) -> ProfileResolver:
+        """
+        Get an up-to-date resolver for the given profile locations.
+        """
+        key = tuple(profile_locations)
+        resolver = self._resolvers.get(key)
+        if resolver is None:
+            resolver = ProfileResolver(
+                profile_locations,
+                index=self.index,
+                cache=self.cache,
+                io_workers=self.io_workers,
+            )
+            self._resolvers[key] = resolver
+            if self.watcher is not None:
+                new_locations = [
+                    location
+                    for location in profile_locations
+                    if location not in self.watcher.locations
+                ]
+                if new_locations:
+                    self.watcher.add(new_locations)
+                    self._bump_stamp()
+        else:
+            resolver.refresh()
+        return resolver
+
+    def _bump_stamp(self):
+        if self.index.stamp is None or self.watcher is None:
+            return
+        try:
+            self.index.stamp.bump(self.watcher.locations)
+        except OSError as error:
+            LOGGER.warning(f"cannot write generation stamp: {error}")
+
+    def check_changes(self) -> List[Path]:
+        """
+        Forget everything read from the files reported modified by the watcher.
+
+        Returns:
+            the modified paths, empty if there is no watcher.
+        """
+        if self.watcher is None:
+            return []
+        changed = self.watcher.poll()
+        if not changed:
+            return changed
+
+        LOGGER.debug(f"profile locations modified: {changed}")
+        self.index.mark_changed(changed)
+        # bumped before the update so the index is saved with the new generation
+        self._bump_stamp()
+        self.index.update(self.watcher.locations, workers=self.io_workers)
+        try:
+            self.index.save()
+        except OSError as error:
+            LOGGER.warning(f"cannot save profile index: {error}")
+
+        for resolver in self._resolvers.values():
+            resolver.invalidate(changed)
+        return changed
+
+    def handle_request(self, request: Dict) -> Dict:
+        """
+        Answer the given deserialized request.
+
+        Returns:
+            a json-compatible response, with an ``error`` key if the request failed.
+        """
+        if request.get("version") != PROTOCOL_VERSION:
+            return {"error": f"unsupported protocol version '{request.get('version')}'"}
+
+        command = request.get("command")
+        if command == "ping":
+            return {"pid": os.getpid()}
+        if command == "resolve":
+            return self._resolve(request)
+        return {"error": f"unsupported command '{command}'"}
+
+    def _resolve(self, request: Dict) -> Dict:
+        profile_locations = [Path(path) for path in request["profile_locations"]]
+        context = request.get("context")
+        context = LauncherContext.from_dict(context) if context is not None else None
+
+        resolver = self.get_resolver(profile_locations)
+        try:
+            profile = resolver.resolve_profiles(request["profile_ids"], context=context)
+        except tuple(_PROFILE_ERRORS.values()) as error:
+            return {"error": str(error), "error_type": error.__class__.__name__}
+        finally:
+            try:
+                self.index.save()
+            except OSError as error:
+                LOGGER.warning(f"cannot save profile index: {error}")
+
+        profile_dict = {
+            "identifier": profile.identifier,
+            "version": profile.version,
+            "launchers": dict(profile.launchers),
+        }
+        if not _is_json_compatible(profile_dict):
+            return {"error": f"profile '{profile.identifier}' is not json compatible"}
+        return {"profile": profile_dict}
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    server: "DaemonServer"
+
+    # requests are served one after the other so a client sending nothing
+    # must not block the next ones for long
+    timeout = 5.0
+
+    def handle(self):
+        try:
+            line = self.rfile.readline()
+        except OSError as error:
+            LOGGER.debug(f"cannot read request: {error}")
+            return
+        try:
+            request = json.loads(line)
+            response = self.server.profile_daemon.handle_request(request)
+        except Exception as error:
+            LOGGER.exception(f"cannot answer request {line!r}")
+            response = {"error": f"{error.__class__.__name__}: {error}"}
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+if is_daemon_supported():
+
+    class DaemonServer(socketserver.UnixStreamServer):
+        """
+        Serve the requests of a :class:`ProfileDaemon` one after the other.
+        """
+
+        def __init__(self, socket_path: Path, profile_daemon: ProfileDaemon):
+            self.profile_daemon: ProfileDaemon = profile_daemon
+            super().__init__(str(socket_path), _RequestHandler)
+
+        def service_actions(self):
+            # called by serve_forever between requests, at every poll interval
+            self.profile_daemon.check_changes()
+
+else:
+    DaemonServer = None
+
+
+def create_server(socket_path: Path, profile_daemon: ProfileDaemon) -> "DaemonServer":
+    """
+    Create a server listening on the given socket, to start with ``serve_forever()``.
+
+    A leftover socket file from a daemon that is not running anymore is removed.
+
+    Raises:
+        DaemonError: if unix sockets are not supported or a daemon might already be running.
+    """
+    if not is_daemon_supported():
+        raise DaemonError("unix sockets are not supported on this platform")
+
+    if socket_path.exists():
+        try:
+            send_request(socket_path, {"command": "ping"}, timeout=1.0)
+        except DaemonError as error:
+            # a daemon busy answering another request doesn't refuse the connection
+            if not isinstance(error.__cause__, ConnectionRefusedError):
+                raise DaemonError(
+                    f"cannot check if a daemon is listening on '{socket_path}': {error}"
+                ) from error
+            LOGGER.debug(f"removing leftover socket '{socket_path}'")
+            socket_path.unlink()
+        else:
+            raise DaemonError(f"a daemon is already listening on '{socket_path}'")
+
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    # profiles might contain sensitive values only meant for the current user,
+    # so the socket is never accessible to the other users, even just after binding
+    umask = os.umask(0o177)
+    try:
+        server = DaemonServer(socket_path, profile_daemon)
+    finally:
+        os.umask(umask)
+    return server
+
+
+def send_request(socket_path: Path, request: Dict, timeout: float = 10.0) -> Dict:
+    """
+    Send the given request to the daemon listening on the given socket.
+
+    Raises:
+        DaemonError: if the daemon cannot be reached or returned an invalid response.
+    """
+    if not is_daemon_supported():
+        raise DaemonError("unix sockets are not supported on this platform")
+
+    request = dict(request, version=PROTOCOL_VERSION)
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(timeout)
+            client.connect(str(socket_path))
+            client.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            with client.makefile("rb") as file:
+                line = file.readline()
+    except OSError as error:
+        raise DaemonError(f"cannot reach daemon at '{socket_path}': {error}") from error
+
+    try:
+        response = json.loads(line)
+    except ValueError as error:
+        raise DaemonError(f"invalid response from daemon: {error}") from error
+    if not isinstance(response, dict):
+        raise DaemonError(f"invalid response from daemon: {response!r}")
+    return response
+
+
+def resolve_profiles(
+    socket_path: Path,
+    profile_ids: List[str],
+    context: Optional[LauncherContext],
+    profile_locations: List[Path],
+) -> EnvironmentProfile:
+    """
+    Ask the daemon to resolve the given profiles.
+
+    Same as :func:`kloch.filesyntax.resolve_profiles` but done by the daemon.
+
+    Raises:
+        DaemonError: if the daemon cannot be reached or failed for another
+            reason than the given profiles.
+    """
+    # file paths are relative to the client working directory
+    profile_ids = [
+        str(Path(profile_id).absolute()) if Path(profile_id).exists() else profile_id
+        for profile_id in profile_ids
+    ]
+    request = {
+        "command": "resolve",
+        "profile_ids": profile_ids,
+        "context": context.to_dict() if context is not None else None,
+        "profile_locations": [str(path.absolute()) for path in profile_locations],
+    }
+    response = send_request(socket_path, request)
+
+    if "error" in response:
+        error_class = _PROFILE_ERRORS.get(response.get("error_type"))
+        if error_class is not None:
+            raise error_class(response["error"])
+        raise DaemonError(f"cannot resolve {profile_ids}: {response['error']}")
+
+    profile_dict = response["profile"]
+    return EnvironmentProfile(
+        identifier=profile_dict["identifier"],
+        version=profile_dict["version"],
+        inherit=None,
+        launchers=LauncherSerializedDict(profile_dict["launchers"]),
+    )
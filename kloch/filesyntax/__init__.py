@@ -4,26 +4,46 @@ Serialization and unserialization of environment profile to disk.
 
 __all__ = [
     "EnvironmentProfile",
+    "GenerationStamp",
+    "LazyEnvironmentProfile",
+    "MergedProfileCache",
     "ProfileInheritanceError",
     "ProfileAPIVersionError",
     "ProfileIdentifierError",
+    "ProfileIndex",
+    "ProfileResolver",
+    "ProfileWatcher",
+    "SERIALIZATION_FORMATS",
+    "create_profile_watcher",
     "is_file_environment_profile",
     "get_profile_file_path",
     "get_all_profile_file_paths",
+    "iter_resolved_profiles",
     "read_profile_from_file",
     "read_profile_from_id",
+    "resolve_profiles",
     "serialize_profile",
     "write_profile_to_file",
 ]
 
 from ._profile import EnvironmentProfile
+from ._profile import LazyEnvironmentProfile
+from ._index import ProfileIndex
+from ._watch import GenerationStamp
+from ._watch import ProfileWatcher
+from ._watch import create_profile_watcher
+from ._cache import MergedProfileCache
 from ._io import ProfileInheritanceError
 from ._io import ProfileAPIVersionError
 from ._io import ProfileIdentifierError
+from ._io import ProfileResolver
+from ._io import SERIALIZATION_FORMATS
 from ._io import is_file_environment_profile
 from ._io import get_profile_file_path
 from ._io import get_all_profile_file_paths
 from ._io import read_profile_from_file
 from ._io import read_profile_from_id
+from ._io import resolve_profiles
+from ._io import iter_resolved_profiles
 from ._io import serialize_profile
 from ._io import write_profile_to_file
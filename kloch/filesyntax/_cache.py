@@ -0,0 +1,238 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from ._profile import EnvironmentProfile
+from ._profile import LauncherSerializedDict
+
+LOGGER = logging.getLogger(__name__)
+
+CACHE_VERSION = 2
+"""
+Version of the serialized cache entries, bumped on any incompatible change.
+"""
+
+
+def _get_signature(path: Path) -> Optional[List[int]]:
+    try:
+        path_stat = path.stat()
+    except OSError:
+        return None
+    return [path_stat.st_mtime_ns, path_stat.st_size, path_stat.st_ino]
+
+
+def _is_json_compatible(obj: Any) -> bool:
+    """
+    Return True if the given object can be converted to json and back without changes.
+    """
+    if obj is None or isinstance(obj, (str, bool, int, float)):
+        return True
+    if isinstance(obj, list):
+        return all(_is_json_compatible(item) for item in obj)
+    if isinstance(obj, dict):
+        return all(
+            isinstance(key, str) and _is_json_compatible(value)
+            for key, value in obj.items()
+        )
+    return False
+
+
+class MergedProfileCache:
+    """
+    A persistent cache of profiles with their inheritance resolved.
+
+    Each profile is stored as a json file, along the stat values of all the
+    files in its inheritance chain and of the profile locations, and the file
+    each inherited identifier resolved to. A cached profile is only returned if
+    none of those changed.
+
+    The cache is bounded to ``max_entries`` files: the least recently used
+    entries are deleted when a new one is written.
+
+    Args:
+        root: filesystem path to a directory that might exist, used to store the cache.
+        max_entries: maximum number of profiles to keep cached.
+    """
+
+    def __init__(self, root: Path, max_entries: int = 1000):
+        self.root: Path = root
+        self.max_entries: int = max_entries
+
+    def _get_entry_path(self, file_path: Path, profile_locations: List[Path]) -> Path:
+        key = "\n".join(
+            [str(file_path.absolute())]
+            + [str(location.absolute()) for location in profile_locations]
+        )
+        key = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return self.root / f"{key}.json"
+
+    def get(
+        self,
+        file_path: Path,
+        profile_locations: List[Path],
+        get_profile_paths: Optional[Callable[[str], List[Path]]] = None,
+    ) -> Optional[EnvironmentProfile]:
+        """
+        Retrieve the merged profile of the given file if it has been cached and is still valid.
+
+        Args:
+            file_path: filesystem path to a profile file that might exist.
+            profile_locations: profile locations used to resolve the profile inheritance.
+            get_profile_paths:
+                optional callable returning the files with the given profile identifier,
+                like :meth:`ProfileResolver.get_profile_paths`. Used to check each
+                inherited identifier still resolves to the same file, which is not
+                reflected by the stat values of the profile locations when another
+                file is edited to declare the same identifier.
+
+        Returns:
+            a new profile instance without inheritance, or None if there is no valid cache.
+        """
+        cached = self.get_with_sources(file_path, profile_locations, get_profile_paths)
+        return cached[0] if cached else None
+
+    def get_with_sources(
+        self,
+        file_path: Path,
+        profile_locations: List[Path],
+        get_profile_paths: Optional[Callable[[str], List[Path]]] = None,
+    ) -> Optional[Tuple[EnvironmentProfile, List[Path], List[Optional[List[int]]]]]:
+        """
+        Same as :meth:`get` but also return the files the cached profile was built from.
+
+        Returns:
+            tuple of ``(profile, sources, signatures)`` where sources include the files of
+            the inheritance chain and the profile locations, and signatures their
+            stat values when the profile was cached, or None if there is no valid cache.
+        """
+        entry_path = self._get_entry_path(file_path, profile_locations)
+        try:
+            with entry_path.open("r", encoding="utf-8") as file:
+                entry: Dict = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get("version") != CACHE_VERSION:
+            return None
+
+        for source, signature in entry["sources"]:
+            if _get_signature(Path(source)) != signature:
+                LOGGER.debug(f"outdated cache for '{file_path}': '{source}' changed")
+                return None
+
+        if get_profile_paths is not None:
+            for identifier, inherit_path in entry["inherits"]:
+                if get_profile_paths(identifier) != [Path(inherit_path)]:
+                    LOGGER.debug(
+                        f"outdated cache for '{file_path}': "
+                        f"'{identifier}' doesn't resolve to '{inherit_path}'"
+                    )
+                    return None
+
+        # mark the entry as recently used for pruning
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+
+        profile_dict = entry["profile"]
+        profile_dict["launchers"] = LauncherSerializedDict(profile_dict["launchers"])
+        sources = [Path(source) for source, _ in entry["sources"]]
+        signatures = [signature for _, signature in entry["sources"]]
+        return EnvironmentProfile.from_dict(profile_dict), sources, signatures
+
+    def set(
+        self,
+        file_path: Path,
+        profile_locations: List[Path],
+        profile: EnvironmentProfile,
+        sources: List[Path],
+        signatures: Optional[List[Optional[List[int]]]] = None,
+        inherits: Optional[List[Tuple[str, Path]]] = None,
+    ) -> bool:
+        """
+        Cache the given merged profile.
+
+        Args:
+            file_path: filesystem path to the profile file the merged profile is from.
+            profile_locations: profile locations used to resolve the profile inheritance.
+            profile: the profile with its inheritance resolved.
+            sources: filesystem path to all the files of the inheritance chain.
+            signatures:
+                stat values of the sources followed by the profile locations, taken
+                before they were read. If not specified they are taken now, which
+                misses modifications happening since the files were read.
+            inherits:
+                list of ``("inherited identifier", "file path it resolved to")``
+                for each inheritance of the chain.
+
+        Returns:
+            True if the profile could be cached.
+        """
+        profile_dict = profile.to_dict()
+        profile_dict.pop("inherit", None)
+        profile_dict["launchers"] = dict(profile_dict["launchers"])
+        if not _is_json_compatible(profile_dict):
+            LOGGER.debug(f"cannot cache '{file_path}': not json compatible")
+            return False
+
+        sources = sources + profile_locations
+        if signatures is None:
+            signatures = [_get_signature(source) for source in sources]
+        entry = {
+            "version": CACHE_VERSION,
+            "sources": [
+                (str(source), signature)
+                for source, signature in zip(sources, signatures)
+            ],
+            "inherits": [
+                (identifier, str(inherit_path))
+                for identifier, inherit_path in inherits or []
+            ],
+            "profile": profile_dict,
+        }
+        entry_path = self._get_entry_path(file_path, profile_locations)
+        self.root.mkdir(parents=True, exist_ok=True)
+        # write then rename so concurrent processes never read a partial file
+        tmp_path = entry_path.with_name(f"{entry_path.name}.{os.getpid()}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as file:
+            json.dump(entry, file)
+        os.replace(tmp_path, entry_path)
+        self.prune()
+        return True
+
+    def prune(self):
+        """
+        Delete the least recently used entries until there is at most ``max_entries``.
+        """
+        entries = []
+        try:
+            with os.scandir(self.root) as scanned:
+                for entry in scanned:
+                    if not entry.name.endswith(".json"):
+                        continue
+                    try:
+                        entries.append((entry.stat().st_mtime_ns, entry.path))
+                    except OSError:
+                        continue
+        except OSError:
+            return
+
+        if len(entries) <= self.max_entries:
+            return
+
+        entries.sort()
+        for _, entry_path in entries[: len(entries) - self.max_entries]:
+            try:
+                os.remove(entry_path)
+            except OSError:
+                # already deleted by a concurrent process
+                pass
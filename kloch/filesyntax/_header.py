@@ -0,0 +1,187 @@
+import dataclasses
+import logging
+import re
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import Optional
+
+import yaml
+import yaml.resolver
+
+from kloch._utils import yaml_load
+
+LOGGER = logging.getLogger(__name__)
+
+# XXX: keep in sync with `_io.KENV_PROFILE_MAGIC`
+_PROFILE_MAGIC = "kloch_profile"
+
+_HEADER_KEYS = ("__magic__", "identifier", "version", "inherit")
+
+_KEY_REGEX = re.compile(
+    r"^(?P<key>[^\s:#'\"][^:#]*?|'[^']*'|\"[^\"\\]*\")\s*:(?:\s+(?P<value>.*))?$"
+)
+
+# characters which make a value not a plain single-line scalar
+_AMBIGUOUS_VALUE_PREFIXES = tuple("|>&*!%@`?-")
+# characters which start a value that may span on multiple lines
+_FLOW_VALUE_PREFIXES = tuple("\"'{[")
+# lines of a document that cannot be understood as a simple top-level key
+_AMBIGUOUS_LINE_PREFIXES = ("%", "---", "...", "{", "[", "?", "&", "*", "!", "- ")
+
+_YAML_RESOLVER = yaml.resolver.Resolver()
+
+_STR_TAG = "tag:yaml.org,2002:str"
+_INT_TAG = "tag:yaml.org,2002:int"
+
+
+class _AmbiguousHeader(Exception):
+    pass
+
+
+@dataclasses.dataclass
+class ProfileHeader:
+    """
+    The root keys of a profile file that can be read without parsing its whole content.
+    """
+
+    magic: str
+    identifier: Optional[str]
+    version: Optional[Any]
+    inherit: Optional[str]
+
+
+def _parse_plain_value(value: str) -> Any:
+    """
+    Convert the given single-line plain scalar to the python object PyYAML would build.
+    """
+    value = value.split(" #", 1)[0].strip()
+    if value.startswith(_AMBIGUOUS_VALUE_PREFIXES) or ": " in value:
+        raise _AmbiguousHeader(f"value '{value}' is not a plain scalar")
+
+    tag = _YAML_RESOLVER.resolve(yaml.ScalarNode, value, (True, False))
+    if tag == _STR_TAG:
+        return value
+    # yaml 1.1 consider numbers starting with 0 as octal
+    if tag == _INT_TAG and value.isdigit() and not value.startswith("0"):
+        return int(value)
+    # let PyYAML handle the less common types (bool, null, float, timestamp, ...)
+    return yaml_load(value)
+
+
+def _sniff_header(file_path: Path) -> Dict[str, Any]:
+    """
+    Extract the header keys from the top-level keys of the given yaml file
+    without building the document.
+
+    The file is read line by line and reading stops as soon as all the header keys
+    are found.
+
+    Raises:
+        _AmbiguousHeader: if the file syntax is too complex to be understood by this function.
+
+    Returns:
+        mapping of header keys found in the file, might be empty.
+    """
+    header = {}
+    # header key whose plain value could continue on the next lines
+    multiline_key: Optional[str] = None
+    content_started = False
+
+    with file_path.open("r", encoding="utf-8") as file:
+        for line in file:
+            stripped = line.rstrip("\r\n").lstrip("\ufeff")
+            if not stripped.strip() or stripped.lstrip().startswith("#"):
+                continue
+
+            if stripped[0] in (" ", "\t"):
+                # continuation of the previous top-level value
+                if multiline_key:
+                    raise _AmbiguousHeader(
+                        f"'{multiline_key}' value span multiple lines"
+                    )
+                continue
+
+            if stripped == "---" and not content_started:
+                content_started = True
+                continue
+
+            if not header and stripped.startswith(("- ", "-")) and not content_started:
+                # the document is a sequence, not a mapping
+                return {}
+            content_started = True
+
+            if stripped.startswith(_AMBIGUOUS_LINE_PREFIXES):
+                raise _AmbiguousHeader(f"unsupported line '{stripped}'")
+
+            match = _KEY_REGEX.match(stripped)
+            if not match:
+                raise _AmbiguousHeader(f"unsupported line '{stripped}'")
+
+            key = match.group("key")
+            if key[0] in ("'", '"'):
+                key = key[1:-1]
+            value = (match.group("value") or "").strip()
+
+            is_header_key = key in _HEADER_KEYS
+            multiline_key = None
+
+            if value.startswith(_FLOW_VALUE_PREFIXES):
+                # make sure it doesn't continue on the next line
+                try:
+                    parsed = yaml_load(value)
+                except yaml.YAMLError:
+                    raise _AmbiguousHeader(f"'{key}' value span multiple lines")
+            elif not is_header_key:
+                continue
+            elif not value or value.startswith("#"):
+                raise _AmbiguousHeader(f"'{key}' value is not on the same line")
+            else:
+                parsed = _parse_plain_value(value)
+                multiline_key = key
+
+            if not is_header_key:
+                continue
+            if key in header:
+                raise _AmbiguousHeader(f"'{key}' is defined multiple times")
+
+            header[key] = parsed
+            if len(header) == len(_HEADER_KEYS):
+                break
+
+    return header
+
+
+def read_profile_header(file_path: Path) -> Optional[ProfileHeader]:
+    """
+    Extract the header of the given file if it is a profile.
+
+    Only the top-level keys are read, the whole yaml document is only parsed
+    as a fallback when its syntax is too complex to be sniffed.
+
+    Args:
+        file_path: filesystem path to an existing yaml file.
+
+    Returns:
+        None if the file is not a profile.
+    """
+    try:
+        header = _sniff_header(file_path)
+    except _AmbiguousHeader as error:
+        LOGGER.debug(f"fallback to full parsing of '{file_path}': {error}")
+        with file_path.open("r", encoding="utf-8") as file:
+            content = yaml_load(file)
+        if not isinstance(content, dict):
+            return None
+        header = {key: content[key] for key in _HEADER_KEYS if key in content}
+
+    magic = header.get("__magic__")
+    if not isinstance(magic, str) or not magic.startswith(_PROFILE_MAGIC):
+        return None
+
+    return ProfileHeader(
+        magic=magic,
+        identifier=header.get("identifier"),
+        version=header.get("version"),
+        inherit=header.get("inherit"),
+    )
@@ -0,0 +1,351 @@
+import dataclasses
+import json
+import logging
+import os
+import stat
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from kloch._utils import map_threaded
+from ._header import read_profile_header
+from ._watch import GenerationStamp
+
+LOGGER = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+"""
+Version of the serialized index structure, bumped on any incompatible change.
+"""
+
+
+def _read_profile_identifier(file_path: Path) -> Optional[str]:
+    """
+    Return the identifier of the given file if it is a profile else None.
+    """
+    header = read_profile_header(file_path)
+    if header is None:
+        return None
+
+    if header.identifier is None:
+        LOGGER.warning(f"ignoring profile '{file_path}' with no identifier")
+    return header.identifier
+
+
+@dataclasses.dataclass
+class _IndexedFile:
+    """
+    A file found in a profile root, with the stat values it had when it was parsed.
+    """
+
+    mtime: int
+    size: int
+    inode: int
+    identifier: Optional[str]
+    """
+    None if the file is not a profile.
+    """
+
+    @property
+    def signature(self) -> Tuple[int, int, int]:
+        return self.mtime, self.size, self.inode
+
+
+@dataclasses.dataclass
+class _IndexedRoot:
+    """
+    A profile root directory, with the stat values it had when it was listed.
+    """
+
+    mtime: int
+    files: Dict[str, _IndexedFile]
+    """
+    Mapping of {"file name": "indexed file"}, preserving the directory listing order.
+    """
+
+
+_MISSING_ROOT_MTIME = -2
+"""
+Mtime of indexed roots which didn't exist when listed.
+"""
+
+
+def _stat(path: Path) -> Optional[os.stat_result]:
+    try:
+        return path.stat()
+    except OSError:
+        return None
+
+
+def _get_signature(file_stat: os.stat_result) -> Tuple[int, int, int]:
+    return file_stat.st_mtime_ns, file_stat.st_size, file_stat.st_ino
+
+
+class ProfileIndex:
+    """
+    A mapping of profile identifiers to their file on disk, that can be persisted
+    between executions.
+
+    The index is updated incrementally: a root directory is only listed again if
+    its mtime changed, and a file is only parsed again if its mtime, size or inode
+    changed.
+
+    When a generation stamp is given, only the mtime of the roots is checked if
+    the stamp didn't change since the last update, meaning a watcher process
+    didn't report any change in the profile roots. The root mtimes catch the files
+    added or removed by other hosts on network filesystems, which a watcher cannot see,
+    but not files modified in place by them.
+
+    Args:
+        path:
+            filesystem path to a file that might exist, used to persist the index.
+            If None the index only live in memory.
+        stamp: optional generation stamp written by a process watching the profile roots.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        stamp: Optional[GenerationStamp] = None,
+    ):
+        self.path: Optional[Path] = path
+        self.stamp: Optional[GenerationStamp] = stamp
+        self.generation: Optional[str] = None
+        """
+        The generation stamp at the moment of the last update.
+        """
+        self._roots: Dict[str, _IndexedRoot] = {}
+        # mapping of {"root": {"identifier": ["file name", ...]}} derived from `_roots`
+        self._identifiers: Dict[str, Dict[str, List[str]]] = {}
+        self._dirty: bool = False
+
+    @classmethod
+    def load(
+        cls,
+        path: Path,
+        stamp: Optional[GenerationStamp] = None,
+    ) -> "ProfileIndex":
+        """
+        Generate an instance from a file previously written with :meth:`save`.
+
+        An empty index is returned if the file doesn't exist or cannot be used.
+
+        Args:
+            path: filesystem path to a file that might exist.
+            stamp: optional generation stamp written by a process watching the profile roots.
+        """
+        instance = cls(path, stamp=stamp)
+        if not path.exists():
+            return instance
+
+        try:
+            with path.open("r", encoding="utf-8") as file:
+                asdict: Dict = json.load(file)
+        except (OSError, ValueError) as error:
+            LOGGER.debug(f"ignoring unreadable profile index '{path}': {error}")
+            return instance
+
+        if asdict.get("version") != INDEX_VERSION:
+            LOGGER.debug(f"ignoring outdated profile index '{path}'")
+            return instance
+
+        for root, root_dict in asdict["roots"].items():
+            files = {
+                name: _IndexedFile(**file_dict)
+                for name, file_dict in root_dict["files"].items()
+            }
+            instance._set_root(
+                root, _IndexedRoot(mtime=root_dict["mtime"], files=files)
+            )
+        instance.generation = asdict.get("generation")
+
+        return instance
+
+    def save(self):
+        """
+        Write the index to its file on disk if it has been modified since loaded.
+
+        The parent directory is created if it doesn't exist.
+        """
+        if not self.path or not self._dirty:
+            return
+
+        asdict = {
+            "version": INDEX_VERSION,
+            "generation": self.generation,
+            "roots": {
+                root: dataclasses.asdict(indexed)
+                for root, indexed in self._roots.items()
+            },
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # write then rename so concurrent processes never read a partial file
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as file:
+            json.dump(asdict, file)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+        LOGGER.debug(f"saved profile index to '{self.path}'")
+
+    def update(self, locations: List[Path], workers: int = 1):
+        """
+        Ensure the index reflects the current state of the given profile roots.
+
+        Args:
+            locations: list of filesystem path to directory that might exist
+            workers: maximum number of threads used to stat and parse files.
+        """
+        # read before updating so changes happening during the update are not missed
+        generation = self.stamp.read(locations) if self.stamp else None
+        if generation is not None and generation == self.generation:
+            # a single stat per root in case the watcher missed changes
+            locations = [
+                location
+                for location in locations
+                if not self._is_root_unchanged(location)
+            ]
+
+        for location in locations:
+            self._update_root(location, workers=workers)
+
+        if generation != self.generation:
+            self.generation = generation
+            self._dirty = True
+
+    def mark_changed(self, paths: List[Path]):
+        """
+        Force the given profile files or profile roots to be read again by the next update.
+
+        Args:
+            paths: filesystem path to files or profile roots, like reported by a watcher.
+        """
+        for path in paths:
+            indexed = self._roots.get(str(path))
+            if indexed is not None:
+                indexed.mtime = -1
+                continue
+            indexed = self._roots.get(str(path.parent))
+            indexed_file = indexed.files.get(path.name) if indexed else None
+            if indexed_file is not None:
+                indexed_file.mtime = -1
+        self.generation = None
+        self._dirty = True
+
+    def _is_root_unchanged(self, root: Path) -> bool:
+        indexed = self._roots.get(str(root))
+        if indexed is None:
+            return False
+        root_stat = _stat(root)
+        if root_stat is None:
+            return indexed.mtime == _MISSING_ROOT_MTIME
+        return indexed.mtime == root_stat.st_mtime_ns
+
+    def _update_root(self, root: Path, workers: int = 1):
+        key = str(root)
+        indexed = self._roots.get(key)
+
+        try:
+            root_stat = root.stat()
+        except OSError:
+            # still recorded so the root is known to be up-to-date
+            if indexed is None or indexed.mtime != _MISSING_ROOT_MTIME:
+                self._set_root(key, _IndexedRoot(mtime=_MISSING_ROOT_MTIME, files={}))
+                self._dirty = True
+            return
+
+        root_mtime = root_stat.st_mtime_ns
+        if indexed is not None and indexed.mtime == root_mtime:
+            names = list(indexed.files)
+        else:
+            names = [path.name for path in root.glob("*.yml")]
+            self._dirty = True
+
+        file_stats = map_threaded(_stat, [root / name for name in names], workers)
+
+        files: Dict[str, _IndexedFile] = {}
+        outdated: List[str] = []
+        for name, file_stat in zip(names, file_stats):
+            if file_stat is None:
+                self._dirty = True
+                continue
+            if not stat.S_ISREG(file_stat.st_mode):
+                continue
+
+            signature = _get_signature(file_stat)
+            previous = indexed.files.get(name) if indexed else None
+            if previous and previous.signature == signature:
+                files[name] = previous
+                continue
+
+            # placeholder to preserve the listing order
+            files[name] = _IndexedFile(*signature, identifier=None)
+            outdated.append(name)
+
+        if outdated:
+            LOGGER.debug(f"indexing {len(outdated)} files in '{root}'")
+            identifiers = map_threaded(
+                _read_profile_identifier,
+                [root / name for name in outdated],
+                workers,
+            )
+            for name, identifier in zip(outdated, identifiers):
+                files[name].identifier = identifier
+            self._dirty = True
+
+        self._set_root(key, _IndexedRoot(mtime=root_mtime, files=files))
+
+    def _set_root(self, key: str, indexed: _IndexedRoot):
+        identifiers = {}
+        for name, indexed_file in indexed.files.items():
+            if indexed_file.identifier is not None:
+                identifiers.setdefault(indexed_file.identifier, []).append(name)
+        self._roots[key] = indexed
+        self._identifiers[key] = identifiers
+
+    def get_profile_paths(self, locations: List[Path]) -> List[Path]:
+        """
+        Get all the profile file paths indexed for the given locations.
+
+        The index is expected to have been updated for those locations first.
+        """
+        return [
+            location / name
+            for location in locations
+            for name, indexed_file in self._get_files(location).items()
+            if indexed_file.identifier is not None
+        ]
+
+    def get_identifier_paths(
+        self,
+        profile_id: str,
+        locations: List[Path],
+    ) -> List[Path]:
+        """
+        Get the profile file paths with the given identifier, indexed for the given locations.
+
+        The index is expected to have been updated for those locations first.
+        """
+        return [
+            location / name
+            for location in locations
+            for name in self._identifiers.get(str(location), {}).get(profile_id, [])
+        ]
+
+    def get_identifiers(self, locations: List[Path]) -> List[Tuple[str, Path]]:
+        """
+        Get the identifier and file path of all the profiles indexed for the given locations.
+
+        The index is expected to have been updated for those locations first.
+        """
+        return [
+            (indexed_file.identifier, location / name)
+            for location in locations
+            for name, indexed_file in self._get_files(location).items()
+            if indexed_file.identifier is not None
+        ]
+
+    def _get_files(self, location: Path) -> Dict[str, _IndexedFile]:
+        indexed = self._roots.get(str(location))
+        return indexed.files if indexed else {}
@@ -1,14 +1,26 @@
+import json
 import logging
 from pathlib import Path
 from typing import Dict
+from typing import Iterable
+from typing import Iterator
 from typing import List
 from typing import Optional
-
-import yaml
-
+from typing import Tuple
+
+from kloch._dictmerge import copy_tree
+from kloch._utils import map_threaded
+from kloch._utils import yaml_dump
+from kloch._utils import yaml_load
+from kloch.launchers import LauncherContext
+from ._cache import MergedProfileCache
+from ._cache import _get_signature
+from ._header import ProfileHeader
+from ._header import read_profile_header
+from ._index import ProfileIndex
 from ._profile import LauncherSerializedDict
 from ._profile import EnvironmentProfile
-
+from ._profile import LazyEnvironmentProfile
 
 LOGGER = logging.getLogger(__name__)
 
@@ -16,6 +28,11 @@ LOGGER = logging.getLogger(__name__)
 KENV_PROFILE_MAGIC = "kloch_profile"
 KENV_PROFILE_VERSION = 4
 
+SERIALIZATION_FORMATS = ("yaml", "json")
+"""
+Formats a profile can be serialized to with :func:`serialize_profile`.
+"""
+
 
 class ProfileAPIVersionError(Exception):
     """
@@ -51,40 +68,30 @@ def is_file_environment_profile(file_path: Path) -> bool:
     if not file_path.suffix == ".yml":
         return False
 
-    with file_path.open("r", encoding="utf-8") as file:
-        content = yaml.safe_load(file)
+    return read_profile_header(file_path) is not None
 
-    if not content:
-        return False
-
-    return content.get("__magic__", "").startswith(KENV_PROFILE_MAGIC)
 
-
-def get_all_profile_file_paths(locations: Optional[List[Path]] = None) -> List[Path]:
+def get_all_profile_file_paths(
+    locations: Optional[List[Path]] = None,
+    index: Optional[ProfileIndex] = None,
+) -> List[Path]:
     """
     Get all the environment-profile file paths as registred by the user.
 
     Args:
         locations: list of filesystem path to directory that might exist
+        index:
+            optional index of profiles to use instead of parsing every file found
+            in the locations. It is updated to reflect the locations state.
     """
-    locations = locations or []
-    return [
-        path
-        for location in locations
-        for path in location.glob("*.yml")
-        if is_file_environment_profile(path)
-    ]
-
-
-def _get_profile_identifier(file_path: Path) -> str:
-    with file_path.open("r", encoding="utf-8") as file:
-        asdict: Dict = yaml.safe_load(file)
-    return asdict["identifier"]
+    resolver = ProfileResolver(locations, index=index)
+    return resolver.get_all_profile_paths()
 
 
 def get_profile_file_path(
     profile_id: str,
     profile_locations: Optional[List[Path]] = None,
+    index: Optional[ProfileIndex] = None,
 ) -> List[Path]:
     """
     Get the filesystem location to the profile(s) with the given name.
@@ -93,51 +100,295 @@ def get_profile_file_path(
         profile_id: identifier that must match returned profiles.
         profile_locations:
             list of filesystem path to potential existing directories containing profiles.
+        index:
+            optional index of profiles to use instead of parsing every file found
+            in the locations. It is updated to reflect the locations state.
 
     Returns:
         list of filesystem path to existing files . Might be empty.
     """
-    profile_paths = get_all_profile_file_paths(locations=profile_locations)
-    profiles: List[Path] = [
-        path for path in profile_paths if _get_profile_identifier(path) == profile_id
-    ]
-    return profiles
+    resolver = ProfileResolver(profile_locations, index=index)
+    return resolver.get_profile_paths(profile_id)
 
 
-def read_profile_from_file(
-    file_path: Path,
-    profile_locations: Optional[List[Path]] = None,
-) -> EnvironmentProfile:
+def _check_profile_magic(magic: str):
+    profile_version = int(magic.split(":")[-1])
+    if not profile_version == KENV_PROFILE_VERSION:
+        raise ProfileAPIVersionError(
+            f"Cannot read profile with version <{profile_version}> while current "
+            f"API version is <{KENV_PROFILE_VERSION}>."
+        )
+
+
+class ProfileResolver:
     """
-    Generate an instance from a serialized file on disk.
+    Share the discovery and parsing of profiles between multiple io operations.
 
-    Raises:
-        ProfileAPIVersionError:
-        ProfileInheritanceError:
+    Profile locations are only scanned once, each file is only parsed once and each
+    profile read is memoized by its file path, which make the resolver a snapshot
+    of the profile locations at the moment they were first accessed. The profiles
+    returned are copies of the memoized ones, so they can be modified freely.
+
+    The exception are merged profiles from :meth:`get_merged_profile`: they are
+    memoized along the stat values of the files they are built from, and the
+    resolver forget everything it read from a file when it is found modified.
 
     Args:
-        file_path:
-            filesystem path to an existing valid profile file.
         profile_locations:
             list of filesystem path to potential existing directories containing profiles.
+        index: optional index of profiles to scan the locations faster.
+        cache:
+            optional persistent cache of merged profiles, used to skip reading
+            and merging profiles in :meth:`get_merged_profile`.
+        io_workers:
+            maximum number of threads used to read files concurrently when scanning
+            the locations or in :meth:`prefetch`.
     """
-    with file_path.open("r", encoding="utf-8") as file:
-        asdict: Dict = yaml.safe_load(file)
 
-    profile_version = int(asdict["__magic__"].split(":")[-1])
-    if not profile_version == KENV_PROFILE_VERSION:
-        raise ProfileAPIVersionError(
-            f"Cannot read profile with version <{profile_version}> while current "
-            f"API version is <{KENV_PROFILE_VERSION}>."
-        )
-    del asdict["__magic__"]
-
-    super_name: Optional[str] = asdict.get("inherit", None)
-    if super_name:
-        super_paths = get_profile_file_path(
-            super_name,
-            profile_locations=profile_locations,
-        )
+    def __init__(
+        self,
+        profile_locations: Optional[List[Path]] = None,
+        index: Optional[ProfileIndex] = None,
+        cache: Optional[MergedProfileCache] = None,
+        io_workers: int = 1,
+    ):
+        self.profile_locations: List[Path] = profile_locations or []
+        self.index: Optional[ProfileIndex] = index
+        self.cache: Optional[MergedProfileCache] = cache
+        self.io_workers: int = io_workers
+
+        # list of ("identifier", "file path") in discovery order, built on first access
+        self._profile_paths: Optional[List[Tuple[str, Path]]] = None
+        # stat values of each profile location at the moment they were scanned
+        self._location_signatures: List = []
+        # mapping of {"identifier": ["file path", ...]} derived from `_profile_paths`
+        self._identifiers: Dict[str, List[Path]] = {}
+        # file content parsed once, consumed by `read_profile`
+        self._contents: Dict[Path, Dict] = {}
+        # stat values of each file taken just before its content was read
+        self._signatures: Dict[Path, Optional[List[int]]] = {}
+        self._profiles: Dict[Path, EnvironmentProfile] = {}
+        self._headers: Dict[Path, Optional[ProfileHeader]] = {}
+        # mapping of {"profile path": "inherited profile path"}
+        self._inherit_paths: Dict[Path, Optional[Path]] = {}
+        # mapping of {"profile path": ("source paths", "source signatures", "merged profile")}
+        self._merged: Dict[Path, Tuple[List[Path], List, EnvironmentProfile]] = {}
+
+    def _scan(self) -> List[Tuple[str, Path]]:
+        if self._profile_paths is not None:
+            return self._profile_paths
+
+        # taken before scanning so changes happening during the scan are not missed
+        self._location_signatures = [
+            _get_signature(location) for location in self.profile_locations
+        ]
+
+        if self.index is not None:
+            self.index.update(self.profile_locations, workers=self.io_workers)
+            profile_paths = self.index.get_identifiers(self.profile_locations)
+
+        else:
+            paths = [
+                path
+                for location in self.profile_locations
+                for path in location.glob("*.yml")
+            ]
+            headers = map_threaded(read_profile_header, paths, self.io_workers)
+            self._headers.update(zip(paths, headers))
+            profile_paths = []
+            for path, header in zip(paths, headers):
+                if header is None:
+                    continue
+                if header.identifier is None:
+                    LOGGER.warning(f"ignoring profile '{path}' with no identifier")
+                    continue
+                profile_paths.append((header.identifier, path))
+
+        for identifier, path in profile_paths:
+            self._identifiers.setdefault(identifier, []).append(path)
+        self._profile_paths = profile_paths
+        return profile_paths
+
+    def refresh(self) -> bool:
+        """
+        Forget everything read from the profile locations if files were added or removed from them.
+
+        Modified profile files are already detected by :meth:`get_merged_profile`;
+        this is intended for long-lived resolvers which must also find new profiles.
+
+        Returns:
+            True if a profile location changed since it was scanned.
+        """
+        if self._profile_paths is None:
+            return False
+
+        changed = [
+            location
+            for location, signature in zip(
+                self.profile_locations, self._location_signatures
+            )
+            if _get_signature(location) != signature
+        ]
+        if changed:
+            LOGGER.debug(f"profile locations modified since scanned: {changed}")
+            self._forget(changed)
+        return bool(changed)
+
+    def invalidate(self, paths: List[Path]):
+        """
+        Forget everything read from the given modified files or profile locations.
+
+        The profile locations are scanned again on next access, which is
+        cheap when an index is used.
+
+        Args:
+            paths: filesystem path to files or profile locations, like reported by a watcher.
+        """
+        self._forget(paths)
+        self._profile_paths = None
+        self._identifiers.clear()
+
+    def read_content(self, file_path: Path) -> Dict:
+        """
+        Get the raw content of the given file, parsing it only once.
+
+        Args:
+            file_path: filesystem path to an existing yaml file.
+        """
+        content = self._contents.get(file_path)
+        if content is None:
+            # taken before reading so modifications happening meanwhile are not missed
+            signature = _get_signature(file_path)
+            with file_path.open("r", encoding="utf-8") as file:
+                content = yaml_load(file)
+            self._contents[file_path] = content
+            self._signatures[file_path] = signature
+        return content
+
+    def read_header(self, file_path: Path) -> Optional[ProfileHeader]:
+        """
+        Get the header of the given file, reading it only once.
+
+        Args:
+            file_path: filesystem path to an existing yaml file.
+
+        Returns:
+            None if the file is not a profile.
+        """
+        if file_path not in self._headers:
+            self._headers[file_path] = read_profile_header(file_path)
+        return self._headers[file_path]
+
+    def prefetch(self, file_paths: List[Path], headers_only: bool = False):
+        """
+        Parse the given files concurrently so they are not parsed when read later.
+
+        Files that cannot be parsed are ignored, so the error is raised when
+        they are actually read.
+
+        Args:
+            file_paths: filesystem path to existing yaml files.
+            headers_only:
+                only read the file headers, intended to be used before :meth:`read_lazy_profile`.
+        """
+        if headers_only:
+            file_paths = [
+                path for path in dict.fromkeys(file_paths) if path not in self._headers
+            ]
+
+            def _read_header(file_path: Path) -> Optional[ProfileHeader]:
+                try:
+                    return read_profile_header(file_path)
+                except Exception as error:
+                    LOGGER.debug(f"cannot prefetch '{file_path}': {error}")
+                    return None
+
+            headers = map_threaded(_read_header, file_paths, self.io_workers)
+            for file_path, header in zip(file_paths, headers):
+                if header is not None:
+                    self._headers[file_path] = header
+            return
+
+        file_paths = [
+            path
+            for path in dict.fromkeys(file_paths)
+            if path not in self._contents and path not in self._profiles
+        ]
+
+        def _load(file_path: Path) -> Tuple[Optional[List[int]], Optional[Dict]]:
+            signature = _get_signature(file_path)
+            try:
+                with file_path.open("r", encoding="utf-8") as file:
+                    return signature, yaml_load(file)
+            except Exception as error:
+                LOGGER.debug(f"cannot prefetch '{file_path}': {error}")
+                return signature, None
+
+        loaded = map_threaded(_load, file_paths, self.io_workers)
+        for file_path, (signature, content) in zip(file_paths, loaded):
+            if content is not None:
+                self._contents[file_path] = content
+                self._signatures[file_path] = signature
+
+    def get_all_profile_paths(self) -> List[Path]:
+        """
+        Get all the environment-profile file paths found in the profile locations.
+        """
+        return [path for _, path in self._scan()]
+
+    def get_profile_paths(self, profile_id: str) -> List[Path]:
+        """
+        Get the filesystem location to the profile(s) with the given identifier.
+
+        Returns:
+            list of filesystem path to existing files . Might be empty.
+        """
+        self._scan()
+        return list(self._identifiers.get(profile_id, []))
+
+    def read_profile(self, file_path: Path) -> EnvironmentProfile:
+        """
+        Get the profile instance serialized in the given file, reading it only once.
+
+        See :func:`read_profile_from_file` for details.
+
+        Returns:
+            a new profile instance, which doesn't affect the resolver when modified.
+        """
+        return _copy_profile(self._read_profile(file_path))
+
+    def _read_profile(self, file_path: Path) -> EnvironmentProfile:
+        """
+        Get the memoized profile, which must not be modified.
+        """
+        profile = self._profiles.get(file_path)
+        if profile is not None:
+            return profile
+
+        # shallow copy as we modify the root keys
+        asdict: Dict = dict(self.read_content(file_path))
+
+        _check_profile_magic(asdict["__magic__"])
+        del asdict["__magic__"]
+
+        super_name: Optional[str] = asdict.get("inherit", None)
+        if super_name:
+            super_path = self._get_super_path(super_name, file_path)
+            super_profile = self._read_profile(super_path)
+            asdict["inherit"] = super_profile
+            self._inherit_paths[file_path] = super_path
+
+        launchers = LauncherSerializedDict(asdict["launchers"])
+        asdict["launchers"] = launchers
+
+        profile = EnvironmentProfile.from_dict(asdict)
+        self._profiles[file_path] = profile
+        # the content is now owned by the profile, no need to keep it
+        self._contents.pop(file_path, None)
+        return profile
+
+    def _get_super_path(self, super_name: str, file_path: Path) -> Path:
+        super_paths = self.get_profile_paths(super_name)
         if len(super_paths) >= 2:
             raise ProfileInheritanceError(
                 f"Found multiple profile with identifier '{super_name}' "
@@ -148,23 +399,332 @@ def read_profile_from_file(
                 f"No profile found with identifier '{super_name}' "
                 f"specified from profile '{file_path}'."
             )
+        return super_paths[0]
+
+    def read_lazy_profile(self, file_path: Path) -> LazyEnvironmentProfile:
+        """
+        Get the profile serialized in the given file, only reading its header.
+
+        The ``inherit`` and ``launchers`` attributes are read on first access, which
+        is also when the errors related to them are raised.
+
+        See :func:`read_profile_from_file` for details.
+
+        Returns:
+            a new profile instance, which doesn't affect the resolver when modified.
+        """
+        header = self.read_header(file_path)
+        if header is None:
+            raise ProfileAPIVersionError(f"File '{file_path}' is not a profile.")
+        _check_profile_magic(header.magic)
+
+        def _load_inherit() -> Optional[EnvironmentProfile]:
+            if not header.inherit:
+                return None
+            super_path = self._get_super_path(header.inherit, file_path)
+            self._inherit_paths[file_path] = super_path
+            return self.read_lazy_profile(super_path)
+
+        def _load_launchers() -> LauncherSerializedDict:
+            eager_profile = self._profiles.get(file_path)
+            if eager_profile is not None:
+                return copy_tree(eager_profile.launchers)
+            launchers = self.read_content(file_path)["launchers"]
+            return LauncherSerializedDict(copy_tree(launchers))
+
+        return LazyEnvironmentProfile(
+            identifier=header.identifier,
+            version=header.version,
+            load_inherit=_load_inherit,
+            load_launchers=_load_launchers,
+        )
+
+    def get_inheritance_paths(self, file_path: Path) -> List[Path]:
+        """
+        Get the file paths of the given profile and of all the profiles it inherits.
+
+        The profile must have been read first.
+
+        Returns:
+            list of filesystem paths, starting with the given one.
+        """
+        paths = []
+        current_path: Optional[Path] = file_path
+        while current_path is not None:
+            paths.append(current_path)
+            current_path = self._inherit_paths.get(current_path)
+        return paths
+
+    def get_profile_path(self, profile_id: str) -> Path:
+        """
+        Get the file of the given profile identifier or file path.
+
+        Raises:
+            ProfileIdentifierError: if no or multiple profiles match the identifier.
+
+        Args:
+            profile_id: identifier of a profile or filesystem path to an existing profile file.
+        """
+        if Path(profile_id).exists():
+            return Path(profile_id)
+
+        profile_paths = self.get_profile_paths(profile_id)
+        if len(profile_paths) >= 2:
+            raise ProfileIdentifierError(
+                f"Found multiple profile with identifier '{profile_id}' "
+                f": {profile_paths}."
+            )
+        if not profile_paths:
+            raise ProfileIdentifierError(
+                f"No profile found with identifier '{profile_id}'."
+            )
+        return profile_paths[0]
+
+    def resolve_profiles(
+        self,
+        profile_ids: List[str],
+        context: Optional[LauncherContext] = None,
+    ) -> EnvironmentProfile:
+        """
+        Merge each profile with its base then merge all of them from left to right.
+
+        See :func:`resolve_profiles` for details.
+        """
+        profiles = [
+            self.get_merged_profile(self.get_profile_path(profile_id))
+            for profile_id in profile_ids
+        ]
+
+        profile = profiles[-1]
+        if len(profiles) > 1:
+            launchers = LauncherSerializedDict.merge_many(
+                [base_profile.launchers for base_profile in profiles]
+            )
+            profile = EnvironmentProfile(
+                identifier=profile.identifier,
+                version=profile.version,
+                inherit=None,
+                launchers=launchers,
+            )
+
+        if context:
+            LOGGER.debug(f"filtering profile using context {context}")
+            profile.launchers = profile.launchers.get_filtered_context(context)
+            profile.launchers = profile.launchers.with_context_resolved()
+
+        return profile
+
+    def get_merged_profile(self, file_path: Path) -> EnvironmentProfile:
+        """
+        Get the profile serialized in the given file with its inheritance resolved.
 
-        super_profile = read_profile_from_file(
-            file_path=super_paths[0],
-            profile_locations=profile_locations,
+        Merged profiles are memoized so profiles sharing the same ancestors only
+        merge them once. They are also persisted in the cache when specified,
+        so unchanged profiles are not read nor merged again by the next process.
+
+        See :func:`read_profile_from_file` for the possible errors.
+
+        Returns:
+            a new profile instance without inheritance.
+        """
+        merged = self._get_merged_profile(file_path)
+        return EnvironmentProfile(
+            identifier=merged.identifier,
+            version=merged.version,
+            inherit=None,
+            launchers=copy_tree(merged.launchers),
         )
-        asdict["inherit"] = super_profile
 
-    launchers = LauncherSerializedDict(asdict["launchers"])
-    asdict["launchers"] = launchers
+    def _get_merged_profile(self, file_path: Path) -> EnvironmentProfile:
+        """
+        Get the memoized merged profile, which must not be modified.
+        """
+        memoized = self._merged.get(file_path)
+        if memoized is not None:
+            sources, signatures, profile = memoized
+            changed = [
+                source
+                for source, signature in zip(sources, signatures)
+                if _get_signature(source) != signature
+            ]
+            if not changed:
+                return profile
+            LOGGER.debug(f"profile sources modified since read: {changed}")
+            self._forget(changed)
+
+        if self.cache is not None:
+            cached = self.cache.get_with_sources(
+                file_path,
+                self.profile_locations,
+                get_profile_paths=self.get_profile_paths,
+            )
+            if cached is not None:
+                LOGGER.debug(f"using cached merged profile for '{file_path}'")
+                profile, sources, signatures = cached
+                self._memoize_merged(file_path, profile, sources, signatures)
+                return profile
+
+        profile = self._read_profile(file_path)
+        launchers = profile.launchers
+        super_path = self._inherit_paths.get(file_path)
+        if super_path is not None:
+            super_profile = self._get_merged_profile(super_path)
+            launchers = super_profile.launchers + launchers
+
+        profile = EnvironmentProfile(
+            identifier=profile.identifier,
+            version=profile.version,
+            inherit=None,
+            launchers=launchers,
+        )
+        sources = self.get_inheritance_paths(file_path)
+        signatures = self._get_read_signatures(sources + self.profile_locations)
+        self._memoize_merged(
+            file_path,
+            profile,
+            sources + self.profile_locations,
+            signatures=signatures,
+        )
 
-    profile = EnvironmentProfile.from_dict(asdict)
-    return profile
+        if self.cache is not None:
+            inherits = [
+                (self._read_profile(inherit_path).identifier, inherit_path)
+                for inherit_path in sources[1:]
+            ]
+            try:
+                self.cache.set(
+                    file_path,
+                    self.profile_locations,
+                    profile=profile,
+                    sources=sources,
+                    signatures=signatures,
+                    inherits=inherits,
+                )
+            except OSError as error:
+                LOGGER.warning(f"cannot cache merged profile '{file_path}': {error}")
+
+        return profile
+
+    def _get_read_signatures(self, paths: List[Path]) -> List[Optional[List[int]]]:
+        """
+        Get the stat values the given files or profile locations had when they were read.
+        """
+        location_signatures = {}
+        if len(self._location_signatures) == len(self.profile_locations):
+            location_signatures = dict(
+                zip(self.profile_locations, self._location_signatures)
+            )
+        signatures = []
+        for path in paths:
+            if path in self._signatures:
+                signatures.append(self._signatures[path])
+            elif path in location_signatures:
+                signatures.append(location_signatures[path])
+            else:
+                signatures.append(_get_signature(path))
+        return signatures
+
+    def _memoize_merged(
+        self,
+        file_path: Path,
+        profile: EnvironmentProfile,
+        sources: List[Path],
+        signatures: List[Optional[List[int]]],
+    ):
+        """
+        Args:
+            signatures: stat values of the sources at the moment they were read.
+        """
+        self._merged[file_path] = (sources, signatures, profile)
+
+    def _forget(self, paths: List[Path]):
+        """
+        Remove everything read from the given paths, and from the profiles inheriting them.
+
+        Forget everything if one of the path is a profile location.
+        """
+        if any(path in self.profile_locations for path in paths):
+            self._profile_paths = None
+            self._identifiers.clear()
+            self._contents.clear()
+            self._signatures.clear()
+            self._profiles.clear()
+            self._headers.clear()
+            self._inherit_paths.clear()
+            self._merged.clear()
+            return
+
+        paths = set(paths)
+        known_paths = set(self._profiles) | set(self._headers) | set(self._merged)
+        outdated = {
+            known_path
+            for known_path in known_paths
+            if paths.intersection(self.get_inheritance_paths(known_path))
+            or paths.intersection(self._merged.get(known_path, ([],))[0])
+        }
+        outdated.update(paths)
+        for path in outdated:
+            self._contents.pop(path, None)
+            self._signatures.pop(path, None)
+            self._profiles.pop(path, None)
+            self._headers.pop(path, None)
+            self._merged.pop(path, None)
+        for path in outdated:
+            self._inherit_paths.pop(path, None)
+
+
+def _copy_profile(profile: EnvironmentProfile) -> EnvironmentProfile:
+    """
+    Copy the given profile and all the profiles it inherits.
+    """
+    inherit = profile.inherit
+    return EnvironmentProfile(
+        identifier=profile.identifier,
+        version=profile.version,
+        inherit=_copy_profile(inherit) if inherit is not None else None,
+        launchers=copy_tree(profile.launchers),
+    )
+
+
+def read_profile_from_file(
+    file_path: Path,
+    profile_locations: Optional[List[Path]] = None,
+    index: Optional[ProfileIndex] = None,
+    resolver: Optional[ProfileResolver] = None,
+    lazy: bool = False,
+) -> EnvironmentProfile:
+    """
+    Generate an instance from a serialized file on disk.
+
+    Raises:
+        ProfileAPIVersionError:
+        ProfileInheritanceError:
+            raised on first access of the ``inherit`` attribute if ``lazy`` is True.
+
+    Args:
+        file_path:
+            filesystem path to an existing valid profile file.
+        profile_locations:
+            list of filesystem path to potential existing directories containing profiles.
+        index: optional index of profiles to find inherited profiles faster.
+        resolver:
+            optional resolver to share with other io calls, in which case
+            ``profile_locations`` and ``index`` are ignored for the resolver ones.
+        lazy:
+            if True, only read the profile metadata and defer the reading of its
+            ``inherit`` and ``launchers`` attributes to their first access.
+    """
+    resolver = resolver or ProfileResolver(profile_locations, index=index)
+    if lazy:
+        return resolver.read_lazy_profile(file_path)
+    return resolver.read_profile(file_path)
 
 
 def read_profile_from_id(
     profile_id: str,
     profile_locations: Optional[List[Path]] = None,
+    index: Optional[ProfileIndex] = None,
+    resolver: Optional[ProfileResolver] = None,
 ) -> EnvironmentProfile:
     """
     Generate a profile instance from a serialized file on disk retrieved using the given identifier.
@@ -179,40 +739,118 @@ def read_profile_from_id(
         profile_id: identifier that must match the profile.
         profile_locations:
             list of filesystem path to potential existing directories containing profiles.
+        index: optional index of profiles to find profiles faster.
+        resolver:
+            optional resolver to share with other io calls, in which case
+            ``profile_locations`` and ``index`` are ignored for the resolver ones.
 
     Returns:
         a profile instance
     """
-    profile_paths = get_profile_file_path(
-        profile_id=profile_id,
-        profile_locations=profile_locations,
-    )
-    profile = read_profile_from_file(
-        file_path=profile_paths[0],
-        profile_locations=profile_locations,
-    )
-    return profile
+    resolver = resolver or ProfileResolver(profile_locations, index=index)
+    profile_paths = resolver.get_profile_paths(profile_id)
+    return resolver.read_profile(profile_paths[0])
+
+
+def resolve_profiles(
+    profile_ids: List[str],
+    context: Optional[LauncherContext] = None,
+    profile_locations: Optional[List[Path]] = None,
+    index: Optional[ProfileIndex] = None,
+    resolver: Optional[ProfileResolver] = None,
+) -> EnvironmentProfile:
+    """
+    Merge the given profiles to a single profile, as done by the ``resolve`` command.
+
+    Each profile is merged with its base then all of them are merged from left to right.
+
+    Raises:
+        ProfileIdentifierError: if a profile cannot be found.
+        ProfileAPIVersionError:
+        ProfileInheritanceError:
+
+    Args:
+        profile_ids: one or more identifier or file paths of existing profiles.
+        context:
+            if specified, remove the launchers that doesn't match it and resolve
+            the context expressions.
+        profile_locations:
+            list of filesystem path to potential existing directories containing profiles.
+        index: optional index of profiles to find profiles faster.
+        resolver:
+            optional resolver to share with other io calls, in which case
+            ``profile_locations`` and ``index`` are ignored for the resolver ones.
+
+    Returns:
+        a new profile instance without inheritance.
+    """
+    resolver = resolver or ProfileResolver(profile_locations, index=index)
+    return resolver.resolve_profiles(profile_ids, context=context)
+
+
+def iter_resolved_profiles(
+    requests: Iterable[Tuple[List[str], Optional[LauncherContext]]],
+    profile_locations: Optional[List[Path]] = None,
+    index: Optional[ProfileIndex] = None,
+    resolver: Optional[ProfileResolver] = None,
+) -> Iterator[EnvironmentProfile]:
+    """
+    Resolve many combinations of profiles, sharing the discovery, parsing and
+    merging of profiles between all of them.
+
+    The profiles are yielded as soon as resolved so they can be streamed.
+    See :func:`resolve_profiles` for the possible errors.
+
+    Args:
+        requests: list of ``(profile identifiers, context)`` to pass to :func:`resolve_profiles`.
+        profile_locations:
+            list of filesystem path to potential existing directories containing profiles.
+        index: optional index of profiles to find profiles faster.
+        resolver:
+            optional resolver to share with other io calls, in which case
+            ``profile_locations`` and ``index`` are ignored for the resolver ones.
+    """
+    resolver = resolver or ProfileResolver(profile_locations, index=index)
+    for profile_ids, context in requests:
+        yield resolver.resolve_profiles(profile_ids, context=context)
 
 
 def serialize_profile(
     profile: EnvironmentProfile,
     profile_locations: Optional[List[Path]] = None,
+    resolver: Optional[ProfileResolver] = None,
+    output_format: str = "yaml",
 ) -> str:
     """
     Convert the instance to a serialized dictionnary intended to be written on disk.
 
     Raises:
         ProfileInheritanceError: if the inherited profile specified is not found on disk
+        ValueError: if the output format is not supported.
+
+    Args:
+        profile: profile instance to serialize
+        profile_locations:
+            list of filesystem path to potential existing directories containing profiles.
+        resolver:
+            optional resolver to share with other io calls, in which case
+            ``profile_locations`` is ignored for the resolver ones.
+        output_format:
+            one of :obj:`SERIALIZATION_FORMATS`. ``json`` is faster to parse for other
+            tools but cannot be read back as a profile file.
     """
+    if output_format not in SERIALIZATION_FORMATS:
+        raise ValueError(
+            f"Unsupported format '{output_format}'; must one of {SERIALIZATION_FORMATS}"
+        )
+
     asdict = {"__magic__": f"{KENV_PROFILE_MAGIC}:{KENV_PROFILE_VERSION}"}
     asdict.update(profile.to_dict())
 
     super_profile: Optional[EnvironmentProfile] = asdict.get("inherit", None)
     if super_profile:
-        super_path = get_profile_file_path(
-            profile_id=super_profile.identifier,
-            profile_locations=profile_locations,
-        )
+        resolver = resolver or ProfileResolver(profile_locations)
+        super_path = resolver.get_profile_paths(super_profile.identifier)
         if not super_path:
             raise ProfileInheritanceError(
                 f"Profile '{super_profile.identifier}' specified for inheritance on "
@@ -223,7 +861,10 @@ def serialize_profile(
     # remove custom class wrapper
     asdict["launchers"] = dict(asdict["launchers"])
 
-    return yaml.dump(asdict, sort_keys=False)
+    if output_format == "json":
+        # yaml can store objects like dates which json cannot
+        return json.dumps(asdict, default=str)
+    return yaml_dump(asdict, sort_keys=False)
 
 
 def write_profile_to_file(
@@ -232,6 +873,7 @@ def write_profile_to_file(
     profile_locations: Optional[List[Path]] = None,
     check_valid_id: bool = True,
     extra_comments: List[str] = None,
+    resolver: Optional[ProfileResolver] = None,
 ) -> Path:
     """
     Convert the instance to a serialized file on disk.
@@ -249,18 +891,20 @@ def write_profile_to_file(
         profile_locations:
             list of filesystem path to potential existing directories containing profiles.
         extra_comments: optional lines of comments to put in the yaml header
+        resolver:
+            optional resolver to share with other io calls, in which case
+            ``profile_locations`` is ignored for the resolver ones.
     """
+    resolver = resolver or ProfileResolver(profile_locations)
+
     if check_valid_id:
-        profile_paths = get_profile_file_path(
-            profile_id=profile.identifier,
-            profile_locations=profile_locations,
-        )
+        profile_paths = resolver.get_profile_paths(profile.identifier)
         if profile_paths and file_path not in profile_paths:
             raise ProfileIdentifierError(
                 f"Found multiple profile with identifier '{profile.identifier}'."
             )
 
-    serialized = serialize_profile(profile, profile_locations=profile_locations)
+    serialized = serialize_profile(profile, resolver=resolver)
 
     extra_comments = extra_comments or []
     extra_comments = "# " + "\n# ".join(extra_comments)
@@ -5,12 +5,13 @@ different "software launchers".
 The config system can handle the merging of 2 configs structure.
 """
 
-import copy
 import dataclasses
 from typing import Any
+from typing import Callable
 from typing import Dict
 from typing import Optional
 
+from kloch._dictmerge import copy_tree
 from kloch.launchers import LauncherSerializedDict
 
 
@@ -62,7 +63,7 @@ class EnvironmentProfile:
         if self.inherit:
             serialized["inherit"] = self.inherit
 
-        serialized["launchers"] = copy.deepcopy(self.launchers)
+        serialized["launchers"] = copy_tree(self.launchers)
         return serialized
 
     def get_merged_profile(self):
@@ -74,7 +75,13 @@ class EnvironmentProfile:
         """
         launchers = self.launchers
         if self.inherit:
-            launchers = self.inherit.get_merged_profile().launchers + launchers
+            # merge the whole inheritance chain at once, starting from the root
+            chain = []
+            profile: Optional[EnvironmentProfile] = self
+            while profile is not None:
+                chain.insert(0, profile.launchers)
+                profile = profile.inherit
+            launchers = chain[0].merge_many(chain)
 
         return EnvironmentProfile(
             identifier=self.identifier,
@@ -82,3 +89,62 @@ class EnvironmentProfile:
             inherit=None,
             launchers=launchers,
         )
+
+
+_UNLOADED = object()
+
+
+class LazyEnvironmentProfile(EnvironmentProfile):
+    """
+    A profile whose ``inherit`` and ``launchers`` attributes are only loaded on first access.
+
+    Intended for operations which only need the profile metadata, like listing
+    profiles, to not pay the cost of reading and building its whole content.
+
+    Args:
+        identifier: see :class:`EnvironmentProfile`.
+        version: see :class:`EnvironmentProfile`.
+        load_inherit: function returning the ``inherit`` attribute value.
+        load_launchers: function returning the ``launchers`` attribute value.
+    """
+
+    def __init__(
+        self,
+        identifier: str,
+        version: str,
+        load_inherit: Callable[[], Optional[EnvironmentProfile]],
+        load_launchers: Callable[[], LauncherSerializedDict],
+    ):
+        self.identifier = identifier
+        self.version = version
+        self._load_inherit = load_inherit
+        self._load_launchers = load_launchers
+        self._inherit: Any = _UNLOADED
+        self._launchers: Any = _UNLOADED
+
+    @property
+    def inherit(self) -> Optional[EnvironmentProfile]:
+        if self._inherit is _UNLOADED:
+            self._inherit = self._load_inherit()
+        return self._inherit
+
+    @inherit.setter
+    def inherit(self, value: Optional[EnvironmentProfile]):
+        self._inherit = value
+
+    @property
+    def launchers(self) -> LauncherSerializedDict:
+        if self._launchers is _UNLOADED:
+            self._launchers = self._load_launchers()
+        return self._launchers
+
+    @launchers.setter
+    def launchers(self, value: LauncherSerializedDict):
+        self._launchers = value
+
+    @property
+    def is_loaded(self) -> bool:
+        """
+        True if both the ``inherit`` and ``launchers`` attributes have been loaded.
+        """
+        return self._inherit is not _UNLOADED and self._launchers is not _UNLOADED
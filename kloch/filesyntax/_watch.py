@@ -0,0 +1,365 @@
+import abc
+import ctypes
+import ctypes.util
+import json
+import logging
+import os
+import select
+import socket
+import struct
+import sys
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+# inotify constants from <sys/inotify.h>
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+
+# events modifying the content of a file
+_FILE_EVENTS = _IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE
+# events modifying the listing of a directory
+_LISTING_EVENTS = _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+# events invalidating the directory itself
+_ROOT_EVENTS = _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_IGNORED
+
+_EVENT_STRUCT = struct.Struct("iIII")
+
+
+def _get_root_snapshot(root: Path) -> Optional[Tuple[int, Dict[str, Tuple]]]:
+    try:
+        root_mtime = root.stat().st_mtime_ns
+        files = {}
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".yml"):
+                    continue
+                entry_stat = entry.stat()
+                files[entry.name] = (
+                    entry_stat.st_mtime_ns,
+                    entry_stat.st_size,
+                    entry_stat.st_ino,
+                )
+    except OSError:
+        return None
+    return root_mtime, files
+
+
+class ProfileWatcher(abc.ABC):
+    """
+    Report the profile files and profile roots modified since the last check.
+
+    Changes are reported as a list of paths: a profile root is reported when
+    files are added or removed from it, or when the root itself is created or removed,
+    while a profile file is reported when its content is modified.
+
+    Use :func:`create_profile_watcher` to get the best implementation for the
+    current system.
+    """
+
+    def __init__(self):
+        self.locations: List[Path] = []
+
+    def add(self, locations: List[Path]):
+        """
+        Start watching the given profile roots, which might not exist.
+        """
+        for location in locations:
+            if location not in self.locations:
+                self.locations.append(location)
+                self._add(location)
+
+    def _add(self, location: Path):
+        pass
+
+    @abc.abstractmethod
+    def poll(self) -> List[Path]:
+        """
+        Get the paths modified since the last call, without blocking.
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        """
+        Release the system resources used to watch the profile roots.
+        """
+        pass
+
+
+class PollingProfileWatcher(ProfileWatcher):
+    """
+    Detect changes by comparing the stat values of the profile roots and of their files.
+
+    The files are also compared because modifying a file content doesn't
+    modify the mtime of its directory.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._snapshots: Dict[Path, Optional[Tuple[int, Dict[str, Tuple]]]] = {}
+
+    def _add(self, location: Path):
+        self._snapshots[location] = _get_root_snapshot(location)
+
+    def poll(self) -> List[Path]:
+        changed = []
+        for location in self.locations:
+            previous = self._snapshots[location]
+            snapshot = _get_root_snapshot(location)
+            self._snapshots[location] = snapshot
+            if previous == snapshot:
+                continue
+
+            if (
+                previous is None
+                or snapshot is None
+                or previous[1].keys() != snapshot[1].keys()
+            ):
+                changed.append(location)
+            if previous is None or snapshot is None:
+                continue
+
+            for name, signature in snapshot[1].items():
+                if previous[1].get(name, signature) != signature:
+                    changed.append(location / name)
+        return changed
+
+
+class InotifyProfileWatcher(ProfileWatcher):
+    """
+    Detect changes with the linux inotify api, without accessing the filesystem.
+
+    Profile roots that don't exist yet are checked for creation at each :meth:`poll`.
+
+    Raises:
+        OSError: if inotify is not available on this system.
+    """
+
+    def __init__(self):
+        super().__init__()
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on linux")
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd: int = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1 failed: {os.strerror(errno)}")
+
+        # mapping of {"watch descriptor": "profile root"}
+        self._watches: Dict[int, Path] = {}
+        # profile roots that cannot be watched because they don't exist
+        self._missing: List[Path] = []
+
+    def _add(self, location: Path):
+        if not self._add_watch(location):
+            LOGGER.debug(f"cannot watch '{location}': errno {ctypes.get_errno()}")
+            self._missing.append(location)
+
+    def _add_watch(self, location: Path) -> bool:
+        mask = _FILE_EVENTS | _LISTING_EVENTS | _ROOT_EVENTS | _IN_ONLYDIR
+        descriptor = self._libc.inotify_add_watch(
+            self._fd,
+            os.fsencode(str(location)),
+            mask,
+        )
+        if descriptor < 0:
+            return False
+        self._watches[descriptor] = location
+        return True
+
+    def poll(self) -> List[Path]:
+        changed = []
+        for location in list(self._missing):
+            if self._add_watch(location):
+                self._missing.remove(location)
+                changed.append(location)
+
+        while select.select([self._fd], [], [], 0)[0]:
+            try:
+                buffer = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            changed.extend(self._parse_events(buffer))
+
+        # preserve order but remove duplicates
+        return list(dict.fromkeys(changed))
+
+    def _parse_events(self, buffer: bytes) -> List[Path]:
+        changed = []
+        offset = 0
+        while offset < len(buffer):
+            descriptor, mask, _, length = _EVENT_STRUCT.unpack_from(buffer, offset)
+            offset += _EVENT_STRUCT.size
+            name = buffer[offset : offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & _IN_Q_OVERFLOW:
+                LOGGER.debug("inotify queue overflow, considering everything changed")
+                changed.extend(self.locations)
+                continue
+
+            location = self._watches.get(descriptor)
+            if location is None:
+                continue
+
+            if mask & _ROOT_EVENTS:
+                changed.append(location)
+                if mask & _IN_IGNORED:
+                    # the watch was removed by the kernel
+                    del self._watches[descriptor]
+                    self._missing.append(location)
+                continue
+
+            name = os.fsdecode(name)
+            if not name.endswith(".yml"):
+                continue
+            if mask & _LISTING_EVENTS:
+                changed.append(location)
+            changed.append(location / name)
+        return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def create_profile_watcher(locations: List[Path]) -> ProfileWatcher:
+    """
+    Get a watcher for the given profile roots, using inotify if available else polling.
+    """
+    try:
+        watcher = InotifyProfileWatcher()
+    except (OSError, AttributeError, TypeError) as error:
+        LOGGER.debug(f"inotify not available, polling profile roots: {error}")
+        watcher = PollingProfileWatcher()
+    watcher.add(locations)
+    return watcher
+
+
+def _is_process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _get_process_start(pid: int) -> Optional[str]:
+    """
+    Get when the given process started, to detect a pid reused by another process.
+
+    Returns:
+        an opaque string, or None if not available on this system.
+    """
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as file:
+            content = file.read()
+    except OSError:
+        return None
+    # the process name is between parentheses and might contain spaces
+    fields = content[content.rfind(b")") + 2 :].split()
+    # "starttime" is the 22nd field while the list starts at the 3rd
+    try:
+        return fields[19].decode("ascii")
+    except (IndexError, UnicodeDecodeError):
+        return None
+
+
+class GenerationStamp:
+    """
+    A file storing a counter incremented each time a watcher reports changes in the profile roots.
+
+    It allows short-lived processes to know in a single read if the profile roots
+    changed since they were last indexed, without checking every file.
+
+    The stamp is only considered valid while the process that wrote it is alive
+    (and not replaced by another process with the same pid, on linux), and only
+    for the profile roots it watches.
+
+    Args:
+        path: filesystem path to a file that might exist.
+    """
+
+    def __init__(self, path: Path):
+        self.path: Path = path
+        self._counter: int = 0
+
+    def read(self, locations: List[Path]) -> Optional[str]:
+        """
+        Get the current generation if all the given profile roots are watched.
+
+        Returns:
+            an opaque string changing at each modification, or None if the
+            stamp doesn't exist or cannot be trusted.
+        """
+        # XXX: os.kill would terminate the process on windows
+        if os.name == "nt":
+            return None
+        try:
+            with self.path.open("r", encoding="utf-8") as file:
+                asdict: Dict = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            host = asdict["host"]
+            pid = asdict["pid"]
+            watched = asdict["locations"]
+            counter = asdict["counter"]
+        except (TypeError, KeyError):
+            return None
+
+        if host != socket.gethostname() or not _is_process_alive(pid):
+            return None
+        start = asdict.get("start")
+        if start is not None and start != _get_process_start(pid):
+            return None
+        if not all(str(location.absolute()) in watched for location in locations):
+            return None
+        return f"{host}:{pid}:{counter}"
+
+    def bump(self, locations: List[Path]):
+        """
+        Declare the given watched profile roots may have changed.
+        """
+        self._counter += 1
+        asdict = {
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+            "start": _get_process_start(os.getpid()),
+            "counter": self._counter,
+            "locations": [str(location.absolute()) for location in locations],
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # write then rename so concurrent processes never read a partial file
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as file:
+            json.dump(asdict, file)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """
+        Remove the stamp, to call when stopping to watch.
+        """
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
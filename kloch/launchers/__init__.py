@@ -2,44 +2,49 @@
 Entities that serialize a function call made to execute a software.
 """
 
+import importlib
+
 from ._context import LauncherContext
 from ._context import LauncherPlatform
 
 from .base import BaseLauncher
 from .base import BaseLauncherSerialized
 from .base import BaseLauncherFields
-
-
-from .system import SystemLauncher
-from .system import SystemLauncherSerialized
-from .python import PythonLauncher
-from .python import PythonLauncherSerialized
-
-from ._plugins import check_launcher_plugins
-from ._plugins import LoadedPluginsLaunchers
-from ._plugins import load_plugin_launchers
-
-from ._get import get_available_launchers_classes
-from ._get import get_available_launchers_serialized_classes
-from ._get import is_launcher_plugin
+from .base import EnvironCycleError
+from .base import PathCache
 
 from ._serialized import LauncherSerializedDict
 from ._serialized import LauncherSerializedList
 
-_BUILTINS_LAUNCHERS = [
-    BaseLauncher,
-    SystemLauncher,
-    PythonLauncher,
-]
+# builtin launchers and plugin utilities are imported on first access as they
+# require modules that are not needed to only read profiles (subprocess, inspect, ...)
+_LAZY_ATTRIBUTES = {
+    "SystemLauncher": ".system",
+    "SystemLauncherSerialized": ".system",
+    "PythonLauncher": ".python",
+    "PythonLauncherSerialized": ".python",
+    "check_launcher_plugins": "._plugins",
+    "LoadedPluginsLaunchers": "._plugins",
+    "load_plugin_launchers": "._plugins",
+    "get_available_launchers_classes": "._get",
+    "get_available_launchers_serialized_classes": "._get",
+    "is_launcher_plugin": "._get",
+    "_BUILTINS_LAUNCHERS": "._get",
+    "_BUILTINS_LAUNCHERS_SERIALIZED": "._get",
+}
 """
-List of launchers class implementation, including the base one.
+Mapping of {"attribute name": "relative name of the module defining it"}.
 """
 
-_BUILTINS_LAUNCHERS_SERIALIZED = [
-    BaseLauncherSerialized,
-    SystemLauncherSerialized,
-    PythonLauncherSerialized,
-]
-"""
-List of serialized launchers class implementation, including the base one.
-"""
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
@@ -52,6 +52,8 @@ _PLATFORM_MAPPING = {
 Mapping of serialized platform names to their corresponding enum instance.
 """
 
+_PLATFORM_NAMES = {platform: name for name, platform in _PLATFORM_MAPPING.items()}
+
 
 @dataclasses.dataclass
 class LauncherContext:
@@ -73,6 +75,7 @@ class LauncherContext:
         default=None,
         metadata={
             "serialized_name": "os",
+            "serialize": lambda v: _PLATFORM_NAMES[v],
             "unserialize": lambda v: _PLATFORM_MAPPING[v],
             "doc": {
                 "value": f"one of ``{'``, ``'.join(_PLATFORM_MAPPING.keys())}``",
@@ -88,6 +91,7 @@ class LauncherContext:
         default=None,
         metadata={
             "serialized_name": "user",
+            "serialize": str,
             "unserialize": str,
             "doc": {
                 "value": f"arbitrary string",
@@ -119,6 +123,44 @@ class LauncherContext:
 
         return True
 
+    @classmethod
+    def from_dict(cls, serialized: Dict[str, str]) -> "LauncherContext":
+        """
+        Generate an instance from a dict of serialized field names and values.
+
+        Example::
+
+            LauncherContext.from_dict({"os": "linux", "user": "demo"})
+
+        Raises:
+            KeyError: if a key is not a supported field serialized name.
+        """
+        asdict = {}
+        for key, value in serialized.items():
+            field = _FIELDS_MAPPING.get(key)
+            if not field:
+                raise KeyError(
+                    f"Unsupported context key name '{key}'; must one of {_FIELDS_MAPPING}"
+                )
+            asdict[field.name] = field.metadata["unserialize"](value)
+        return cls(**asdict)
+
+    def to_dict(self) -> Dict[str, str]:
+        """
+        Convert the instance to a dict of serialized field names and values.
+
+        Unset fields are omitted. Reverse of :meth:`from_dict`.
+        """
+        serialized = {}
+        for field in dataclasses.fields(self):
+            value = getattr(self, field.name)
+            if value is None:
+                continue
+            serialized[field.metadata["serialized_name"]] = field.metadata["serialize"](
+                value
+            )
+        return serialized
+
     @classmethod
     def create_from_system(cls):
         """
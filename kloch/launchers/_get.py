@@ -4,14 +4,34 @@ from typing import Type
 from typing import TypeVar
 from typing import Union
 
-import kloch.launchers
 from kloch.launchers import BaseLauncher
 from kloch.launchers import BaseLauncherSerialized
+from .system import SystemLauncher
+from .system import SystemLauncherSerialized
+from .python import PythonLauncher
+from .python import PythonLauncherSerialized
 from ._plugins import LoadedPluginsLaunchers
 
-
 T = TypeVar("T")
 
+_BUILTINS_LAUNCHERS = [
+    BaseLauncher,
+    SystemLauncher,
+    PythonLauncher,
+]
+"""
+List of launchers class implementation, including the base one.
+"""
+
+_BUILTINS_LAUNCHERS_SERIALIZED = [
+    BaseLauncherSerialized,
+    SystemLauncherSerialized,
+    PythonLauncherSerialized,
+]
+"""
+List of serialized launchers class implementation, including the base one.
+"""
+
 
 def _collect_launchers(
     natives: List[Type[T]],
@@ -41,9 +61,8 @@ def get_available_launchers_classes(
     Args:
         plugins: collection of launcher loaded from plugins.
     """
-    # noinspection PyProtectedMember
     return _collect_launchers(
-        natives=kloch.launchers._BUILTINS_LAUNCHERS.copy(),
+        natives=_BUILTINS_LAUNCHERS.copy(),
         plugins=plugins,
     )
 
@@ -59,20 +78,18 @@ def get_available_launchers_serialized_classes(
     Args:
         plugins: collection of launcher loaded from plugins
     """
-    # noinspection PyProtectedMember
     return _collect_launchers(
-        natives=kloch.launchers._BUILTINS_LAUNCHERS_SERIALIZED.copy(),
+        natives=_BUILTINS_LAUNCHERS_SERIALIZED.copy(),
         plugins=plugins,
     )
 
 
-# noinspection PyProtectedMember
 def is_launcher_plugin(
-    launcher: Union[Type[BaseLauncher], Type[BaseLauncherSerialized]]
+    launcher: Union[Type[BaseLauncher], Type[BaseLauncherSerialized]],
 ) -> bool:
     """
     Return True if the given launcher is an external plugin else False if builtin.
     """
-    if launcher in kloch.launchers._BUILTINS_LAUNCHERS:
+    if launcher in _BUILTINS_LAUNCHERS:
         return False
-    return launcher not in kloch.launchers._BUILTINS_LAUNCHERS_SERIALIZED
+    return launcher not in _BUILTINS_LAUNCHERS_SERIALIZED
@@ -1,9 +1,9 @@
-import copy
 from typing import Dict
 from typing import List
 from typing import Type
 
 from kloch import MergeableDict
+from kloch._dictmerge import copy_tree
 from ._context import LauncherContext
 from ._context import unserialize_context_expression
 from ._context import resolve_context_expression
@@ -28,19 +28,21 @@ class LauncherSerializedList(List[BaseLauncherSerialized]):
         Returns:
             new instance with deepcopied structure.
         """
-        self_copy: LauncherSerializedList = copy.deepcopy(self)
-
         # extract the potential base that all launchers should inherit
-        for launcher in self_copy:
+        for launcher in self:
             if launcher.__class__ is BaseLauncherSerialized:
                 base_launcher = launcher
-                self_copy.remove(base_launcher)
                 break
         else:
-            return self_copy
+            return copy_tree(self)
 
+        # merging already return new deepcopied instances
         return LauncherSerializedList(
-            [copy.deepcopy(base_launcher) + launcher for launcher in self_copy]
+            [
+                base_launcher + launcher
+                for launcher in self
+                if launcher is not base_launcher
+            ]
         )
 
 
@@ -67,11 +69,11 @@ class LauncherSerializedDict(MergeableDict):
         Returns:
              a new deepcopied instance with possibly lesser keys.
         """
-        newdict = copy.deepcopy(self)
-        for launcher_identifier in self.keys():
+        newdict = self.__class__()
+        for launcher_identifier, launcher in self.items():
             launcher_context = unserialize_context_expression(launcher_identifier)
-            if launcher_context != context:
-                del newdict[launcher_identifier]
+            if launcher_context == context:
+                newdict[launcher_identifier] = copy_tree(launcher)
 
         return newdict
 
@@ -82,15 +84,14 @@ class LauncherSerializedDict(MergeableDict):
         toconcatenate: List[LauncherSerializedDict] = []
         for launcher_identifier in self.keys():
             resolved = resolve_context_expression(launcher_identifier)
-            newdict = LauncherSerializedDict(
-                {resolved: copy.deepcopy(self[launcher_identifier])}
-            )
+            # no copy needed as merging create a new deepcopied structure
+            newdict = LauncherSerializedDict({resolved: self[launcher_identifier]})
             toconcatenate.append(newdict)
 
         if len(toconcatenate) == 0:
-            return copy.deepcopy(self)
+            return self.__class__()
         elif len(toconcatenate) == 1:
-            return toconcatenate[0]
+            return copy_tree(toconcatenate[0])
 
         return sum(toconcatenate[1:], toconcatenate[0])
 
@@ -125,7 +126,7 @@ class LauncherSerializedDict(MergeableDict):
                     f"No serialized-launcher with identifier '{_identifier}' found."
                     f"Available launchers are '{', '.join(_launcher_classes.keys())}'"
                 )
-            launcher = launcher_class(copy.deepcopy(launcher_config))
+            launcher = launcher_class(copy_tree(launcher_config))
             launchers.append(launcher)
 
         return LauncherSerializedList(launchers)
@@ -1,3 +1,5 @@
 from ._dataclass import BaseLauncher
 from ._serialized import BaseLauncherFields
 from ._serialized import BaseLauncherSerialized
+from ._serialized import EnvironCycleError
+from ._serialized import PathCache
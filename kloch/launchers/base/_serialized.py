@@ -1,18 +1,24 @@
 import abc
+import collections
+import contextvars
 import dataclasses
 import logging
 import os
 from pathlib import Path
+from typing import Collection
 from typing import Dict
 from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Set
 from typing import Type
 from typing import TypeVar
 from typing import Union
 
-from kloch._dictmerge import refacto_dict
 from kloch._dictmerge import MergeableDict
-from kloch._utils import expand_envvars
-from kloch._utils import patch_environ
+from kloch._utils import expand_variables
+from kloch._utils import get_variable_names
+from kloch._utils import map_threaded
 from ._dataclass import BaseLauncher
 from ... import MergeRule
 
@@ -34,38 +40,205 @@ def _resolve_path(src_str: str) -> str:
     return str(Path(src_str).resolve())
 
 
-def resolve_environ(environ: Dict[str, Union[str, List[str]]]) -> Dict[str, str]:
+_PATH_WORKERS = 8
+"""
+Maximum number of threads used to normalize a long list of paths.
+"""
+
+_PATH_BATCH_SIZE = 16
+"""
+Minimal amount of paths not normalized yet in a list, to normalize them concurrently.
+"""
+
+_CURRENT_PATH_CACHE: contextvars.ContextVar = contextvars.ContextVar(
+    "_CURRENT_PATH_CACHE", default=None
+)
+
+
+class PathCache:
     """
-    Resolve an "environ-like" dict structure to an ``os.environ`` dict structure.
+    Remember how strings are normalized as paths, so each path is only checked once on the filesystem.
+
+    Use it as a context manager to share it with all the launchers resolved
+    meanwhile, else each resolution use its own cache.
+
+    Args:
+        workers: maximum number of threads used to normalize a long list of paths.
     """
 
-    def process_pair(key: str, value: str):
-        if isinstance(value, List):
-            value = [_resolve_path(expand_envvars(str(path))) for path in value]
-            value = os.pathsep.join(value)
-        else:
-            value = _resolve_path(expand_envvars(str(value)))
+    def __init__(self, workers: int = _PATH_WORKERS):
+        self.workers: int = workers
+        self._resolved: Dict[str, str] = {}
+        self._tokens: List[contextvars.Token] = []
 
-        # reverted by context manager, we need it so a variable defined after
-        # another one can reuse that first one.
-        os.environ[key] = value
-        return key, value
+    @classmethod
+    def current(cls) -> Optional["PathCache"]:
+        """
+        Get the cache of the innermost ``with`` block, or None outside of any.
+        """
+        return _CURRENT_PATH_CACHE.get()
 
-    with patch_environ():
-        return refacto_dict(environ, callback=process_pair)
+    def __enter__(self) -> "PathCache":
+        self._tokens.append(_CURRENT_PATH_CACHE.set(self))
+        return self
 
+    def __exit__(self, *exc_info):
+        _CURRENT_PATH_CACHE.reset(self._tokens.pop())
 
-class _MergeableSystemEnviron(MergeableDict):
-    @classmethod
-    def get_merge_rule(cls, key: str) -> MergeRule:
-        # we force to always append the environ keys even if not token
-        if cls.resolve_key_tokens(key) == "environ":
-            return MergeRule.append
-        return super().get_merge_rule(key)
+    def resolve(self, paths: List[str]) -> List[str]:
+        """
+        Turn absolute and normalize the given strings which are existing paths.
+
+        Returns:
+            the new strings, in the same order.
+        """
+        missing = [path for path in dict.fromkeys(paths) if path not in self._resolved]
+        workers = self.workers if len(missing) >= _PATH_BATCH_SIZE else 1
+        resolved = map_threaded(_resolve_path, missing, workers=workers)
+        self._resolved.update(zip(missing, resolved))
+        return [self._resolved[path] for path in paths]
+
+
+class EnvironCycleError(Exception):
+    """
+    Variables of an 'environ' field reference each other in a loop.
+    """
+
+    pass
+
+
+def _get_environ_order(dependencies: Dict[str, Set[str]]) -> List[str]:
+    """
+    Sort the given variables so each one is after the variables it references.
+
+    Args:
+        dependencies: mapping of {"variable name": "names of the variables it references"}
+
+    Raises:
+        EnvironCycleError: if variables reference each other in a loop.
+    """
+    dependents: Dict[str, List[str]] = {key: [] for key in dependencies}
+    pending: Dict[str, int] = {}
+    for key, names in dependencies.items():
+        pending[key] = len(names)
+        for name in names:
+            dependents[name].append(key)
+
+    ready = collections.deque(key for key, count in pending.items() if not count)
+    order = []
+    while ready:
+        key = ready.popleft()
+        order.append(key)
+        for dependent in dependents[key]:
+            pending[dependent] -= 1
+            if not pending[dependent]:
+                ready.append(dependent)
+
+    if len(order) == len(dependencies):
+        return order
+
+    # follow the references from any unresolved variable until one is repeated
+    cycle = [next(key for key, count in pending.items() if count)]
+    while True:
+        name = next(name for name in dependencies[cycle[-1]] if pending[name])
+        if name in cycle:
+            cycle = cycle[cycle.index(name) :] + [name]
+            break
+        cycle.append(name)
+    raise EnvironCycleError(
+        f"environ variables reference each other in a loop: {' -> '.join(cycle)}"
+    )
+
+
+def resolve_environ(
+    environ: Dict[str, Union[str, List[str]]],
+    base: Optional[Mapping[str, str]] = None,
+    skip_paths: Optional[Collection[str]] = None,
+    path_cache: Optional[PathCache] = None,
+) -> Dict[str, str]:
+    """
+    Resolve an "environ-like" dict structure to an ``os.environ`` dict structure.
+
+    Variables are expanded after the other variables of the environ they reference,
+    whatever their order in the dict, so each variable is only expanded once.
+    A variable referencing itself use its value in the base.
+
+    ``os.environ`` is never modified so it is safe to call from multiple threads.
 
+    Args:
+        environ: the structure to resolve
+        base: variables that can be referenced in the environ values, in addition
+            to the variables of the environ. ``os.environ`` if None.
+        skip_paths: name of the variables whose values must not be normalized as paths.
+        path_cache: cache of normalized paths, :meth:`PathCache.current` or a new one if None.
 
-def _get_mergeable_system_environ():
-    return _MergeableSystemEnviron({"environ": os.environ.copy()})
+    Raises:
+        EnvironCycleError: if variables reference each other in a loop.
+        ValueError: if a variable name is invalid, like when it still has a merge token.
+    """
+    if base is None:
+        base = os.environ
+    skip_paths = skip_paths or ()
+    if path_cache is None:
+        path_cache = PathCache.current() or PathCache()
+
+    # mapping of {"variable name": ["unexpanded values"]}
+    values: Dict[str, List[str]] = {}
+    # mapping of {"variable name": "names of other environ variables it references"}
+    dependencies: Dict[str, Set[str]] = {}
+    for key, value in environ.items():
+        # same check as os.environ, merge tokens like '+=' are only resolved when merging
+        if "=" in key:
+            raise ValueError(
+                f"illegal environment variable name '{key}': merge tokens are "
+                f"not supported on environ variables of a launcher"
+            )
+        value = value if isinstance(value, list) else [value]
+        value = [str(item) for item in value]
+        values[key] = value
+        dependencies[key] = {
+            name
+            for item in value
+            for name in get_variable_names(item)
+            if name in environ and name != key
+        }
+
+    expanded: Dict[str, str] = {}
+    # expanded variables are looked up first, then the base
+    variables = collections.ChainMap(expanded, base)
+    for key in _get_environ_order(dependencies):
+        paths = [expand_variables(item, variables) for item in values[key]]
+        if key not in skip_paths:
+            paths = path_cache.resolve(paths)
+        expanded[key] = os.pathsep.join(paths)
+
+    # preserve the original order
+    return {key: expanded[key] for key in environ}
+
+
+def _merge_system_environ(
+    environ: Dict[str, str],
+    system_environ: Mapping[str, str],
+    removed: Collection[str],
+) -> Dict[str, str]:
+    """
+    Merge the given resolved environ over the given system environ.
+
+    The system variables are copied untouched, except the ones defined in the
+    environ or removed.
+
+    Args:
+        environ: resolved environ whose keys might still have merge tokens.
+        system_environ: variables of the system.
+        removed: name of the system variables to not merge.
+    """
+    overridden = {BaseLauncherSerialized.resolve_key_tokens(key) for key in environ}
+    overridden.update(removed)
+    merged = {
+        key: value for key, value in system_environ.items() if key not in overridden
+    }
+    merged.update(environ)
+    return merged
 
 
 # we use a dataclass over enum because we need inheritance
@@ -98,7 +271,23 @@ class BaseLauncherFields:
                 "\n"
                 "- All values have environment variables expanded with ``os.expandvars`` [1]_.\n"
                 "  You can escape the expansion by doubling the ``$`` like ``$$``\n"
-                "- All values are turned absolute and normalized [4]_ if they are existing paths.\n"
+                "- Values can reference the other variables of the ``environ``, whatever "
+                "the order they are defined in. A variable referencing itself use the value "
+                "of the system environment.\n"
+                "- All values are turned absolute and normalized [4]_ if they are existing paths,\n"
+                "  unless the variable is listed in ``environ_skip_paths``.\n"
+            ),
+            "required": False,
+        },
+    )
+    environ_skip_paths: List[str] = dataclasses.field(
+        default="environ_skip_paths",
+        metadata={
+            "description": (
+                "list of variable names of the ``environ`` field whose values must not be "
+                "turned absolute and normalized.\n"
+                "\n"
+                "Avoid checking the filesystem for variables which are known to not be paths."
             ),
             "required": False,
         },
@@ -110,7 +299,9 @@ class BaseLauncherFields:
                 "True to implicitly merge the system environment (from the machine "
                 "reading the profile) with the potentially specified ``environ`` field.\n"
                 'The system environ is merged as "base" so any key specified in the ``environ`` '
-                "will override it."
+                "will override it.\n"
+                "The system variables are kept untouched: they don't have environment "
+                "variables expanded and are not normalized as paths."
             ),
             "required": False,
         },
@@ -211,60 +402,107 @@ class BaseLauncherSerialized(MergeableDict):
 
         Raise an exeception on any issue.
         """
+        # keys might have merge tokens like ``+=environ``
+        values = {self.resolve_key_tokens(key): value for key, value in self.items()}
+
         environ = self.fields.environ
-        if environ in self:
-            assert isinstance(self[environ], dict), f"'{environ}': must be a dict."
-            for key, value in self[environ].items():
+        if environ in values:
+            assert isinstance(values[environ], dict), f"'{environ}': must be a dict."
+            for key, value in values[environ].items():
                 assert isinstance(key, str), f"'{environ}': key '{key}' must be a str."
 
+        skip_paths = self.fields.environ_skip_paths
+        if skip_paths in values:
+            assert isinstance(
+                values[skip_paths], list
+            ), f"'{skip_paths}': must be a list."
+            for value in values[skip_paths]:
+                assert isinstance(
+                    value, str
+                ), f"'{skip_paths}': item '{value}' must be str."
+
         cwd = self.fields.cwd
-        if cwd in self:
-            assert isinstance(self[cwd], str), f"'{cwd}': must be a str."
+        if cwd in values:
+            assert isinstance(values[cwd], str), f"'{cwd}': must be a str."
 
         command = self.fields.command
-        if command in self:
-            assert isinstance(self[command], list), f"'{command}': must be a list."
-            for value in self[command]:
+        if command in values:
+            assert isinstance(values[command], list), f"'{command}': must be a list."
+            for value in values[command]:
                 assert isinstance(
                     value, str
                 ), f"'{command}': item '{value}' must be str."
 
         priority = self.fields.priority
-        if priority in self:
-            assert isinstance(self[priority], int), f"'{priority}': must be an int."
+        if priority in values:
+            assert isinstance(values[priority], int), f"'{priority}': must be an int."
+
+    def get_priority(self) -> int:
+        """
+        Get the priority of the launcher without having to resolve it.
+
+        Raises:
+            AssertionError: if the priority is not valid.
+        """
+        priority = self.fields.priority
+        value = self.get(priority, self.source.priority, ignore_tokens=True)
+        assert isinstance(value, int), f"'{priority}': must be an int."
+        return value
 
     def resolved(self) -> Dict:
         """
         Modify the dict structure, so it can be unserialized properly.
         """
         use_system_environ = self.fields.merge_system_environ
-
-        if self.get(use_system_environ, True):
-            base = self.__class__(_get_mergeable_system_environ() + self)
-            # need to disable else infinite recursion
-            base[use_system_environ] = False
-            resolved = base.resolved()
-            return resolved
+        merge_system_environ = self.get(use_system_environ, True)
 
         resolved = super().resolved()
 
         environ = self.fields.environ
+        # the environ key might have a merge token like ``+=environ``
+        old_environ = self.get(environ, {}, ignore_tokens=True)
+        system_environ = os.environ
+
+        # name of the system variables removed by the environ
+        removed = set()
+        if merge_system_environ:
+            # only resolve the variables which are not already defined by the system
+            to_resolve = {}
+            for key, value in old_environ.items():
+                merge_rule, name = self.parse_key(key)
+                if merge_rule == MergeRule.remove:
+                    removed.add(name)
+                elif merge_rule == MergeRule.ifnotexists:
+                    if name not in system_environ:
+                        to_resolve[name] = value
+                else:
+                    to_resolve[key] = value
+            old_environ = to_resolve
+
         new_environ = {}
-        if environ in self:
-            old_environ = self.get(environ, {})
-            new_environ = {}
-            new_environ.update(resolve_environ(old_environ))
-            new_environ = {key: str(value) for key, value in new_environ.items()}
+        if environ in resolved or merge_system_environ:
+            new_environ = resolve_environ(
+                old_environ,
+                base=system_environ,
+                skip_paths=self.get(self.fields.environ_skip_paths),
+            )
+            if merge_system_environ:
+                new_environ = _merge_system_environ(
+                    new_environ,
+                    system_environ,
+                    removed=removed,
+                )
             resolved[environ] = new_environ
 
+        if merge_system_environ:
+            # the system environ is already merged
+            resolved[use_system_environ] = False
+
         cwd = self.fields.cwd
         if self.get(cwd):
-            with patch_environ():
-                os.environ.clear()
-                os.environ.update(new_environ)
-                resolved[cwd] = str(
-                    Path((expand_envvars(self[cwd]))).absolute().resolve()
-                )
+            # only the variables of the launcher environ can be used
+            cwd_path = Path(expand_variables(self[cwd], new_environ))
+            resolved[cwd] = str(cwd_path.absolute().resolve())
 
         # mapping of {'serialized key': 'dataclass field name'}
         fields: Dict[str, str] = {
@@ -282,4 +520,6 @@ class BaseLauncherSerialized(MergeableDict):
         """
         src_dict = self.resolved()
         del src_dict[self.fields.merge_system_environ]
+        # only used for resolving
+        src_dict.pop(self.fields.environ_skip_paths, None)
         return self.source.from_dict(src_dict)
@@ -1,13 +1,66 @@
+import atexit
+import contextlib
 import logging
+import os
+import re
 import shutil
 import socket
+import threading
 import time
 import uuid
 from pathlib import Path
 from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
 
 LOGGER = logging.getLogger(__name__)
 
+_CLEANUP_STAMP_FILENAME = "kloch.cleanup"
+"""
+File in the session root whose modification time is the last time the sessions were cleaned.
+"""
+
+_CLEANUP_LOCK_FILENAME = "kloch.cleanup.lock"
+"""
+File in the session root existing while a process claims the next session cleanup.
+"""
+
+_LOCK_STALE_AGE = 10.0
+"""
+Amount of seconds after which a lock file is considered left by a crashed process.
+"""
+
+_LOCK_TIMEOUT = 15.0
+"""
+Maximum amount of seconds to wait for another process to release a lock file.
+"""
+
+_SESSION_INDEX_FILENAME = "kloch.sessions"
+"""
+Optional file in the session root listing the sessions, one ``timestamp name`` per line.
+"""
+
+_SESSION_INDEX_LOCK_FILENAME = "kloch.sessions.lock"
+"""
+File in the session root existing while a process modifies the session index.
+"""
+
+_SESSION_NAME_REGEX = re.compile(r"^(\d+(?:\.\d+)?)-")
+"""
+Match the creation timestamp at the start of the session directory names generated by kloch.
+"""
+
+
+def _parse_timestamp(name: str) -> Optional[float]:
+    """
+    Get the creation timestamp encoded in a session directory name, or None if not found.
+    """
+    match = _SESSION_NAME_REGEX.match(name)
+    if not match:
+        return None
+    return float(match.group(1))
+
 
 class SessionDirectory:
     """
@@ -39,15 +92,23 @@ class SessionDirectory:
 
     @property
     def timestamp(self) -> float:
-        return float(self.meta_session_path.read_text())
+        # parsed from the name when possible to avoid reading a file
+        timestamp = _parse_timestamp(self.path.name)
+        if timestamp is None:
+            timestamp = float(self.meta_session_path.read_text())
+        return timestamp
 
     @classmethod
-    def initialize(cls, root: Path) -> "SessionDirectory":
+    def initialize(cls, root: Path, index: bool = False) -> "SessionDirectory":
         """
         Generate a new unique session directory on the filesystem.
 
         This function should be safe to be executed from different thread on the same machine
         at the same time.
+
+        Args:
+            root: filesystem path to a directory that might exist.
+            index: True to also register the session in the index of the root.
         """
         if not root.exists():
             LOGGER.debug(f"mkdir('{root}')")
@@ -67,6 +128,12 @@ class SessionDirectory:
 
         LOGGER.debug(f"touch('{instance.meta_session_path}')")
         instance.meta_session_path.write_text(str(timestamp))
+
+        if index:
+            try:
+                _append_session_index(root, [(timestamp, identifier)])
+            except TimeoutError as error:
+                LOGGER.warning(f"cannot index session '{path}': {error}")
         return instance
 
 
@@ -74,14 +141,105 @@ def get_session_dirs(root: Path) -> List[SessionDirectory]:
     """
     Get all the session directories found in the given root directory.
     """
+    with os.scandir(root) as entries:
+        paths = [Path(entry.path) for entry in entries if entry.is_dir()]
     return [
         SessionDirectory(path)
-        for path in root.glob("*")
-        if path.is_dir() and SessionDirectory(path).meta_session_path.exists()
+        for path in paths
+        if SessionDirectory(path).meta_session_path.exists()
     ]
 
 
-def clean_outdated_session_dirs(root: Path, lifetime: float) -> List[Path]:
+def _list_sessions(root: Path) -> List[Tuple[float, str]]:
+    """
+    Get the timestamp and name of all the directories in the given root that might be sessions.
+    """
+    sessions = []
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if not entry.is_dir():
+                continue
+            session = SessionDirectory(Path(entry.path))
+            try:
+                sessions.append((session.timestamp, entry.name))
+            except (OSError, ValueError):
+                # not a session
+                continue
+    return sessions
+
+
+def _read_session_index_file(index_path: Path) -> Optional[List[Tuple[float, str]]]:
+    try:
+        with index_path.open("r", encoding="utf-8") as file:
+            lines = file.readlines()
+    except FileNotFoundError:
+        return None
+
+    sessions = []
+    for line in lines:
+        timestamp, _, name = line.rstrip("\n").partition(" ")
+        try:
+            sessions.append((float(timestamp), name))
+        except ValueError:
+            continue
+    return sessions
+
+
+def _append_session_index(root: Path, sessions: List[Tuple[float, str]]):
+    index_path = root / _SESSION_INDEX_FILENAME
+    content = "".join(f"{timestamp} {name}\n" for timestamp, name in sessions)
+    with _locked(root / _SESSION_INDEX_LOCK_FILENAME):
+        with index_path.open("a", encoding="utf-8") as file:
+            file.write(content)
+
+
+def _read_session_index(root: Path) -> Optional[List[Tuple[float, str]]]:
+    """
+    Get the sessions listed in the index of the given root, or None if there is no index.
+    """
+    with _locked(root / _SESSION_INDEX_LOCK_FILENAME):
+        return _read_session_index_file(root / _SESSION_INDEX_FILENAME)
+
+
+def _update_session_index(
+    root: Path,
+    removed: Set[str],
+    added: List[Tuple[float, str]],
+):
+    """
+    Remove and add sessions to the index of the given root.
+
+    The sessions indexed by other processes meanwhile are preserved, and a session
+    indexed multiple times is only kept once.
+
+    Args:
+        root: filesystem path to an existing directory.
+        removed: name of the sessions to remove from the index.
+        added: timestamp and name of the sessions to add, if not already indexed.
+    """
+    index_path = root / _SESSION_INDEX_FILENAME
+    with _locked(root / _SESSION_INDEX_LOCK_FILENAME):
+        sessions = _read_session_index_file(index_path) or []
+        names = set()
+        lines = []
+        for timestamp, name in sessions + added:
+            if name in removed or name in names:
+                continue
+            names.add(name)
+            lines.append(f"{timestamp} {name}\n")
+
+        # write then rename so processes without the lock never read a partial file
+        tmp_path = index_path.with_name(f"{index_path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text("".join(lines), encoding="utf-8")
+        os.replace(tmp_path, index_path)
+
+
+def clean_outdated_session_dirs(
+    root: Path,
+    lifetime: float,
+    time_budget: Optional[float] = None,
+    index: bool = False,
+) -> List[Path]:
     """
     Iterate through all existing session directories and delete the one which have been created longer than the given lifetime.
 
@@ -90,6 +248,13 @@ def clean_outdated_session_dirs(root: Path, lifetime: float) -> List[Path]:
     Args:
         root: filesystem path to an existing directory.
         lifetime: maximum lifetime in hours of a session directory
+        time_budget:
+            maximum amount of seconds to spend deleting directories, the remaining
+            ones are deleted by the next call. No limit if None.
+        index:
+            True to find the sessions from the index of the root instead of
+            listing the root. The root is listed to create the index if it doesn't exist.
+            Sessions created without being indexed are not deleted until the index is removed.
 
     Returns:
         list of directories filesystem path that have been removed
@@ -99,15 +264,32 @@ def clean_outdated_session_dirs(root: Path, lifetime: float) -> List[Path]:
     current_time = time.time()
     minimal_lifetime = current_time - lifetime
 
+    sessions = _read_session_index(root) if index else None
+    listed = sessions is None
+    if listed:
+        sessions = _list_sessions(root)
+
     removed = []
+    # name of the sessions that don't exist anymore
+    removed_names = set()
+
+    for timestamp, name in sessions:
 
-    for session in get_session_dirs(root=root):
+        if timestamp > minimal_lifetime:
+            continue
+
+        if time_budget is not None and time.time() - current_time > time_budget:
+            LOGGER.debug(f"stopped cleaning sessions after {time_budget}s")
+            break
 
-        if session.timestamp > minimal_lifetime:
+        session = SessionDirectory(root / name)
+        # already removed or not a session
+        if not session.meta_session_path.exists():
+            removed_names.add(name)
             continue
 
         try:
-            shutil.rmtree(session.path)
+            _remove_session_dir(session)
         except Exception as error:
             LOGGER.exception(
                 f"failed to remove outdated session dir '{session.path}': {error}"
@@ -115,5 +297,197 @@ def clean_outdated_session_dirs(root: Path, lifetime: float) -> List[Path]:
             continue
 
         removed.append(session.path)
+        removed_names.add(name)
 
+    # the index is only updated once the sessions are removed so an interrupted
+    # cleanup doesn't forget them
+    if index:
+        _update_session_index(
+            root,
+            removed=removed_names,
+            added=sessions if listed else [],
+        )
     return removed
+
+
+def _remove_session_dir(session: SessionDirectory):
+    """
+    Delete the given session directory, its meta file last.
+
+    So a removal interrupted, like when the interpreter exits, is resumed by the next cleanup.
+    """
+    with os.scandir(session.path) as entries:
+        paths = [Path(entry.path) for entry in entries]
+    for path in paths:
+        if path == session.meta_session_path:
+            continue
+        if path.is_dir() and not path.is_symlink():
+            shutil.rmtree(path)
+        else:
+            path.unlink()
+    session.meta_session_path.unlink()
+    session.path.rmdir()
+
+
+def _try_lock(lock_path: Path) -> bool:
+    """
+    Atomically create the given lock file, return False if it already exists.
+
+    A lock file older than ``_LOCK_STALE_AGE`` is deleted so the next attempt can succeed.
+    """
+    try:
+        file_descriptor = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        try:
+            lock_stat = lock_path.stat()
+        except FileNotFoundError:
+            return False
+        if time.time() - lock_stat.st_mtime > _LOCK_STALE_AGE:
+            _remove_stale_lock(lock_path, lock_stat)
+        return False
+    os.close(file_descriptor)
+    return True
+
+
+def _remove_stale_lock(lock_path: Path, lock_stat: os.stat_result):
+    """
+    Delete the given lock file only if it is still the one with the given stat values.
+
+    The lock is moved aside first so a lock created meanwhile by another process,
+    after another waiter removed the stale one, is never deleted.
+    """
+    stale_path = lock_path.with_name(f"{lock_path.name}.{os.getpid()}.stale")
+    try:
+        os.replace(lock_path, stale_path)
+    except FileNotFoundError:
+        return
+    moved_stat = stale_path.stat()
+    if (moved_stat.st_ino, moved_stat.st_mtime_ns) != (
+        lock_stat.st_ino,
+        lock_stat.st_mtime_ns,
+    ):
+        # not the stale lock: give it back to the process holding it
+        try:
+            os.link(stale_path, lock_path)
+        except OSError as error:
+            LOGGER.warning(f"cannot restore lock '{lock_path}': {error}")
+        stale_path.unlink()
+        return
+    LOGGER.debug(f"removing stale lock '{lock_path}'")
+    stale_path.unlink()
+
+
+@contextlib.contextmanager
+def _locked(lock_path: Path, timeout: Optional[float] = None):
+    """
+    Hold the given lock file during the context, waiting for other processes to release it.
+
+    Args:
+        lock_path: filesystem path to a file that might exist.
+        timeout: maximum amount of seconds to wait, ``_LOCK_TIMEOUT`` if None.
+
+    Raises:
+        TimeoutError: if the lock could not be acquired before the timeout.
+    """
+    timeout = _LOCK_TIMEOUT if timeout is None else timeout
+    start_time = time.time()
+    while not _try_lock(lock_path):
+        if time.time() - start_time > timeout:
+            raise TimeoutError(f"cannot acquire lock '{lock_path}' after {timeout}s")
+        time.sleep(0.01)
+    try:
+        yield
+    finally:
+        try:
+            lock_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _claim_cleanup(root: Path, interval: float) -> bool:
+    """
+    Return True if the sessions were not cleaned since the given interval in hours,
+    and mark them as being cleaned.
+
+    Only one of the processes calling this function concurrently can claim the cleanup.
+    """
+    stamp_path = root / _CLEANUP_STAMP_FILENAME
+
+    def _is_cleaned_recently() -> bool:
+        try:
+            last_cleanup = stamp_path.stat().st_mtime
+        except FileNotFoundError:
+            last_cleanup = 0.0
+        return time.time() - last_cleanup < interval * 3600
+
+    if _is_cleaned_recently():
+        return False
+
+    lock_path = root / _CLEANUP_LOCK_FILENAME
+    if not _try_lock(lock_path):
+        return False
+    try:
+        # another process might have claimed it between the first check and the lock
+        if _is_cleaned_recently():
+            return False
+        stamp_path.touch()
+    finally:
+        lock_path.unlink()
+    return True
+
+
+def start_session_cleanup(
+    root: Path,
+    lifetime: float,
+    interval: float,
+    time_budget: Optional[float] = None,
+    index: bool = False,
+    exit_timeout: Optional[float] = 1.0,
+) -> Optional[threading.Thread]:
+    """
+    Delete the outdated session directories in a background thread, at most once per interval.
+
+    The interval is shared between all the processes using the same root, using
+    a stamp file in the root. The thread doesn't prevent the python interpreter
+    from exiting: it is only waited for ``exit_timeout`` seconds, and the sessions
+    it didn't delete are deleted by the next cleanup.
+
+    Args:
+        root: filesystem path to an existing directory.
+        lifetime: maximum lifetime in hours of a session directory
+        interval: minimal amount of hours between 2 cleanups.
+        time_budget: maximum amount of seconds to spend deleting directories.
+        index: True to find the sessions using the index of the root.
+        exit_timeout:
+            maximum amount of seconds to wait for the cleanup to finish when the
+            interpreter exits. No limit if None.
+
+    Returns:
+        the started thread, or None if the sessions were cleaned recently.
+    """
+    try:
+        if not _claim_cleanup(root, interval):
+            return None
+    except OSError as error:
+        LOGGER.warning(f"cannot check last session cleanup of '{root}': {error}")
+        return None
+
+    def _clean():
+        try:
+            cleaned = clean_outdated_session_dirs(
+                root=root,
+                lifetime=lifetime,
+                time_budget=time_budget,
+                index=index,
+            )
+        except Exception as error:
+            LOGGER.debug(
+                f"failed to clean sessions of '{root}': {error}", exc_info=True
+            )
+            return
+        LOGGER.debug(f"removed {len(cleaned)} outdated session dirs")
+
+    thread = threading.Thread(target=_clean, name="kloch-session-cleanup", daemon=True)
+    thread.start()
+    atexit.register(thread.join, exit_timeout)
+    return thread
@@ -1,5 +1,8 @@
+import json
+import logging
 import os
 import re
+import shutil
 import sys
 from pathlib import Path
 from typing import Dict
@@ -78,6 +81,22 @@ def test__getCli__list__profile_paths(data_dir, capsys):
     assert int(profile_capture.group(1)) >= 1
 
 
+def test__getCli__list__cache_dir(monkeypatch, data_dir, tmp_path, capsys):
+    monkeypatch.setenv(kloch.Environ.CONFIG_PROFILE_ROOTS, str(data_dir))
+    monkeypatch.setenv(kloch.Environ.CONFIG_CACHE_DIR, str(tmp_path))
+
+    argv = ["list"]
+    cli = kloch.get_cli(argv=argv)
+    cli.execute()
+    captured_uncached = capsys.readouterr()
+    assert list(tmp_path.glob("*.json"))
+
+    cli = kloch.get_cli(argv=argv)
+    cli.execute()
+    captured_cached = capsys.readouterr()
+    assert captured_cached.out == captured_uncached.out
+
+
 def test__getCli__run__lxm(monkeypatch, data_dir):
     import subprocess
 
@@ -282,6 +301,28 @@ def test__getCli__python__implicit(data_dir, capsys):
     assert result.out.endswith(f"{str(argv)}\n")
 
 
+def test__run_cli__python__fast_path(data_dir, monkeypatch, capsys):
+    def _raise(*args, **kwargs):
+        raise AssertionError("the python command must not initialize the cli")
+
+    monkeypatch.setattr(kloch, "get_config", _raise)
+    monkeypatch.setattr(kloch, "get_cli", _raise)
+
+    script_path = data_dir / "test-script-a.py"
+    for argv in (
+        ["python", str(script_path), "some args ?"],
+        [str(script_path), "some args ?"],
+    ):
+        with pytest.raises(SystemExit):
+            kloch.run_cli(argv)
+        result = capsys.readouterr()
+        assert f"{kloch.__name__} test script working" in result.out
+        assert result.out.endswith(f"{str([str(script_path), 'some args ?'])}\n")
+
+    assert kloch.cli._get_python_call(["python", "file.py", "--debug"]) is None
+    assert kloch.cli._get_python_call(["list"]) is None
+
+
 def test__getCli__plugins__undefined(data_dir, capsys):
     argv = ["plugins"]
     cli = kloch.get_cli(argv=argv)
@@ -339,3 +380,185 @@ def test__run_cli__logging(monkeypatch, tmp_path):
     assert f"starting {kloch.__name__} v{kloch.__version__}" in log_path.read_text(
         encoding="utf-8"
     )
+
+
+def test__getCli__resolve__batch(monkeypatch, data_dir, tmp_path, capsys):
+    import yaml
+
+    monkeypatch.setenv(kloch.Environ.CONFIG_PROFILE_ROOTS, str(data_dir))
+
+    batch_path = tmp_path / "batch.yml"
+    batch_path.write_text(
+        "- profiles: [knots:echoes]\n"
+        "- profiles: [knots:echoes, lxm]\n"
+        "  context: {os: linux, user: demo}\n"
+        "- profiles: [knots:echoes:tmp]\n"
+        "  context: null\n"
+    )
+    argv = ["resolve", "--batch", str(batch_path)]
+    cli = kloch.get_cli(argv=argv)
+    cli.execute()
+    captured = capsys.readouterr()
+
+    documents = list(yaml.safe_load_all(captured.out))
+    assert [document["identifier"] for document in documents] == [
+        "knots:echoes",
+        "lxm",
+        "knots:echoes:tmp",
+    ]
+    for document, profile_ids in zip(
+        documents,
+        [["knots:echoes"], ["knots:echoes", "lxm"], ["knots:echoes:tmp"]],
+    ):
+        argv = ["resolve"] + profile_ids
+        if profile_ids == ["knots:echoes:tmp"]:
+            argv.append("--skip-context-filtering")
+        cli = kloch.get_cli(argv=argv)
+        if profile_ids == ["knots:echoes", "lxm"]:
+            monkeypatch.setattr(
+                kloch.launchers.LauncherContext,
+                "create_from_system",
+                classmethod(lambda cls: cls.from_dict({"os": "linux", "user": "demo"})),
+            )
+        cli.execute()
+        captured = capsys.readouterr()
+        assert yaml.safe_load(captured.out) == document
+
+    batch_path.write_text("- profiles: [knots:echoes]\n- profiles: [not-existing]\n")
+    argv = ["resolve", "--batch", str(batch_path)]
+    cli = kloch.get_cli(argv=argv)
+    with pytest.raises(SystemExit):
+        cli.execute()
+    captured = capsys.readouterr()
+    documents = list(yaml.safe_load_all(captured.out))
+    assert len(documents) == 2
+    assert documents[1] is None
+    assert "not-existing" in captured.err
+
+
+def test__getCli__list__format(monkeypatch, data_dir, capsys):
+    import json
+
+    monkeypatch.setenv(kloch.Environ.CONFIG_PROFILE_ROOTS, str(data_dir))
+
+    cli = kloch.get_cli(argv=["list", ".*es:beta", "--format", "json"])
+    cli.execute()
+    captured = capsys.readouterr()
+    assert json.loads(captured.out) == [
+        {
+            "identifier": "knots:echoes:beta",
+            "version": "0.1.0",
+            "path": str(data_dir / "profile.echoes-beta.yml"),
+        }
+    ]
+
+    cli = kloch.get_cli(argv=["list", "--format", "ndjson"])
+    cli.execute()
+    captured = capsys.readouterr()
+    lines = captured.out.splitlines()
+    profiles = [json.loads(line) for line in lines]
+    assert "knots:echoes" in [profile["identifier"] for profile in profiles]
+
+
+def test__getCli__resolve__format(monkeypatch, data_dir, capsys):
+    import json
+    import yaml
+
+    monkeypatch.setenv(kloch.Environ.CONFIG_PROFILE_ROOTS, str(data_dir))
+
+    cli = kloch.get_cli(argv=["resolve", "knots:echoes"])
+    cli.execute()
+    expected = yaml.safe_load(capsys.readouterr().out)
+
+    cli = kloch.get_cli(argv=["resolve", "knots:echoes", "--format", "json"])
+    cli.execute()
+    assert json.loads(capsys.readouterr().out) == expected
+
+
+def test__getCli__run__only_selected_resolved(monkeypatch, tmp_path, capfd):
+    profile_path = tmp_path / "profile.yml"
+    profile_path.write_text(
+        "__magic__: kloch_profile:4\n"
+        "identifier: only-selected\n"
+        "version: 0.1.0\n"
+        "launchers:\n"
+        "  .system:\n"
+        "    priority: 5\n"
+        "    command: [echo, selected_launcher]\n"
+        "  .system@os=windows:\n"
+        "    subprocess_kwargs:\n"
+        "      shell: true\n"
+        "  .python:\n"
+        "    command: not-a-list\n"
+        "    environ:\n"
+        "      FIRST: $SECOND\n"
+        "      SECOND: $FIRST\n"
+    )
+    monkeypatch.setenv(kloch.Environ.CONFIG_PROFILE_ROOTS, str(tmp_path))
+
+    unserialized = []
+    original_unserialize = kloch.launchers.BaseLauncherSerialized.unserialize
+
+    def _patched_unserialize(self):
+        unserialized.append(self.identifier)
+        return original_unserialize(self)
+
+    monkeypatch.setattr(
+        kloch.launchers.BaseLauncherSerialized, "unserialize", _patched_unserialize
+    )
+
+    cli = kloch.get_cli(argv=["run", "only-selected"])
+    with pytest.raises(SystemExit, match="0"):
+        cli.execute()
+    assert "selected_launcher" in capfd.readouterr().out
+    assert unserialized == [".system"]
+
+    monkeypatch.setenv(kloch.Environ.CONFIG_CLI_VALIDATE_ALL_LAUNCHERS, "1")
+    cli = kloch.get_cli(argv=["run", "only-selected"])
+    with pytest.raises(SystemExit, match="1"):
+        cli.execute()
+    assert "Cannot validate launcher '.python'" in capfd.readouterr().err
+
+
+def test__getCli__run__invalid_token_field(monkeypatch, tmp_path, capfd):
+    profile_path = tmp_path / "profile.yml"
+    profile_path.write_text(
+        "__magic__: kloch_profile:4\n"
+        "identifier: invalid-token\n"
+        "version: 0.1.0\n"
+        "launchers:\n"
+        "  .system:\n"
+        "    +=priority: x\n"
+        "    command: [echo, invalid]\n"
+    )
+    monkeypatch.setenv(kloch.Environ.CONFIG_PROFILE_ROOTS, str(tmp_path))
+
+    cli = kloch.get_cli(argv=["run", "invalid-token"])
+    with pytest.raises(SystemExit, match="1"):
+        cli.execute()
+    assert "Cannot validate launcher '.system'" in capfd.readouterr().err
+
+    # also when selecting between multiple launchers
+    profile_path.write_text(
+        profile_path.read_text() + "  .python:\n    python_file: script.py\n"
+    )
+    cli = kloch.get_cli(argv=["run", "invalid-token"])
+    with pytest.raises(SystemExit, match="1"):
+        cli.execute()
+    assert "must be an int" in capfd.readouterr().err
+
+
+def test__run_cli__logs_to_stderr(monkeypatch, data_dir, tmp_path, capsys):
+    shutil.copy(data_dir / "profile.echoes.yml", tmp_path)
+    (tmp_path / "profile.noid.yml").write_text(
+        "__magic__: kloch_profile:4\nversion: 0.1.0\n"
+    )
+    monkeypatch.setenv(kloch.Environ.CONFIG_PROFILE_ROOTS, str(tmp_path))
+    monkeypatch.setattr(logging.root, "handlers", [])
+
+    with pytest.raises(SystemExit):
+        kloch.run_cli(["list", "--format", "json"])
+    result = capsys.readouterr()
+    assert "no identifier" in result.err
+    profiles = json.loads(result.out)
+    assert [profile["identifier"] for profile in profiles] == ["knots:echoes"]
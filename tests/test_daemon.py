@@ -0,0 +1,231 @@
+import os
+import shutil
+import signal
+import socket
+import stat
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+import kloch
+import kloch.daemon
+import kloch.filesyntax
+from kloch.launchers import LauncherContext
+from kloch.launchers import LauncherPlatform
+
+pytestmark = pytest.mark.skipif(
+    not kloch.daemon.is_daemon_supported(),
+    reason="unix sockets not supported",
+)
+
+
+@pytest.fixture()
+def daemon_server(tmp_path: Path):
+    socket_path = tmp_path / "kloch.sock"
+    profile_daemon = kloch.daemon.ProfileDaemon()
+    server = kloch.daemon.create_server(socket_path, profile_daemon)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield socket_path, profile_daemon
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test__ProfileDaemon__handle_request(data_dir, tmp_path: Path):
+    profile_root = tmp_path / "profiles"
+    shutil.copytree(data_dir, profile_root)
+    profile_daemon = kloch.daemon.ProfileDaemon()
+
+    request = {
+        "version": kloch.daemon.PROTOCOL_VERSION,
+        "command": "resolve",
+        "profile_ids": ["knots:echoes"],
+        "context": {"os": "linux"},
+        "profile_locations": [str(profile_root)],
+    }
+    response = profile_daemon.handle_request(request)
+    expected = kloch.filesyntax.resolve_profiles(
+        ["knots:echoes"],
+        context=LauncherContext(platform=LauncherPlatform.linux),
+        profile_locations=[profile_root],
+    )
+    assert response["profile"]["identifier"] == expected.identifier
+    assert response["profile"]["launchers"] == dict(expected.launchers)
+
+    response = profile_daemon.handle_request(dict(request, profile_ids=["new"]))
+    assert response["error_type"] == "ProfileIdentifierError"
+
+    # new profiles are found by the next requests
+    new_path = profile_root / "profile.new.yml"
+    new_path.write_text(
+        "__magic__: kloch_profile:4\nidentifier: new\nversion: 0.1.0\nlaunchers: {}\n"
+    )
+    os.utime(profile_root, ns=(0, 0))
+    response = profile_daemon.handle_request(dict(request, profile_ids=["new"]))
+    assert response["profile"]["identifier"] == "new"
+
+    response = profile_daemon.handle_request(dict(request, version=0))
+    assert "protocol version" in response["error"]
+
+
+def test__ProfileDaemon__check_changes(data_dir, tmp_path: Path):
+    profile_root = tmp_path / "profiles"
+    shutil.copytree(data_dir, profile_root)
+    stamp = kloch.filesyntax.GenerationStamp(tmp_path / "stamp.json")
+    profile_daemon = kloch.daemon.ProfileDaemon(
+        index=kloch.filesyntax.ProfileIndex(stamp=stamp),
+        watcher=kloch.filesyntax.create_profile_watcher([]),
+    )
+    assert profile_daemon.check_changes() == []
+
+    resolver = profile_daemon.get_resolver([profile_root])
+    assert resolver.get_profile_paths("knots:echoes")
+    generation = stamp.read([profile_root])
+    assert generation
+
+    profile_path = profile_root / "profile.echoes.yml"
+    profile_path.write_text(
+        profile_path.read_text().replace("knots:echoes\n", "knots:renamed\n")
+    )
+    assert profile_path in profile_daemon.check_changes()
+    assert stamp.read([profile_root]) != generation
+    assert resolver.get_profile_paths("knots:renamed") == [profile_path]
+    assert not resolver.get_profile_paths("knots:echoes")
+    profile_daemon.watcher.close()
+
+
+def test__daemon__resolve_profiles(data_dir, daemon_server):
+    socket_path, _ = daemon_server
+    context = LauncherContext(platform=LauncherPlatform.linux)
+
+    result = kloch.daemon.resolve_profiles(
+        socket_path,
+        ["knots:echoes"],
+        context=context,
+        profile_locations=[data_dir],
+    )
+    expected = kloch.filesyntax.resolve_profiles(
+        ["knots:echoes"],
+        context=context,
+        profile_locations=[data_dir],
+    )
+    assert result.to_dict() == expected.to_dict()
+
+    with pytest.raises(kloch.filesyntax.ProfileIdentifierError):
+        kloch.daemon.resolve_profiles(
+            socket_path,
+            ["not:existing"],
+            context=context,
+            profile_locations=[data_dir],
+        )
+
+    with pytest.raises(kloch.daemon.DaemonError):
+        kloch.daemon.create_server(socket_path, kloch.daemon.ProfileDaemon())
+
+
+def test__daemon__not_running(tmp_path: Path):
+    socket_path = tmp_path / "kloch.sock"
+    with pytest.raises(kloch.daemon.DaemonError):
+        kloch.daemon.send_request(socket_path, {"command": "ping"})
+
+    # leftover socket of a daemon which is not running anymore
+    socket_path.write_text("")
+    server = kloch.daemon.create_server(socket_path, kloch.daemon.ProfileDaemon())
+    server.server_close()
+
+
+def test__daemon__stuck_client(daemon_server, monkeypatch):
+    socket_path, _ = daemon_server
+    assert kloch.daemon._RequestHandler.timeout
+    monkeypatch.setattr(kloch.daemon._RequestHandler, "timeout", 0.2)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stuck_client:
+        # connect and never send anything
+        stuck_client.connect(str(socket_path))
+        response = kloch.daemon.send_request(socket_path, {"command": "ping"})
+        assert response == {"pid": os.getpid()}
+
+
+def test__create_server__busy(tmp_path: Path):
+    socket_path = tmp_path / "kloch.sock"
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as busy_server:
+        # accept connections but never answer, like a daemon busy with a request
+        busy_server.bind(str(socket_path))
+        busy_server.listen()
+        with pytest.raises(kloch.daemon.DaemonError):
+            kloch.daemon.create_server(socket_path, kloch.daemon.ProfileDaemon())
+        assert socket_path.exists()
+
+
+def test__create_server__permissions(tmp_path: Path):
+    socket_path = tmp_path / "kloch.sock"
+    umask = os.umask(0o022)
+    try:
+        server = kloch.daemon.create_server(socket_path, kloch.daemon.ProfileDaemon())
+        server.server_close()
+        assert os.umask(0o022) == 0o022
+    finally:
+        os.umask(umask)
+    assert stat.S_IMODE(socket_path.stat().st_mode) == 0o600
+
+
+def test__getCli__daemon__sigterm(data_dir, tmp_path: Path):
+    socket_path = tmp_path / "kloch.sock"
+    stamp_path = tmp_path / "cache" / "profile-generation.json"
+    environ = dict(
+        os.environ,
+        **{
+            kloch.Environ.CONFIG_PROFILE_ROOTS: str(data_dir),
+            kloch.Environ.CONFIG_CACHE_DIR: str(tmp_path / "cache"),
+        },
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "kloch", "daemon", "--socket", str(socket_path)],
+        env=environ,
+        cwd=str(Path(kloch.__file__).parent.parent),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        start_time = time.time()
+        while not socket_path.exists() and time.time() - start_time < 10:
+            time.sleep(0.05)
+        assert kloch.daemon.send_request(socket_path, {"command": "ping"})
+        assert stamp_path.exists()
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=10) == 0
+    finally:
+        process.kill()
+        process.wait()
+    assert not socket_path.exists()
+    assert not stamp_path.exists()
+
+
+def test__getCli__resolve__daemon(monkeypatch, data_dir, daemon_server, capsys):
+    socket_path, profile_daemon = daemon_server
+    monkeypatch.setenv(kloch.Environ.CONFIG_PROFILE_ROOTS, str(data_dir))
+
+    cli = kloch.get_cli(argv=["resolve", "knots:echoes"])
+    cli.execute()
+    expected = capsys.readouterr().out
+
+    monkeypatch.setenv(kloch.Environ.CONFIG_DAEMON_SOCKET, str(socket_path))
+    cli = kloch.get_cli(argv=["resolve", "knots:echoes"])
+    cli.execute()
+    assert capsys.readouterr().out == expected
+    assert profile_daemon._resolvers
+    # the client didn't need to read any profile
+    assert cli._profile_resolver is None or not cli._profile_resolver._profiles
+
+    # fallback to resolving locally
+    monkeypatch.setenv(
+        kloch.Environ.CONFIG_DAEMON_SOCKET, str(socket_path.with_name("none.sock"))
+    )
+    cli = kloch.get_cli(argv=["resolve", "knots:echoes"])
+    cli.execute()
+    assert capsys.readouterr().out == expected
@@ -1,4 +1,8 @@
+import kloch._dictmerge
 from kloch._dictmerge import MergeableDict
+from kloch._dictmerge import MergeRule
+from kloch._dictmerge import deepmerge_dicts
+from kloch._dictmerge import copy_tree
 
 
 def test__MergeableDict__type():
@@ -32,6 +36,25 @@ def test__MergeableDict__get():
     assert d1.get("+=foo", default=5, ignore_tokens=True) is arg1
 
 
+def test__MergeableDict__parse_key():
+    assert MergeableDict.parse_key("foo") == (MergeRule.append, "foo")
+    assert MergeableDict.parse_key("+=foo") == (MergeRule.append, "foo")
+    assert MergeableDict.parse_key("-=foo") == (MergeRule.remove, "foo")
+    assert MergeableDict.parse_key("==foo") == (MergeRule.override, "foo")
+    assert MergeableDict.parse_key("!=foo") == (MergeRule.ifnotexists, "foo")
+    assert MergeableDict.parse_key("-=+=foo") == (MergeRule.remove, "+=foo")
+    assert MergeableDict.resolve_key_tokens("==foo") == "foo"
+    assert MergeableDict.get_merge_rule("==foo") == MergeRule.override
+
+    class CustomDict(MergeableDict):
+        class tokens(MergeableDict.tokens):
+            append = "++"
+
+    assert CustomDict.parse_key("++foo") == (MergeRule.append, "foo")
+    assert CustomDict.parse_key("+=foo") == (MergeRule.append, "+=foo")
+    assert MergeableDict.parse_key("++foo") == (MergeRule.append, "++foo")
+
+
 def test__MergeableDict__add():
     dict_root = MergeableDict(
         {
@@ -206,3 +229,138 @@ def test__MergeableDict__add__order():
     )
     dmmerged = dm1 + dm2
     assert list(dmmerged["+=rezenv"].keys()) == ["+=config", "+=requires", "newkey"]
+
+
+def test__MergeableDict__add__copy():
+    dm1 = MergeableDict(
+        {
+            "+=rezenv": {"+=requires": ["foo"], "params": {"a": 1}},
+            "untouched": {"nested": [{"deep": True}]},
+        }
+    )
+    dm2 = MergeableDict(
+        {
+            "+=rezenv": {"+=requires": ["bar"], "==params": {"b": 2}},
+            "==override": {"c": [3]},
+        }
+    )
+    dmmerged = dm1 + dm2
+    assert dmmerged == {
+        "untouched": {"nested": [{"deep": True}]},
+        "+=rezenv": {"+=requires": ["foo", "bar"], "==params": {"b": 2}},
+        "==override": {"c": [3]},
+    }
+
+    # the merged structure must not share any mutable object with its members
+    dmmerged["untouched"]["nested"][0]["deep"] = False
+    dmmerged["+=rezenv"]["+=requires"].append("baz")
+    dmmerged["+=rezenv"]["==params"]["b"] = 0
+    dmmerged["==override"]["c"].append(4)
+    assert dm1["untouched"]["nested"][0]["deep"] is True
+    assert dm1["+=rezenv"]["+=requires"] == ["foo"]
+    assert dm2["+=rezenv"]["+=requires"] == ["bar"]
+    assert dm2["+=rezenv"]["==params"] == {"b": 2}
+    assert dm2["==override"] == {"c": [3]}
+
+    resolved = dm1.resolved()
+    resolved["untouched"]["nested"][0]["deep"] = False
+    assert dm1["untouched"]["nested"][0]["deep"] is True
+
+
+def test__copy_tree():
+    class CustomList(list):
+        pass
+
+    source = MergeableDict(
+        {
+            "dict": {"nested": MergeableDict({"list": CustomList([1, {"a": "b"}])})},
+            "tuple": (1, [2]),
+        }
+    )
+    copied = copy_tree(source)
+    assert copied == source
+    assert type(copied) is MergeableDict
+    assert type(copied["dict"]["nested"]) is MergeableDict
+    assert type(copied["dict"]["nested"]["list"]) is CustomList
+    assert (
+        copied["dict"]["nested"]["list"][1] is not source["dict"]["nested"]["list"][1]
+    )
+    assert copied["tuple"][1] is not source["tuple"][1]
+
+
+def test__deepmerge_dicts__linear(monkeypatch):
+    def _get_dicts(key_number):
+        base = {f"KEY{index}": f"base{index}" for index in range(key_number)}
+        over = {f"KEY{index}": f"over{index}" for index in range(0, key_number, 2)}
+        return over, base
+
+    calls = {"resolve": 0, "rule": 0, "copy": 0}
+
+    def _key_resolve_callback(key):
+        calls["resolve"] += 1
+        return MergeableDict.resolve_key_tokens(key)
+
+    def _merge_rule_callback(key):
+        calls["rule"] += 1
+        return MergeableDict.get_merge_rule(key)
+
+    original_copy_tree = kloch._dictmerge.copy_tree
+
+    def _patched_copy_tree(obj):
+        calls["copy"] += 1
+        return original_copy_tree(obj)
+
+    monkeypatch.setattr(kloch._dictmerge, "copy_tree", _patched_copy_tree)
+
+    def _count_merge(key_number):
+        calls.update({name: 0 for name in calls})
+        over, base = _get_dicts(key_number)
+        result = deepmerge_dicts(
+            over,
+            base,
+            merge_rule_callback=_merge_rule_callback,
+            key_resolve_callback=_key_resolve_callback,
+        )
+        assert len(result) == key_number
+        assert result["KEY2"] == "over2"
+        assert result["KEY3"] == "base3"
+        # each key is resolved once and each value copied once
+        assert calls["resolve"] == len(over) + len(base)
+        assert calls["rule"] == len(over)
+        assert calls["copy"] == len(result)
+        return dict(calls)
+
+    small_calls = _count_merge(1000)
+    big_calls = _count_merge(10000)
+    # 10 times more keys must do exactly 10 times more operations
+    assert big_calls == {name: count * 10 for name, count in small_calls.items()}
+
+
+def test__MergeableDict__merge_many():
+    dm1 = MergeableDict(
+        {
+            "+=rezenv": {"+=requires": ["foo"], "params": {"a": 1}},
+            "untouched": {"nested": [1]},
+        }
+    )
+    dm2 = MergeableDict({"+=rezenv": {"+=requires": ["bar"], "-=params": None}})
+    dm3 = MergeableDict({"+=rezenv": {"+=requires": ["baz"]}, "!=untouched": {}})
+    dm4 = MergeableDict({"==rezenv": {"config": True}})
+
+    for contents in ([dm1, dm2, dm3], [dm1, dm2, dm3, dm4], [dm3, dm1], [dm1]):
+        expected = contents[0]
+        for content in contents[1:]:
+            expected = expected + content
+        result = MergeableDict.merge_many(contents)
+        assert type(result) is MergeableDict
+        assert result == expected
+        assert list(result.keys()) == list(expected.keys())
+
+    result = MergeableDict.merge_many([dm1, dm2, dm3])
+    result["untouched"]["nested"].append(2)
+    result["+=rezenv"]["+=requires"].append("other")
+    assert dm1["untouched"]["nested"] == [1]
+    assert dm1["+=rezenv"]["+=requires"] == ["foo"]
+    assert dm3["+=rezenv"]["+=requires"] == ["baz"]
+
+    assert MergeableDict.merge_many([]) == {}
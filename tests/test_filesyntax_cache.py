@@ -0,0 +1,144 @@
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+import kloch.filesyntax
+import kloch.filesyntax._io
+from kloch.filesyntax._cache import _get_signature
+
+
+def test__MergedProfileCache(data_dir, tmp_path: Path, monkeypatch):
+    profile_root = tmp_path / "profiles"
+    shutil.copytree(data_dir, profile_root)
+    cache = kloch.filesyntax.MergedProfileCache(tmp_path / "cache")
+    profile_path = profile_root / "profile.echoes.yml"
+
+    resolver = kloch.filesyntax.ProfileResolver([profile_root], cache=cache)
+    expected = resolver.get_merged_profile(profile_path)
+    assert expected.inherit is None
+    assert list(cache.root.glob("*.json"))
+    assert resolver.get_inheritance_paths(profile_path) == [
+        profile_path,
+        profile_root / "profile.echoes-beta.yml",
+    ]
+
+    loaded = []
+    original_yaml_load = kloch.filesyntax._io.yaml_load
+
+    def _patched_yaml_load(stream):
+        loaded.append(stream)
+        return original_yaml_load(stream)
+
+    monkeypatch.setattr(kloch.filesyntax._io, "yaml_load", _patched_yaml_load)
+
+    resolver = kloch.filesyntax.ProfileResolver([profile_root], cache=cache)
+    result = resolver.get_merged_profile(profile_path)
+    assert not loaded
+    assert result.to_dict() == expected.to_dict()
+
+    # modifying any file of the inheritance chain invalidates the cache
+    base_path = profile_root / "profile.echoes-beta.yml"
+    base_path.write_text(base_path.read_text() + "\n# modified\n")
+
+    resolver = kloch.filesyntax.ProfileResolver([profile_root], cache=cache)
+    result = resolver.get_merged_profile(profile_path)
+    assert loaded
+    assert result.to_dict() == expected.to_dict()
+
+
+def test__MergedProfileCache__invalid(tmp_path: Path):
+    cache = kloch.filesyntax.MergedProfileCache(tmp_path)
+    profile_path = tmp_path / "profile.yml"
+    assert cache.get(profile_path, []) is None
+
+    entry_path = cache._get_entry_path(profile_path, [])
+    entry_path.write_text("{not json")
+    assert cache.get(profile_path, []) is None
+
+
+def test__MergedProfileCache__modified_while_read(data_dir, tmp_path, monkeypatch):
+    profile_root = tmp_path / "profiles"
+    shutil.copytree(data_dir, profile_root)
+    cache = kloch.filesyntax.MergedProfileCache(tmp_path / "cache")
+    profile_path = profile_root / "profile.echoes-beta.yml"
+    modified_content = profile_path.read_text().replace(
+        "launchers:", "launchers:\n  .base: {}", 1
+    )
+
+    original_yaml_load = kloch.filesyntax._io.yaml_load
+
+    def _patched_yaml_load(stream):
+        content = original_yaml_load(stream)
+        # the file is modified right after being read
+        if getattr(stream, "name", None) == str(profile_path):
+            profile_path.write_text(modified_content)
+        return content
+
+    monkeypatch.setattr(kloch.filesyntax._io, "yaml_load", _patched_yaml_load)
+
+    resolver = kloch.filesyntax.ProfileResolver([profile_root], cache=cache)
+    profile = resolver.get_merged_profile(profile_path)
+    assert ".base" not in profile.launchers
+
+    monkeypatch.setattr(kloch.filesyntax._io, "yaml_load", original_yaml_load)
+    resolver = kloch.filesyntax.ProfileResolver([profile_root], cache=cache)
+    profile = resolver.get_merged_profile(profile_path)
+    assert ".base" in profile.launchers
+
+
+def test__MergedProfileCache__identifier_added(data_dir, tmp_path: Path):
+    profile_root = tmp_path / "profiles"
+    shutil.copytree(data_dir, profile_root)
+    cache = kloch.filesyntax.MergedProfileCache(tmp_path / "cache")
+    profile_path = profile_root / "profile.echoes.yml"
+    other_path = profile_root / "profile.other.yml"
+    other_path.write_text(
+        "__magic__: kloch_profile:4\n"
+        "identifier: knots:other\n"
+        "version: 0.1.0\n"
+        "launchers: {}\n"
+    )
+
+    resolver = kloch.filesyntax.ProfileResolver([profile_root], cache=cache)
+    resolver.get_merged_profile(profile_path)
+
+    # editing a file in place doesn't change the profile root stat values
+    root_signature = _get_signature(profile_root)
+    other_path.write_text(
+        other_path.read_text().replace("knots:other", "knots:echoes:beta")
+    )
+    assert _get_signature(profile_root) == root_signature
+
+    resolver = kloch.filesyntax.ProfileResolver([profile_root], cache=cache)
+    with pytest.raises(kloch.filesyntax.ProfileInheritanceError):
+        resolver.get_merged_profile(profile_path)
+
+
+def test__MergedProfileCache__prune(data_dir, tmp_path: Path):
+    profile_root = tmp_path / "profiles"
+    shutil.copytree(data_dir, profile_root)
+    cache = kloch.filesyntax.MergedProfileCache(tmp_path / "cache")
+
+    resolver = kloch.filesyntax.ProfileResolver([profile_root], cache=cache)
+    profile_paths = [
+        profile_root / "profile.echoes-beta.yml",
+        profile_root / "profile.knots.yml",
+        profile_root / "profile.lxm.yml",
+    ]
+    entry_paths = []
+    for index, profile_path in enumerate(profile_paths):
+        resolver.get_merged_profile(profile_path)
+        entry_path = cache._get_entry_path(profile_path, [profile_root])
+        os.utime(entry_path, (1000 + index, 1000 + index))
+        entry_paths.append(entry_path)
+    assert len(list(cache.root.glob("*.json"))) == 3
+
+    # a cache hit marks the entry as recently used
+    resolver = kloch.filesyntax.ProfileResolver([profile_root], cache=cache)
+    resolver.get_merged_profile(profile_paths[0])
+
+    cache.max_entries = 2
+    cache.prune()
+    assert [entry_path.exists() for entry_path in entry_paths] == [True, False, True]
@@ -0,0 +1,71 @@
+from pathlib import Path
+
+import yaml
+
+import kloch.filesyntax._header
+from kloch.filesyntax._header import read_profile_header
+
+
+def test__read_profile_header(data_dir):
+    header = read_profile_header(data_dir / "profile.echoes.yml")
+    assert header.magic == "kloch_profile:4"
+    assert header.identifier == "knots:echoes"
+    assert header.version == "0.2.0"
+    assert header.inherit == "knots:echoes:beta"
+
+    header = read_profile_header(data_dir / "profile.echoes-beta.yml")
+    assert header.identifier == "knots:echoes:beta"
+    assert header.inherit is None
+
+    assert read_profile_header(data_dir / "fake-profile.yml") is None
+    assert read_profile_header(data_dir / "config-blaj.yml") is None
+
+
+def test__read_profile_header__same_as_yaml(tmp_path: Path):
+    contents = [
+        "__magic__: kloch_profile:4\nidentifier: foo\nversion: 1.0\nlaunchers: {}\n",
+        "# comment\n---\n'__magic__': \"kloch_profile:4\" # comment\nidentifier: 'foo'\nversion: 12\n",
+        "launchers:\n  .base:\n    environ: {}\nversion: 0.1.0\ninherit: bar\nidentifier: foo\n__magic__: kloch_profile:4\n",
+        "__magic__: kloch_profile:4\nidentifier: foo\n  bar\nversion: 1\n",
+        '__magic__: kloch_profile:4\nidentifier: "foo\n  bar"\nversion: 1\n',
+        "__magic__: kloch_profile:4\nidentifier:\n  foo\nversion: 1\n",
+        "__magic__: kloch_profile:4\nidentifier: &anchor foo\ninherit: *anchor\n",
+        "__magic__: kloch_profile:4\nidentifier: foo\nversion: 0123\ninherit: null\n",
+        "{__magic__: kloch_profile:4, identifier: foo}\n",
+        "- __magic__: kloch_profile:4\n",
+        "__magic__: something else\nidentifier: foo\n",
+    ]
+    for index, content in enumerate(contents):
+        path = tmp_path / f"{index}.yml"
+        path.write_text(content, encoding="utf-8")
+
+        asdict = yaml.safe_load(content)
+        header = read_profile_header(path)
+        if not isinstance(asdict, dict) or asdict.get("__magic__") != "kloch_profile:4":
+            assert header is None, content
+            continue
+
+        assert header.identifier == asdict.get("identifier"), content
+        assert header.version == asdict.get("version"), content
+        assert header.inherit == asdict.get("inherit"), content
+
+
+def test__read_profile_header__no_full_parse(tmp_path: Path, monkeypatch):
+    path = tmp_path / "big.yml"
+    lines = ["root:"] + [f"  key{index}: value{index}" for index in range(5000)]
+    path.write_text("\n".join(lines))
+
+    def _raise(*args, **kwargs):
+        raise AssertionError("full parsing should not happen")
+
+    monkeypatch.setattr(kloch.filesyntax._header, "yaml_load", _raise)
+    assert read_profile_header(path) is None
+
+    path = tmp_path / "profile.yml"
+    path.write_text(
+        "__magic__: kloch_profile:4\nidentifier: foo\nversion: 0.1.0\n"
+        + "\n".join(lines)
+    )
+    header = read_profile_header(path)
+    assert header.identifier == "foo"
+    assert header.inherit is None
@@ -0,0 +1,101 @@
+import shutil
+from pathlib import Path
+
+import kloch.filesyntax
+import kloch.filesyntax._index
+
+
+def test__ProfileIndex(data_dir):
+    index = kloch.filesyntax.ProfileIndex()
+
+    result = kloch.filesyntax.get_all_profile_file_paths([data_dir], index=index)
+    expected = kloch.filesyntax.get_all_profile_file_paths([data_dir])
+    assert result == expected
+
+    result = kloch.filesyntax.get_profile_file_path(
+        "knots:echoes",
+        profile_locations=[data_dir],
+        index=index,
+    )
+    assert result == [data_dir / "profile.echoes.yml"]
+
+    result = kloch.filesyntax.get_profile_file_path(
+        "not-existing",
+        profile_locations=[data_dir],
+        index=index,
+    )
+    assert result == []
+
+    profile = kloch.filesyntax.read_profile_from_id(
+        "knots:echoes:tmp",
+        profile_locations=[data_dir],
+        index=index,
+    )
+    assert profile.inherit.identifier == "knots:echoes"
+
+
+def test__ProfileIndex__persistence(data_dir, tmp_path: Path, monkeypatch):
+    profile_root = tmp_path / "profiles"
+    profile_root.mkdir()
+    shutil.copy(data_dir / "profile.echoes.yml", profile_root)
+    shutil.copy(data_dir / "profile.echoes-beta.yml", profile_root)
+    shutil.copy(data_dir / "fake-profile.yml", profile_root)
+
+    index_path = tmp_path / "cache" / "index.json"
+    index = kloch.filesyntax.ProfileIndex.load(index_path)
+    index.update([profile_root])
+    index.save()
+    assert index_path.exists()
+
+    parsed = []
+    original_reader = kloch.filesyntax._index._read_profile_identifier
+
+    def _patched_reader(file_path: Path):
+        parsed.append(file_path)
+        return original_reader(file_path)
+
+    monkeypatch.setattr(
+        kloch.filesyntax._index,
+        "_read_profile_identifier",
+        _patched_reader,
+    )
+
+    index = kloch.filesyntax.ProfileIndex.load(index_path)
+    result = kloch.filesyntax.get_profile_file_path(
+        "knots:echoes",
+        profile_locations=[profile_root],
+        index=index,
+    )
+    assert result == [profile_root / "profile.echoes.yml"]
+    assert parsed == []
+
+    # a modified file is parsed again
+    beta_path = profile_root / "profile.echoes-beta.yml"
+    beta_path.write_text(
+        beta_path.read_text().replace("knots:echoes:beta", "knots:echoes:gamma")
+    )
+    # a new file is discovered
+    shutil.copy(data_dir / "profile.lxm.yml", profile_root)
+
+    result = kloch.filesyntax.get_all_profile_file_paths([profile_root], index=index)
+    assert len(result) == 3
+    assert sorted(parsed) == [beta_path, profile_root / "profile.lxm.yml"]
+
+    result = kloch.filesyntax.get_profile_file_path(
+        "knots:echoes:gamma",
+        profile_locations=[profile_root],
+        index=index,
+    )
+    assert result == [beta_path]
+
+    # a removed file is not listed anymore
+    beta_path.unlink()
+    result = kloch.filesyntax.get_all_profile_file_paths([profile_root], index=index)
+    assert len(result) == 2
+
+
+def test__ProfileIndex__load__invalid(tmp_path: Path):
+    index_path = tmp_path / "index.json"
+    index_path.write_text("{not json")
+    index = kloch.filesyntax.ProfileIndex.load(index_path)
+    assert index.get_profile_paths([tmp_path]) == []
@@ -1,8 +1,14 @@
+import copy
+import os
+import shutil
 from pathlib import Path
 
 import pytest
 
+import kloch
 import kloch.filesyntax
+import kloch.filesyntax._io
+import kloch.launchers
 
 
 def test__is_file_environment_profile(data_dir):
@@ -128,3 +134,219 @@ def test__write_profile_to_file(data_dir, tmp_path: Path):
             profile_locations=[data_dir],
             check_valid_id=True,
         )
+
+
+def test__ProfileResolver(data_dir, monkeypatch):
+    import kloch.filesyntax._io
+
+    parsed = []
+    original_yaml_load = kloch.filesyntax._io.yaml_load
+
+    def patched_yaml_load(stream):
+        parsed.append(stream.name)
+        return original_yaml_load(stream)
+
+    monkeypatch.setattr(kloch.filesyntax._io, "yaml_load", patched_yaml_load)
+
+    resolver = kloch.filesyntax.ProfileResolver([data_dir])
+    profile = kloch.filesyntax.read_profile_from_id(
+        "knots:echoes:tmp",
+        resolver=resolver,
+    )
+    assert profile.inherit.inherit.identifier == "knots:echoes:beta"
+    # each file of the inheritance chain is only parsed once
+    assert len(parsed) == 3
+    assert len(parsed) == len(set(parsed))
+
+    parsed.clear()
+    profile_echoes = kloch.filesyntax.read_profile_from_id(
+        "knots:echoes",
+        resolver=resolver,
+    )
+    assert profile_echoes.to_dict() == profile.inherit.to_dict()
+    serialized = kloch.filesyntax.serialize_profile(profile, resolver=resolver)
+    assert "inherit: knots:echoes" in serialized
+    assert parsed == []
+
+
+def test__ProfileResolver__read_profile__modified(data_dir):
+    def _get_launchers(profile):
+        return copy.deepcopy([profile.launchers, profile.inherit.launchers])
+
+    resolver = kloch.filesyntax.ProfileResolver([data_dir])
+    profile_path = data_dir / "profile.echoes.yml"
+    profile = resolver.read_profile(profile_path)
+    expected = _get_launchers(profile)
+    merged = resolver.get_merged_profile(profile_path).to_dict()
+
+    # modifying the returned profiles doesn't affect the next ones
+    profile.launchers["+=rezenv"]["+=requires"]["modified"] = "1"
+    profile.inherit.launchers.clear()
+    profile.inherit = None
+    assert _get_launchers(resolver.read_profile(profile_path)) == expected
+    assert resolver.get_merged_profile(profile_path).to_dict() == merged
+
+    lazy_profile = resolver.read_lazy_profile(profile_path)
+    lazy_profile.launchers["+=rezenv"]["+=requires"]["modified"] = "1"
+    lazy_profile.inherit.launchers.clear()
+    assert _get_launchers(resolver.read_lazy_profile(profile_path)) == expected
+    assert _get_launchers(resolver.read_profile(profile_path)) == expected
+
+
+def test__ProfileResolver__io_workers(data_dir, tmp_path):
+    resolver = kloch.filesyntax.ProfileResolver([data_dir], io_workers=1)
+    expected = resolver.get_all_profile_paths()
+
+    resolver = kloch.filesyntax.ProfileResolver([data_dir], io_workers=4)
+    assert resolver.get_all_profile_paths() == expected
+
+    index = kloch.filesyntax.ProfileIndex()
+    resolver = kloch.filesyntax.ProfileResolver([data_dir], index=index, io_workers=4)
+    assert resolver.get_all_profile_paths() == expected
+
+    invalid_path = tmp_path / "invalid.yml"
+    invalid_path.write_text("{invalid yaml")
+    resolver.prefetch(expected + [invalid_path])
+    assert set(resolver._contents) == set(expected)
+    profile = resolver.read_profile(data_dir / "profile.echoes.yml")
+    assert profile.identifier == "knots:echoes"
+
+
+def test__read_profile_from_file__lazy(data_dir, monkeypatch):
+    import kloch.filesyntax._io
+
+    parsed = []
+    original_yaml_load = kloch.filesyntax._io.yaml_load
+
+    def patched_yaml_load(stream):
+        parsed.append(stream.name)
+        return original_yaml_load(stream)
+
+    monkeypatch.setattr(kloch.filesyntax._io, "yaml_load", patched_yaml_load)
+
+    profile_path = data_dir / "profile.echoes.yml"
+    resolver = kloch.filesyntax.ProfileResolver([data_dir])
+    profile = kloch.filesyntax.read_profile_from_file(
+        profile_path,
+        resolver=resolver,
+        lazy=True,
+    )
+    assert isinstance(profile, kloch.filesyntax.LazyEnvironmentProfile)
+    assert profile.identifier == "knots:echoes"
+    assert profile.version == "0.2.0"
+    assert not profile.is_loaded
+    assert parsed == []
+
+    assert profile.inherit.identifier == "knots:echoes:beta"
+    assert parsed == []
+
+    expected = kloch.filesyntax.read_profile_from_file(profile_path, [data_dir])
+    assert profile.launchers == expected.launchers
+    assert str(profile_path) in parsed
+    assert profile.get_merged_profile() == expected.get_merged_profile()
+
+    with pytest.raises(kloch.filesyntax.ProfileAPIVersionError):
+        kloch.filesyntax.read_profile_from_file(
+            data_dir / "profile-old-version.yml",
+            resolver=resolver,
+            lazy=True,
+        )
+
+
+def test__ProfileResolver__get_merged_profile(data_dir, tmp_path, monkeypatch):
+    profile_root = tmp_path / "profiles"
+    shutil.copytree(data_dir, profile_root)
+    profile_path = profile_root / "profile.echoes-tmp.yml"
+    base_path = profile_root / "profile.echoes-beta.yml"
+
+    merges = []
+    original_add = kloch.MergeableDict.__add__
+
+    def patched_add(self, other):
+        merges.append(other)
+        return original_add(self, other)
+
+    monkeypatch.setattr(kloch.MergeableDict, "__add__", patched_add)
+
+    resolver = kloch.filesyntax.ProfileResolver([profile_root])
+    profile = resolver.get_merged_profile(profile_path)
+    expected = kloch.filesyntax.read_profile_from_file(
+        profile_path, [profile_root]
+    ).get_merged_profile()
+    assert profile.inherit is None
+    assert profile.launchers == expected.launchers
+    # echoes-tmp > echoes > echoes-beta
+    assert len(merges) == 2
+
+    # the shared ancestor is reused
+    merges.clear()
+    resolver.get_merged_profile(profile_root / "profile.echoes.yml")
+    assert resolver.get_merged_profile(profile_path) == profile
+    assert len(merges) == 0
+
+    # returned profiles are not shared
+    profile.launchers.clear()
+    assert resolver.get_merged_profile(profile_path).launchers == expected.launchers
+
+    # modifying an ancestor invalidates all the descendants
+    base_path.write_text(
+        base_path.read_text().replace("launchers:", "launchers:\n  .base: {}", 1)
+    )
+    os.utime(base_path, ns=(0, 0))
+    profile = resolver.get_merged_profile(profile_path)
+    assert len(merges) == 2
+    assert ".base" in profile.launchers
+
+
+def test__ProfileResolver__get_merged_profile__modified_while_read(
+    data_dir, tmp_path, monkeypatch
+):
+    profile_root = tmp_path / "profiles"
+    shutil.copytree(data_dir, profile_root)
+    profile_path = profile_root / "profile.echoes-beta.yml"
+    original_content = profile_path.read_text()
+    modified_content = original_content.replace(
+        "launchers:", "launchers:\n  .base: {}", 1
+    )
+
+    original_yaml_load = kloch.filesyntax._io.yaml_load
+
+    def _patched_yaml_load(stream):
+        content = original_yaml_load(stream)
+        # the file is modified right after being read
+        if getattr(stream, "name", None) == str(profile_path):
+            profile_path.write_text(modified_content)
+        return content
+
+    monkeypatch.setattr(kloch.filesyntax._io, "yaml_load", _patched_yaml_load)
+
+    resolver = kloch.filesyntax.ProfileResolver([profile_root])
+    profile = resolver.get_merged_profile(profile_path)
+    assert ".base" not in profile.launchers
+
+    monkeypatch.setattr(kloch.filesyntax._io, "yaml_load", original_yaml_load)
+    profile = resolver.get_merged_profile(profile_path)
+    assert ".base" in profile.launchers
+
+
+def test__iter_resolved_profiles(data_dir):
+    context = kloch.launchers.LauncherContext.from_dict({"os": "linux"})
+    resolver = kloch.filesyntax.ProfileResolver([data_dir])
+    requests = [
+        (["knots:echoes"], None),
+        (["knots:echoes", str(data_dir / "profile.lxm.yml")], context),
+    ]
+    profiles = list(
+        kloch.filesyntax.iter_resolved_profiles(requests, resolver=resolver)
+    )
+    assert [profile.identifier for profile in profiles] == ["knots:echoes", "lxm"]
+    for profile, (profile_ids, context) in zip(profiles, requests):
+        expected = kloch.filesyntax.resolve_profiles(
+            profile_ids,
+            context=context,
+            profile_locations=[data_dir],
+        )
+        assert profile == expected
+
+    with pytest.raises(kloch.filesyntax.ProfileIdentifierError):
+        kloch.filesyntax.resolve_profiles(["not-existing"], resolver=resolver)
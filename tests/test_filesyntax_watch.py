@@ -0,0 +1,151 @@
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+import kloch.filesyntax
+import kloch.filesyntax._index
+import kloch.filesyntax._watch
+
+
+def _get_watchers():
+    watchers = [kloch.filesyntax._watch.PollingProfileWatcher]
+    try:
+        kloch.filesyntax._watch.InotifyProfileWatcher().close()
+    except OSError:
+        pass
+    else:
+        watchers.append(kloch.filesyntax._watch.InotifyProfileWatcher)
+    return watchers
+
+
+def test__ProfileWatcher__abstract():
+    class IncompleteWatcher(kloch.filesyntax.ProfileWatcher):
+        pass
+
+    with pytest.raises(TypeError):
+        IncompleteWatcher()
+
+
+@pytest.mark.parametrize("watcher_class", _get_watchers())
+def test__ProfileWatcher(watcher_class, data_dir, tmp_path: Path):
+    profile_root = tmp_path / "profiles"
+    missing_root = tmp_path / "missing"
+    profile_root.mkdir()
+    shutil.copy(data_dir / "profile.echoes.yml", profile_root)
+
+    watcher = watcher_class()
+    watcher.add([profile_root, missing_root])
+    try:
+        assert watcher.poll() == []
+
+        profile_path = profile_root / "profile.echoes.yml"
+        profile_path.write_text(profile_path.read_text() + "\n# modified\n")
+        assert watcher.poll() == [profile_path]
+        assert watcher.poll() == []
+
+        new_path = profile_root / "profile.new.yml"
+        new_path.write_text("new")
+        changed = watcher.poll()
+        assert profile_root in changed
+
+        # only yaml files are watched
+        (profile_root / "notes.txt").write_text("text")
+        assert profile_root not in watcher.poll()
+
+        missing_root.mkdir()
+        assert missing_root in watcher.poll()
+    finally:
+        watcher.close()
+
+
+def test__GenerationStamp(tmp_path: Path, monkeypatch):
+    profile_root = tmp_path / "profiles"
+    stamp = kloch.filesyntax.GenerationStamp(tmp_path / "stamp.json")
+    assert stamp.read([profile_root]) is None
+
+    stamp.bump([profile_root])
+    generation = stamp.read([profile_root])
+    assert generation
+    # not watched
+    assert stamp.read([profile_root, tmp_path / "other"]) is None
+
+    stamp.bump([profile_root])
+    assert stamp.read([profile_root]) != generation
+
+    # the pid is now used by another process
+    if kloch.filesyntax._watch._get_process_start(os.getpid()) is not None:
+        with monkeypatch.context() as context:
+            context.setattr(
+                kloch.filesyntax._watch, "_get_process_start", lambda pid: "other"
+            )
+            assert stamp.read([profile_root]) is None
+        assert stamp.read([profile_root])
+
+    stamp.clear()
+    assert stamp.read([profile_root]) is None
+
+
+def test__ProfileIndex__stamp(data_dir, tmp_path: Path, monkeypatch):
+    profile_root = tmp_path / "profiles"
+    shutil.copytree(data_dir, profile_root)
+    stamp = kloch.filesyntax.GenerationStamp(tmp_path / "stamp.json")
+    stamp.bump([profile_root])
+
+    index_path = tmp_path / "index.json"
+    index = kloch.filesyntax.ProfileIndex.load(index_path, stamp=stamp)
+    index.update([profile_root])
+    index.save()
+    expected = index.get_identifiers([profile_root])
+
+    stat_calls = []
+    original_stat = kloch.filesyntax._index._stat
+
+    def _patched_stat(path):
+        stat_calls.append(path)
+        return original_stat(path)
+
+    monkeypatch.setattr(kloch.filesyntax._index, "_stat", _patched_stat)
+
+    # the stamp didn't change: only the root is checked
+    index = kloch.filesyntax.ProfileIndex.load(index_path, stamp=stamp)
+    index.update([profile_root])
+    assert stat_calls == [profile_root]
+    assert index.get_identifiers([profile_root]) == expected
+
+    # a profile added by another host, not seen by the watcher
+    stat_calls.clear()
+    new_path = profile_root / "profile.new.yml"
+    new_path.write_text(
+        "__magic__: kloch_profile:4\nidentifier: new\nversion: 0.1.0\nlaunchers: {}\n"
+    )
+    os.utime(profile_root, ns=(0, 0))
+    index.update([profile_root])
+    assert ("new", new_path) in index.get_identifiers([profile_root])
+    new_path.unlink()
+    index.update([profile_root])
+    expected = index.get_identifiers([profile_root])
+
+    # roots that don't exist are also recorded
+    missing_root = tmp_path / "missing"
+    stamp.bump([profile_root, missing_root])
+    index.update([profile_root, missing_root])
+    stat_calls.clear()
+    index.update([profile_root, missing_root])
+    assert stat_calls == [profile_root, missing_root]
+    assert index.get_identifiers([profile_root, missing_root]) == expected
+
+    profile_path = profile_root / "profile.echoes.yml"
+    index.mark_changed([profile_path])
+    stamp.bump([profile_root])
+    index.update([profile_root])
+    assert stat_calls
+
+    # the process which wrote the stamp is not alive anymore
+    monkeypatch.setattr(
+        kloch.filesyntax._watch, "_is_process_alive", lambda pid: pid != os.getpid()
+    )
+    stat_calls.clear()
+    index.update([profile_root])
+    assert stat_calls
@@ -0,0 +1,60 @@
+import subprocess
+import sys
+from pathlib import Path
+from typing import Set
+
+import kloch
+
+THISDIR = Path(__file__).parent
+
+
+def _get_imported_modules(code: str) -> Set[str]:
+    """
+    Return the name of the modules imported by the given code.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=str(THISDIR.parent),
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        modules.add(name.strip())
+    return modules
+
+
+def test__import__lazy():
+    modules = _get_imported_modules("import kloch; kloch.MergeableDict")
+    unexpected = {
+        "argparse",
+        "runpy",
+        "subprocess",
+        "yaml",
+        "kloch.cli",
+        "kloch.config",
+        "kloch.filesyntax",
+        "kloch.launchers",
+    }
+    assert not unexpected.intersection(modules)
+
+    # XXX: modules imported with importlib are not reported by importtime
+    modules = _get_imported_modules("import kloch.cli, kloch.launchers.system")
+    assert "kloch.cli" in modules
+
+
+def test__import__attributes():
+    for name in kloch.__all__:
+        assert getattr(kloch, name) is not None, name
+        assert name in dir(kloch)
+
+    for name in kloch.launchers._LAZY_ATTRIBUTES:
+        assert getattr(kloch.launchers, name) is not None, name
+
+    assert kloch.launchers.SystemLauncher is kloch.launchers.system.SystemLauncher
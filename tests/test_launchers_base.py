@@ -5,8 +5,12 @@ from typing import List
 
 import pytest
 
+import kloch.launchers.base._serialized
+
 from kloch.launchers import BaseLauncher
 from kloch.launchers import BaseLauncherSerialized
+from kloch.launchers import EnvironCycleError
+from kloch.launchers import PathCache
 from kloch.launchers.base._serialized import resolve_environ
 
 
@@ -29,6 +33,69 @@ def test__resolve_environ(monkeypatch):
     assert result["NUMBER"] == "1"
     assert result["ANOTHERONE"] == "SUCCESS"
     assert result["SUCCESSIVE"] == "1"
+    assert "NUMBER" not in os.environ
+
+    result = resolve_environ(src_environ, base={"__TEST__": "BASE"})
+    assert result["PATH"] == f"$PATH{os.pathsep}D:\\some\\path"
+    assert result["ANOTHERONE"] == "BASE"
+
+
+def test__resolve_environ__order(monkeypatch):
+    monkeypatch.setenv("__TEST__", "SYSTEM")
+
+    src_environ = {
+        "FIRST": "$SECOND/first",
+        "__TEST__": ["$__TEST__", "$THIRD"],
+        "SECOND": "${THIRD}/second",
+        "THIRD": "third",
+    }
+    result = resolve_environ(src_environ)
+    assert list(result) == list(src_environ)
+    assert result["FIRST"] == "third/second/first"
+    assert result["__TEST__"] == f"SYSTEM{os.pathsep}third"
+    assert result["SECOND"] == "third/second"
+
+    reordered = dict(reversed(list(src_environ.items())))
+    assert resolve_environ(reordered) == result
+
+    src_environ = {"FIRST": "$THIRD", "SECOND": "$FIRST", "THIRD": ["$SECOND"]}
+    with pytest.raises(EnvironCycleError) as error:
+        resolve_environ(src_environ)
+    assert "FIRST -> THIRD -> SECOND -> FIRST" in str(error.value)
+
+
+def test__resolve_environ__paths(tmp_path, monkeypatch):
+    calls = []
+    original_resolve_path = kloch.launchers.base._serialized._resolve_path
+
+    def _patched_resolve_path(src_str):
+        calls.append(src_str)
+        return original_resolve_path(src_str)
+
+    monkeypatch.setattr(
+        kloch.launchers.base._serialized, "_resolve_path", _patched_resolve_path
+    )
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "dir").mkdir()
+    paths = [f"dir/../dir{index % 20}" for index in range(40)] + ["dir"]
+
+    src_environ = {"PATHS": paths, "OTHER": "dir", "RAW": "dir"}
+    result = resolve_environ(src_environ, skip_paths=["RAW"])
+    paths = result["PATHS"].split(os.pathsep)
+    assert paths[0] == "dir/../dir0"
+    assert paths[-1] == str(tmp_path / "dir")
+    assert result["OTHER"] == str(tmp_path / "dir")
+    assert result["RAW"] == "dir"
+    # each path checked once
+    assert len(calls) == 21
+
+    calls.clear()
+    with PathCache() as path_cache:
+        assert PathCache.current() is path_cache
+        resolve_environ(src_environ)
+        resolve_environ(src_environ)
+    assert PathCache.current() is None
+    assert len(calls) == 21
 
 
 def test__BaseLauncher__required_fields():
@@ -97,6 +164,32 @@ def test__BaseLauncherSerialized(data_dir, monkeypatch):
     instance = BaseLauncherSerialized(src_dict)
     instance.validate()
 
+    src_dict = {"environ": {"CWD": "."}, "environ_skip_paths": ["CWD"]}
+    instance = BaseLauncherSerialized(src_dict)
+    instance.validate()
+    launcher = instance.unserialize()
+    assert launcher.environ["CWD"] == "."
+
+    src_dict = {"+=command": "arg1"}
+    instance = BaseLauncherSerialized(src_dict)
+    with pytest.raises(AssertionError) as error:
+        instance.validate()
+    assert "must be a list" in str(error.value)
+
+    src_dict = {"environ_skip_paths": "CWD"}
+    instance = BaseLauncherSerialized(src_dict)
+    with pytest.raises(AssertionError) as error:
+        instance.validate()
+    assert "must be a list" in str(error.value)
+
+
+def test__BaseLauncherSerialized__get_priority():
+    assert BaseLauncherSerialized({}).get_priority() == 0
+    assert BaseLauncherSerialized({"==priority": 3}).get_priority() == 3
+
+    with pytest.raises(AssertionError):
+        BaseLauncherSerialized({"priority": "3"}).get_priority()
+
 
 def test__test__BaseLauncherSerialized__fields():
     fields = BaseLauncherSerialized.fields.iterate()
@@ -124,3 +217,92 @@ def test__BaseLauncherSerialized__merge_system_environ(data_dir, monkeypatch):
     instance[BaseLauncherSerialized.fields.merge_system_environ] = False
     resolved = instance.resolved()
     assert len(resolved["environ"]) == 3
+
+
+def test__BaseLauncherSerialized__environ_variable_token(monkeypatch):
+    monkeypatch.setenv("__UNITTEST_REMOVED__", "removed")
+    monkeypatch.setenv("__UNITTEST_KEPT__", "kept")
+
+    for key in ["+=__UNITTEST__", "==__UNITTEST_KEPT__"]:
+        instance = BaseLauncherSerialized({"environ": {key: "value"}})
+        with pytest.raises(ValueError, match="illegal environment variable name"):
+            instance.resolved()
+
+    # tokens are only supported when merging with the system environ
+    for key in ["+=__UNITTEST__", "-=__UNITTEST_REMOVED__", "!=__UNITTEST_NEW__"]:
+        instance = BaseLauncherSerialized({"environ": {key: "value"}})
+        instance[BaseLauncherSerialized.fields.merge_system_environ] = False
+        with pytest.raises(ValueError, match="illegal environment variable name"):
+            instance.resolved()
+
+    # tokens resolved by merging with the system environ are still supported
+    src_dict = {
+        "environ": {
+            "-=__UNITTEST_REMOVED__": "",
+            "!=__UNITTEST_KEPT__": "ignored",
+            "!=__UNITTEST_NEW__": "$__UNITTEST_KEPT__-new",
+        }
+    }
+    environ = BaseLauncherSerialized(src_dict).resolved()["environ"]
+    assert "__UNITTEST_REMOVED__" not in environ
+    assert environ["__UNITTEST_KEPT__"] == "kept"
+    assert environ["__UNITTEST_NEW__"] == "kept-new"
+    assert not [key for key in environ if "=" in key]
+
+
+def test__BaseLauncherSerialized__environ_token(monkeypatch):
+    monkeypatch.setenv("__UNITTEST__", "SUCCESS")
+
+    src_dict = {"+=environ": {"A": "hello", "B": "$__UNITTEST__"}}
+    instance = BaseLauncherSerialized(src_dict)
+    resolved = instance.resolved()
+    assert resolved["environ"]["A"] == "hello"
+    assert resolved["environ"]["B"] == "SUCCESS"
+    assert "__UNITTEST__" in resolved["environ"]
+
+    instance[BaseLauncherSerialized.fields.merge_system_environ] = False
+    resolved = instance.resolved()
+    assert resolved["environ"] == {"A": "hello", "B": "SUCCESS"}
+
+    launcher = BaseLauncherSerialized(src_dict).unserialize()
+    assert launcher.environ["A"] == "hello"
+
+
+def test__BaseLauncherSerialized__merge_system_environ__untouched(monkeypatch):
+    monkeypatch.setenv("__UNITTEST__", "SUCCESS")
+    monkeypatch.setenv("__UNITTEST_VAR__", "$__UNITTEST__")
+    monkeypatch.setenv("__UNITTEST_DIR__", ".")
+    monkeypatch.setenv("__UNITTEST_REMOVED__", "removed")
+    monkeypatch.setenv("__UNITTEST_KEPT__", "kept")
+
+    calls = []
+    original_resolve_path = kloch.launchers.base._serialized._resolve_path
+
+    def _patched_resolve_path(src_str):
+        calls.append(src_str)
+        return original_resolve_path(src_str)
+
+    monkeypatch.setattr(
+        kloch.launchers.base._serialized, "_resolve_path", _patched_resolve_path
+    )
+
+    src_dict = {
+        "environ": {
+            "NEW": "$__UNITTEST__",
+            "-=__UNITTEST_REMOVED__": "",
+            "!=__UNITTEST_KEPT__": "ignored",
+        },
+    }
+    instance = BaseLauncherSerialized(src_dict)
+    resolved = instance.resolved()
+    environ = resolved["environ"]
+    # only the profile variables are resolved
+    assert calls == ["SUCCESS"]
+    assert environ["NEW"] == "SUCCESS"
+    assert environ["__UNITTEST_VAR__"] == "$__UNITTEST__"
+    assert environ["__UNITTEST_DIR__"] == "."
+    assert environ["__UNITTEST_KEPT__"] == "kept"
+    assert "__UNITTEST_REMOVED__" not in environ
+    assert "-=__UNITTEST_REMOVED__" not in environ
+    assert len(environ) == len(os.environ)
+    assert resolved["merge_system_environ"] is False
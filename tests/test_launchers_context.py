@@ -1,5 +1,7 @@
 import dataclasses
 
+import pytest
+
 from kloch.launchers._context import LauncherContext
 from kloch.launchers._context import LauncherPlatform
 from kloch.launchers._context import unserialize_context_expression
@@ -30,6 +32,23 @@ def test__ProfileContext__devmistake():
         assert "description" in field.metadata["doc"]
 
 
+def test__ProfileContext__from_dict():
+    context = LauncherContext.from_dict({"os": "linux", "user": "demo"})
+    assert context.platform == LauncherPlatform.linux
+    assert context.user == "demo"
+    assert LauncherContext.from_dict({}) == LauncherContext()
+
+    with pytest.raises(KeyError):
+        LauncherContext.from_dict({"platform": "linux"})
+
+
+def test__ProfileContext__to_dict():
+    context = LauncherContext(platform=LauncherPlatform.darwin, user="demo")
+    assert context.to_dict() == {"os": "mac", "user": "demo"}
+    assert LauncherContext.from_dict(context.to_dict()) == context
+    assert LauncherContext(user="demo").to_dict() == {"user": "demo"}
+
+
 def test__unserialize_context_expression():
     source = "he!$69@os=windows"
     result = unserialize_context_expression(source)
@@ -1,6 +1,11 @@
+import logging
+import os
+import threading
 import time
 from pathlib import Path
 
+import pytest
+
 import kloch.session
 
 
@@ -31,3 +36,259 @@ def test__clean_outdated_session_dirs(tmp_path: Path):
     assert session3.path.exists()
     assert not session2.path.exists()
     assert not session1.path.exists()
+
+
+def test__clean_outdated_session_dirs__time_budget(tmp_path: Path):
+    for _ in range(3):
+        kloch.session.SessionDirectory.initialize(tmp_path)
+    time.sleep(0.05)
+
+    lifetime = 0.01 / 3600
+    cleaned = kloch.session.clean_outdated_session_dirs(
+        tmp_path,
+        lifetime=lifetime,
+        time_budget=-1,
+    )
+    assert cleaned == []
+    assert len(kloch.session.get_session_dirs(tmp_path)) == 3
+
+
+def test__start_session_cleanup(tmp_path: Path):
+    session1 = kloch.session.SessionDirectory.initialize(tmp_path)
+    time.sleep(0.05)
+
+    lifetime = 0.01 / 3600
+    thread = kloch.session.start_session_cleanup(tmp_path, lifetime, interval=1.0)
+    assert thread
+    thread.join()
+    assert not session1.path.exists()
+
+    # cleaned less than an hour ago
+    session2 = kloch.session.SessionDirectory.initialize(tmp_path)
+    time.sleep(0.05)
+    assert kloch.session.start_session_cleanup(tmp_path, lifetime, interval=1.0) is None
+    assert session2.path.exists()
+
+    thread = kloch.session.start_session_cleanup(tmp_path, lifetime, interval=0)
+    # must not prevent the interpreter from exiting
+    assert thread.daemon
+    thread.join()
+    assert not session2.path.exists()
+
+
+def test__start_session_cleanup__error(tmp_path: Path, monkeypatch, caplog):
+    def _patched_clean(*args, **kwargs):
+        raise OSError("disk on fire")
+
+    monkeypatch.setattr(kloch.session, "clean_outdated_session_dirs", _patched_clean)
+    excepthook_calls = []
+    monkeypatch.setattr(threading, "excepthook", excepthook_calls.append)
+
+    with caplog.at_level(logging.DEBUG, logger="kloch.session"):
+        thread = kloch.session.start_session_cleanup(tmp_path, 1.0, interval=0)
+        thread.join()
+    assert not excepthook_calls
+    assert "disk on fire" in caplog.text
+
+
+def test__claim_cleanup(tmp_path: Path, monkeypatch):
+    lock_path = tmp_path / kloch.session._CLEANUP_LOCK_FILENAME
+
+    # another process is claiming the cleanup
+    lock_path.touch()
+    assert not kloch.session._claim_cleanup(tmp_path, interval=1.0)
+    assert lock_path.exists()
+
+    # left by a crashed process
+    stale_time = time.time() - kloch.session._LOCK_STALE_AGE - 1
+    os.utime(lock_path, (stale_time, stale_time))
+    assert not kloch.session._claim_cleanup(tmp_path, interval=1.0)
+    assert not lock_path.exists()
+
+    assert kloch.session._claim_cleanup(tmp_path, interval=1.0)
+    assert not lock_path.exists()
+    assert not kloch.session._claim_cleanup(tmp_path, interval=1.0)
+
+    # another process claims it after the stamp was checked
+    (tmp_path / kloch.session._CLEANUP_STAMP_FILENAME).unlink()
+    original_try_lock = kloch.session._try_lock
+
+    def _patched_try_lock(path):
+        (tmp_path / kloch.session._CLEANUP_STAMP_FILENAME).touch()
+        return original_try_lock(path)
+
+    monkeypatch.setattr(kloch.session, "_try_lock", _patched_try_lock)
+    assert not kloch.session._claim_cleanup(tmp_path, interval=1.0)
+    assert not lock_path.exists()
+
+
+def test__clean_outdated_session_dirs__interrupted(tmp_path: Path, monkeypatch):
+    session = kloch.session.SessionDirectory.initialize(tmp_path)
+    (session.path / "data").mkdir()
+    (session.path / "data" / "file.txt").write_text("content")
+    time.sleep(0.05)
+    lifetime = 0.01 / 3600
+
+    def _patched_rmtree(*args, **kwargs):
+        raise OSError("interrupted")
+
+    with monkeypatch.context() as context:
+        context.setattr(kloch.session.shutil, "rmtree", _patched_rmtree)
+        cleaned = kloch.session.clean_outdated_session_dirs(tmp_path, lifetime)
+    assert cleaned == []
+    # still recognized as a session so the next cleanup removes it
+    assert session.meta_session_path.exists()
+
+    cleaned = kloch.session.clean_outdated_session_dirs(tmp_path, lifetime)
+    assert cleaned == [session.path]
+    assert not session.path.exists()
+
+
+def test__SessionDirectory__timestamp(tmp_path: Path):
+    session = kloch.session.SessionDirectory.initialize(tmp_path)
+    expected = float(session.meta_session_path.read_text())
+    assert session.timestamp == expected
+
+    # directory not named by kloch
+    renamed = kloch.session.SessionDirectory(session.path.rename(tmp_path / "custom"))
+    assert renamed.timestamp == expected
+
+
+def test__clean_outdated_session_dirs__index(tmp_path: Path, monkeypatch):
+    session1 = kloch.session.SessionDirectory.initialize(tmp_path)
+    time.sleep(0.05)
+    lifetime = 0.01 / 3600
+
+    # no index yet: the directory is listed to create it
+    cleaned = kloch.session.clean_outdated_session_dirs(
+        tmp_path,
+        lifetime=lifetime,
+        index=True,
+    )
+    assert cleaned == [session1.path]
+    assert (tmp_path / kloch.session._SESSION_INDEX_FILENAME).exists()
+
+    session2 = kloch.session.SessionDirectory.initialize(tmp_path, index=True)
+    session3 = kloch.session.SessionDirectory.initialize(tmp_path, index=True)
+    time.sleep(0.05)
+    session4 = kloch.session.SessionDirectory.initialize(tmp_path, index=True)
+
+    def _patched_list_sessions(*args, **kwargs):
+        raise AssertionError("session root must not be listed")
+
+    monkeypatch.setattr(kloch.session, "_list_sessions", _patched_list_sessions)
+
+    lifetime = 0.04 / 3600
+    cleaned = kloch.session.clean_outdated_session_dirs(
+        tmp_path,
+        lifetime=lifetime,
+        index=True,
+    )
+    assert sorted(cleaned) == sorted([session2.path, session3.path])
+    assert session4.path.exists()
+
+    time.sleep(0.05)
+    cleaned = kloch.session.clean_outdated_session_dirs(
+        tmp_path,
+        lifetime=lifetime,
+        index=True,
+    )
+    assert cleaned == [session4.path]
+
+
+def test__SessionDirectory__timestamp__invalid(tmp_path: Path):
+    session = kloch.session.SessionDirectory.initialize(tmp_path)
+    expected = float(session.meta_session_path.read_text())
+    assert kloch.session._parse_timestamp(session.identifier) == expected
+    assert kloch.session._parse_timestamp("1714574770-host-uuid") == 1714574770.0
+
+    for name in ["nan-host-uuid", "inf-host-uuid", "1e9-host-uuid", "-1-host", "12"]:
+        assert kloch.session._parse_timestamp(name) is None
+        renamed = kloch.session.SessionDirectory(session.path.rename(tmp_path / name))
+        assert renamed.timestamp == expected
+        session = renamed
+
+
+def test__locked(tmp_path: Path):
+    lock_path = tmp_path / "test.lock"
+    with kloch.session._locked(lock_path):
+        assert lock_path.exists()
+        with pytest.raises(TimeoutError):
+            with kloch.session._locked(lock_path, timeout=0.05):
+                pass
+    assert not lock_path.exists()
+
+    # left by a crashed process
+    lock_path.touch()
+    stale_time = time.time() - kloch.session._LOCK_STALE_AGE - 1
+    os.utime(lock_path, (stale_time, stale_time))
+    with kloch.session._locked(lock_path, timeout=1.0):
+        pass
+    assert not lock_path.exists()
+
+
+def test__locked__stale_concurrent(tmp_path: Path):
+    lock_path = tmp_path / "test.lock"
+    lock_path.touch()
+    stale_time = time.time() - kloch.session._LOCK_STALE_AGE - 1
+    os.utime(lock_path, (stale_time, stale_time))
+    stale_stat = lock_path.stat()
+
+    # another waiter removed the stale lock and a process acquired it again
+    lock_path.unlink()
+    assert kloch.session._try_lock(lock_path)
+
+    kloch.session._remove_stale_lock(lock_path, stale_stat)
+    assert lock_path.exists()
+    assert list(tmp_path.iterdir()) == [lock_path]
+
+    # the stale lock itself is removed
+    os.utime(lock_path, (stale_time, stale_time))
+    kloch.session._remove_stale_lock(lock_path, lock_path.stat())
+    assert not list(tmp_path.iterdir())
+
+
+def test__clean_outdated_session_dirs__index_concurrent(tmp_path: Path, monkeypatch):
+    session1 = kloch.session.SessionDirectory.initialize(tmp_path, index=True)
+    time.sleep(0.05)
+    lifetime = 0.01 / 3600
+    index_path = tmp_path / kloch.session._SESSION_INDEX_FILENAME
+    # the same session indexed twice, and a session removed by hand
+    index_path.write_text(
+        index_path.read_text() * 2 + f"{session1.timestamp} removed-session\n"
+    )
+
+    created = []
+    original_remove = kloch.session._remove_session_dir
+
+    def _patched_remove(session):
+        # another process creates a session while the cleanup is running
+        created.append(kloch.session.SessionDirectory.initialize(tmp_path, index=True))
+        original_remove(session)
+
+    monkeypatch.setattr(kloch.session, "_remove_session_dir", _patched_remove)
+
+    cleaned = kloch.session.clean_outdated_session_dirs(tmp_path, lifetime, index=True)
+    assert cleaned == [session1.path]
+    sessions = kloch.session._read_session_index(tmp_path)
+    assert sessions == [(created[0].timestamp, created[0].identifier)]
+
+
+def test__clean_outdated_session_dirs__index_interrupted(tmp_path: Path, monkeypatch):
+    session1 = kloch.session.SessionDirectory.initialize(tmp_path, index=True)
+    session2 = kloch.session.SessionDirectory.initialize(tmp_path, index=True)
+    time.sleep(0.05)
+    lifetime = 0.01 / 3600
+
+    def _patched_remove(session):
+        # like the interpreter exiting during the cleanup
+        raise SystemExit()
+
+    with monkeypatch.context() as context:
+        context.setattr(kloch.session, "_remove_session_dir", _patched_remove)
+        with pytest.raises(SystemExit):
+            kloch.session.clean_outdated_session_dirs(tmp_path, lifetime, index=True)
+
+    cleaned = kloch.session.clean_outdated_session_dirs(tmp_path, lifetime, index=True)
+    assert sorted(cleaned) == sorted([session1.path, session2.path])
+    assert kloch.session._read_session_index(tmp_path) == []
@@ -1,5 +1,7 @@
 import logging
 
+import yaml
+
 import kloch._utils
 
 LOGGER = logging.getLogger(__name__)
@@ -17,3 +19,68 @@ def test__expand_envvars():
     src_str = "foo/tmp##${PATH}/foobar"
     result = kloch._utils.expand_envvars(src_str)
     assert result.startswith("foo/tmp##")
+
+
+def test__expand_variables(monkeypatch):
+    monkeypatch.setenv("__TEST__", "SUCCESS")
+    variables = {"__TEST__": "SUCCESS", "PATH": "/bin"}
+
+    for src_str in [
+        "${PATH}/foobar",
+        "$__TEST__/$PATH",
+        "foo/$${PATH}/foobar",
+        "$$$__TEST__",
+        "$__NOT_EXISTING__ ${__NOT_EXISTING__} ${} $ ${PATH",
+        "foo/tmp##${PATH}/foobar",
+        "nothing",
+    ]:
+        result = kloch._utils.expand_variables(src_str, variables)
+        with monkeypatch.context() as context:
+            context.setenv("PATH", "/bin")
+            assert result == kloch._utils.expand_envvars(src_str), src_str
+
+    result = kloch._utils.expand_variables("$__TEST__", {})
+    assert result == "$__TEST__"
+
+
+def test__yaml_load_dump(data_dir, monkeypatch):
+    for path in sorted(data_dir.rglob("*.yml")):
+        content = path.read_text(encoding="utf-8")
+        loaded = kloch._utils.yaml_load(content)
+        assert loaded == yaml.safe_load(content), path
+
+        dumped = kloch._utils.yaml_dump(loaded, sort_keys=False)
+        assert yaml.safe_load(dumped) == loaded, path
+
+        # compare with the pure-python implementation
+        monkeypatch.setattr(kloch._utils, "_YamlLoader", yaml.SafeLoader)
+        assert kloch._utils.yaml_load(content) == loaded, path
+
+        class _PureDumper(yaml.SafeDumper):
+            pass
+
+        _PureDumper.add_multi_representer(dict, _PureDumper.represent_dict)
+        _PureDumper.add_multi_representer(list, _PureDumper.represent_list)
+        monkeypatch.setattr(kloch._utils, "_YamlDumper", _PureDumper)
+        assert kloch._utils.yaml_dump(loaded, sort_keys=False) == dumped, path
+        monkeypatch.undo()
+
+
+def test__yaml_dump__subclass():
+    import kloch
+
+    data = {"launchers": kloch.MergeableDict({"+=.base": kloch.MergeableDict()})}
+    dumped = kloch._utils.yaml_dump(data)
+    assert dumped == "launchers:\n  +=.base: {}\n"
+
+
+def test__map_threaded():
+    items = list(range(50))
+    expected = [item * 2 for item in items]
+    assert (
+        kloch._utils.map_threaded(lambda item: item * 2, items, workers=8) == expected
+    )
+    assert (
+        kloch._utils.map_threaded(lambda item: item * 2, items, workers=1) == expected
+    )
+    assert kloch._utils.map_threaded(lambda item: item * 2, [], workers=8) == []